@@ -0,0 +1,87 @@
+"""
+Benchmark the vectorized StarFactBuilder against the original iterrows path.
+
+Synthetic raw extracts are run through the transform engine and DataNormalizer
+into a temporary directory, then the fact table is built three ways: the
+original iterrows loop, the vectorized path reading the normalizer's
+artifacts, and the vectorized path taking the normalizer's tables in memory.
+The outputs are checked to hold the same facts (the list columns compared as
+sets) before the timings are printed.
+
+Usage (from the project root):
+    python Benchmark/bench_fact_builder.py --rows 200000 --files 4
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "Transform"))
+sys.path.insert(0, os.path.join(project_root, "Load"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import star_fact_builder  # noqa: E402
+from data_normalizer import DataNormalizer  # noqa: E402
+from ndjson_io import iter_records  # noqa: E402
+from bench_transform import synthetic_frame  # noqa: E402
+from transform_engine import transform_frame  # noqa: E402
+
+LIST_COLUMNS = [column for column, *_ in star_fact_builder.LIST_COLUMNS]
+
+
+def facts(path: str) -> list:
+    records = list(iter_records(path))
+    for record in records:
+        for column in LIST_COLUMNS:
+            record[column] = sorted(record[column])
+    return records
+
+
+def run(mode: str, tmp: str, normalizer) -> float:
+    star_fact_builder.FACT_BUILDER_MODE = "rows" if mode == "rows" else "vectorized"
+    builder = star_fact_builder.StarFactBuilder(csv_dir=os.path.join(tmp, "clean_data"),
+                                                json_dir=os.path.join(tmp, "json_to_load"),
+                                                output_path=os.path.join(tmp, "star_json", f"{mode}.ndjson"),
+                                                registry_path=None)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        builder.merge_fact_table(normalizer if mode == "in-memory" else None)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="total clean rows")
+    parser.add_argument("--files", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clean_dir = os.path.join(tmp, "clean_data")
+        os.makedirs(clean_dir)
+        per_file = args.rows // args.files
+        for i in range(args.files):
+            raw = synthetic_frame(per_file, seed=i).assign(is_data_updated=True, tmdb_id=lambda df: df.tmdb_id + i * per_file)
+            transform_frame(raw, "tmdb").to_csv(os.path.join(clean_dir, f"clean_l{i}_movies_2024.csv"), index=False)
+        normalizer = DataNormalizer(csv_dir=clean_dir, output_dir=os.path.join(tmp, "json_to_load"), registry_path=None)
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            normalizer.process_files()
+            normalizer.export_to_json()
+
+        timings = {mode: run(mode, tmp, normalizer) for mode in ("rows", "vectorized", "in-memory")}
+        expected = facts(os.path.join(tmp, "star_json", "rows.ndjson"))
+        for mode in ("vectorized", "in-memory"):
+            if facts(os.path.join(tmp, "star_json", f"{mode}.ndjson")) != expected:
+                raise SystemExit(f"{mode} facts differ from the rows path")
+
+    print(f"facts: {len(expected)} in {args.files} files, identical in all modes")
+    for mode, elapsed in timings.items():
+        print(f"{mode:<11} {elapsed:8.2f}s {len(expected) / elapsed:10,.0f} facts/s")
+    print(f"speedup: {timings['rows'] / timings['vectorized']:.1f}x from files, "
+          f"{timings['rows'] / timings['in-memory']:.1f}x in memory")
+
+
+if __name__ == "__main__":
+    main()
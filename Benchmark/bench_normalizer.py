@@ -0,0 +1,69 @@
+"""
+Benchmark the vectorized DataNormalizer against the original iterrows path.
+
+Synthetic raw extracts are run through the transform engine into a temporary
+clean_data directory, normalized with both NORMALIZER_MODE paths, and the
+exported JSON files are checked to be byte-identical before the timings are
+printed.
+
+Usage (from the project root):
+    python Benchmark/bench_normalizer.py --rows 100000 --files 4
+"""
+import os
+import sys
+import time
+import filecmp
+import argparse
+import tempfile
+import contextlib
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "Transform"))
+sys.path.insert(0, os.path.join(project_root, "Load"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_normalizer  # noqa: E402
+from bench_transform import synthetic_frame  # noqa: E402
+from transform_engine import transform_frame  # noqa: E402
+
+
+def run(mode: str, clean_dir: str, output_dir: str) -> float:
+    data_normalizer.NORMALIZER_MODE = mode
+    normalizer = data_normalizer.DataNormalizer(csv_dir=clean_dir, output_dir=output_dir, registry_path=None)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        normalizer.process_files()
+        elapsed = time.perf_counter() - start
+        normalizer.export_to_json()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="total clean rows")
+    parser.add_argument("--files", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clean_dir = os.path.join(tmp, "clean_data")
+        os.makedirs(clean_dir)
+        per_file = args.rows // args.files
+        for i in range(args.files):
+            raw = synthetic_frame(per_file, seed=i).assign(is_data_updated=True)
+            transform_frame(raw, "tmdb").to_csv(os.path.join(clean_dir, f"clean_l{i}_movies_2024.csv"), index=False)
+
+        timings = {mode: run(mode, clean_dir, os.path.join(tmp, mode)) for mode in ("rows", "vectorized")}
+        names = sorted(os.listdir(os.path.join(tmp, "rows")))
+        _, mismatch, errors = filecmp.cmpfiles(os.path.join(tmp, "rows"), os.path.join(tmp, "vectorized"),
+                                               names, shallow=False)
+        if mismatch or errors:
+            raise SystemExit(f"JSON output differs: {mismatch + errors}")
+
+    print(f"rows: {per_file * args.files} in {args.files} files, {len(names)} identical JSON files")
+    for mode, elapsed in timings.items():
+        print(f"{mode:<11} {elapsed:8.2f}s {per_file * args.files / elapsed:10,.0f} rows/s")
+    print(f"speedup: {timings['rows'] / timings['vectorized']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the Wikipedia table parsers against the original html.parser path.
+
+Every WIKI_PARSER backend is run through the scraper's production parse path
+(WikipediaMovieScraper.extract_movies_from_html, i.e. parse_wikitables and
+movies_from_rows) and checked against a copy of the original extract loop.
+
+Usage (from the project root):
+    python Benchmark/bench_wiki_parser.py path/to/List_of_American_films_of_2024.html
+    python Benchmark/bench_wiki_parser.py --synthetic 2000
+
+Save the page with e.g.
+    curl -o page.html https://en.wikipedia.org/wiki/List_of_American_films_of_2024
+"""
+import os
+import sys
+import time
+import argparse
+from bs4 import BeautifulSoup
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "Extract"))
+
+from wiki_parser import HAS_LXML  # noqa: E402
+from wiki import WikipediaMovieScraper  # noqa: E402
+
+MONTHS = ["JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE",
+          "JULY", "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER"]
+
+
+def legacy_extract(html: bytes):
+    """The original extract path: full html.parser tree and get_text() on every access"""
+    soup = BeautifulSoup(html, 'html.parser')
+    tables = [t for t in soup.find_all('table', class_='wikitable') if not t.find('caption')]
+    movies = []
+    for table in tables:
+        prev_month = prev_date = None
+        for row in table.find_all('tr')[1:]:
+            cells = row.find_all(['td', 'th'])
+            movie = None
+            if len(cells) == 6:
+                movie = (f"{cells[1].get_text(strip=True)}, {cells[0].get_text(strip=True)}",
+                         cells[2].get_text(strip=True), cells[3].get_text(strip=True), cells[4].get_text(strip=True))
+            elif len(cells) == 5:
+                movie = (f"{cells[0].get_text(strip=True)}, {prev_month}",
+                         cells[1].get_text(strip=True), cells[2].get_text(strip=True), cells[3].get_text(strip=True))
+            elif len(cells) == 4:
+                movie = (f"{prev_date}, {prev_month}",
+                         cells[0].get_text(strip=True), cells[1].get_text(strip=True), cells[2].get_text(strip=True))
+            if movie:
+                if len(cells) == 6:
+                    prev_month = cells[0].get_text(strip=True)
+                    prev_date = cells[1].get_text(strip=True)
+                elif len(cells) == 5:
+                    prev_date = cells[0].get_text(strip=True)
+                movies.append(movie)
+    return movies
+
+
+def fast_extract(scraper, html: bytes, backend: str):
+    """The production path with one backend, movies as (release date, title, studio, cast) like legacy_extract"""
+    return [(movie['Release Date'], movie['Title'], movie['Studio'], movie['Cast and Crew'])
+            for movie in scraper.extract_movies_from_html(html, backend)]
+
+
+def synthetic_page(n_movies: int) -> bytes:
+    """A page shaped like the Wikipedia list: rowspan month/date cells, styles, refs and a captioned table"""
+    parts = ["<html><head><title>List</title></head><body><div id='content'>",
+             "<p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p>",
+             "<table class='wikitable'><caption>Box office</caption><tr><th>Rank</th></tr><tr><td>1</td></tr></table>"]
+    per_quarter = max(1, n_movies // 4)
+    for quarter in range(4):
+        parts.append("<table class='wikitable sortable'><tbody><tr><th>Month</th><th>Day</th><th>Title</th>"
+                     "<th>Studio</th><th>Cast and crew</th><th>Ref.</th></tr>")
+        for i in range(per_quarter):
+            month = MONTHS[quarter * 3 + (i * 3 // per_quarter)]
+            title = f"<i><a href='/wiki/Film_{quarter}_{i}'>Film {quarter}-{i}</a></i>"
+            studio = "<a href='/wiki/Studio'>Studio</a> <br/> Pictures"
+            cast = (f"<style>.mw-parser-output .x{{color:red}}</style>Director {i} (director); "
+                    f"<a href='/wiki/A'>Actor A</a>, <!-- note --> Actor B")
+            ref = f"<sup class='reference'><a href='#cite'>[{i}]</a></sup>"
+            if i % 6 == 0:
+                parts.append(f"<tr><th rowspan='6'>{month}</th><td rowspan='2'>{i % 28 + 1}</td>"
+                             f"<td>{title}</td><td>{studio}</td><td>{cast}</td><td>{ref}</td></tr>")
+            elif i % 2 == 0:
+                parts.append(f"<tr><td rowspan='2'>{i % 28 + 1}</td><td>{title}</td><td>{studio}</td>"
+                             f"<td>{cast}</td><td>{ref}</td></tr>")
+            else:
+                parts.append(f"<tr><td>{title}</td><td>{studio}</td><td>{cast}</td><td>{ref}</td></tr>")
+        parts.append("</tbody></table>")
+    parts.append("<div class='navbox'>" + "<a href='/wiki/X'>link</a> " * 5000 + "</div></div></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def bench(label: str, func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<22} {best * 1000:9.1f} ms  ({len(result)} movies)")
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("page", nargs="?", help="saved copy of the Wikipedia list page")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate a page with this many movies instead")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.page:
+        with open(args.page, "rb") as f:
+            html = f.read()
+    else:
+        html = synthetic_page(args.synthetic or 1000)
+    print(f"Page size: {len(html) / 1024:.0f} KiB")
+
+    # Parsing never reaches TMDb, keep the scraper from opening the response cache and title index
+    os.environ.setdefault("TMDB_CACHE_ENABLED", "false")
+    os.environ.setdefault("TITLE_INDEX_ENABLED", "false")
+    scraper = WikipediaMovieScraper()
+
+    baseline, expected = bench("html.parser (legacy)", lambda: legacy_extract(html), args.repeat)
+    backends = ["soup", "strainer"] + (["lxml"] if HAS_LXML else [])
+    for backend in backends:
+        elapsed, movies = bench(backend, lambda: fast_extract(scraper, html, backend), args.repeat)
+        status = "identical" if movies == expected else "MISMATCH"
+        print(f"  {'':<22} {baseline / elapsed:9.1f}x speedup vs legacy, output {status}")
+
+
+if __name__ == "__main__":
+    main()
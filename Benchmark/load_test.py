@@ -0,0 +1,164 @@
+"""
+Offline load test of the extractors against Benchmark/stub_server.py.
+
+For every size, a stub server is started in a child process and the TMDb
+discover + detail pipeline (and optionally the Wikipedia enrichment) is run
+against it in threads and/or async mode. Throughput and tail latency come
+from the clients' HTTP metrics.
+
+Usage (from the project root):
+    python Benchmark/load_test.py --sizes 1000,10000,100000
+    python Benchmark/load_test.py --sizes 1000 --modes async --scenarios tmdb,wiki --latency-ms 40 --rate-429 0.01
+"""
+import os
+import sys
+import math
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "Extract"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_server  # noqa: E402
+
+# TMDb caps discover at 500 pages of 20 results per query
+DISCOVER_PAGES = 500
+PAGE_SIZE = stub_server.PAGE_SIZE
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Stub server did not start on port {port}")
+
+
+def configure_environment(port: int, rate_limit: float) -> None:
+    """Point the clients at the stub before the Extract modules read their settings"""
+    os.environ["TMDB_BASE_URL"] = f"http://127.0.0.1:{port}{stub_server.API_PREFIX}"
+    os.environ["WIKI_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["API_KEY"] = "stub"
+    os.environ["TMDB_CACHE_ENABLED"] = "false"
+    os.environ["TITLE_INDEX_ENABLED"] = "false"
+    os.environ["TMDB_RECORD_MODE"] = "off"
+    # 0 means no client-side limit, the stub's --rate-429 exercises the throttling path instead
+    os.environ["TMDB_RATE_LIMIT"] = str(rate_limit or 1_000_000)
+    os.environ["TMDB_RATE_BURST"] = str(int(rate_limit) or 1_000_000)
+
+
+def language_plan(n_movies: int):
+    """Languages and pages per language needed to discover n_movies"""
+    n_languages = max(1, math.ceil(n_movies / (DISCOVER_PAGES * PAGE_SIZE)))
+    languages = [f"l{i}" for i in range(n_languages)]
+    return languages, math.ceil(n_movies / PAGE_SIZE / n_languages)
+
+
+def run_tmdb(mode: str, n_movies: int, workers: int) -> int:
+    from tmdb import TMDbMovieFetcher, AsyncTMDbMovieFetcher
+    from async_api_client import AsyncTMDbAPIClient
+    languages, max_pages = language_plan(n_movies)
+
+    if mode == "async":
+        async def run() -> int:
+            async with AsyncTMDbAPIClient(max_connections=workers) as client:
+                fetcher = AsyncTMDbMovieFetcher(client, max_concurrency=workers, max_pages=max_pages)
+
+                async def count(lang: str) -> int:
+                    return sum([1 async for _ in fetcher.iter_movies(lang)])
+
+                return sum(await asyncio.gather(*(count(lang) for lang in languages)))
+        return asyncio.run(run())
+
+    fetcher = TMDbMovieFetcher(max_workers=workers, max_pages=max_pages)
+    try:
+        with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+            return sum(executor.map(lambda lang: sum(1 for _ in fetcher.iter_movies(lang)), languages))
+    finally:
+        fetcher.close()
+
+
+def run_wiki(mode: str, n_movies: int, workers: int) -> int:
+    import wiki
+    from async_api_client import AsyncTMDbAPIClient
+    wiki.MAX_WORKERS = workers
+    scraper = wiki.WikipediaMovieScraper()
+    html = scraper.fetch_wikipedia_html(wiki.WIKI_URL_TEMPLATE.format(list_name="American", year=2024))
+    movies = scraper.extract_movies_from_html(html, year=2024)[:n_movies]
+
+    if mode == "async":
+        async def run() -> int:
+            async with AsyncTMDbAPIClient(max_connections=workers) as client:
+                return sum([1 async for _, record in scraper.iter_enriched_movies_async(movies, client) if record])
+        return asyncio.run(run())
+    return sum(1 for _, record in scraper.iter_enriched_movies(movies) if record)
+
+
+SCENARIOS = {"tmdb": run_tmdb, "wiki": run_wiki}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated movie counts")
+    parser.add_argument("--modes", default="threads,async", help="threads and/or async")
+    parser.add_argument("--scenarios", default="tmdb", help="tmdb and/or wiki")
+    parser.add_argument("--workers", type=int, default=50, help="threads / concurrent requests of the clients")
+    parser.add_argument("--rate-limit", type=float, default=0, help="client requests per second, 0 for none")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    configure_environment(port, args.rate_limit)
+    from http_metrics import get_shared_metrics
+    metrics = get_shared_metrics()
+
+    print(f"{'scenario':<8} {'mode':<8} {'movies':>8} {'seconds':>9} {'movies/s':>9} "
+          f"{'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        options = stub_server.parse_args([
+            "--port", str(port), "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--rate-429", str(args.rate_429),
+            "--discover-pages", str(DISCOVER_PAGES), "--wiki-movies", str(size if "wiki" in args.scenarios else 10),
+        ])
+        server = multiprocessing.Process(target=stub_server.serve, args=(options,), daemon=True)
+        server.start()
+        try:
+            wait_for_port(port)
+            # The extractors log every request (and every 429), which would dominate the timings
+            logging.disable(logging.WARNING)
+            for scenario in args.scenarios.split(","):
+                for mode in args.modes.split(","):
+                    metrics.reset()
+                    start = time.perf_counter()
+                    movies = SCENARIOS[scenario](mode, size, args.workers)
+                    elapsed = time.perf_counter() - start
+                    latency = metrics.latency_summary()
+                    retries = sum(sum(stats["retries"].values()) for stats in metrics.snapshot()["endpoints"].values())
+                    print(f"{scenario:<8} {mode:<8} {movies:>8} {elapsed:>9.2f} {movies / elapsed:>9.0f} "
+                          f"{latency['count']:>9} {latency['count'] / elapsed:>8.0f} {latency['p50'] * 1000:>8.1f} "
+                          f"{latency['p95'] * 1000:>8.1f} {latency['p99'] * 1000:>8.1f} {retries:>8}", flush=True)
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Local stand-in for the TMDb API and the Wikipedia film lists, for offline benchmarks.
+
+Serves /3/discover/movie, /3/movie/{id} (with append_to_response=credits),
+/3/movie/{id}/credits, /3/movie/changes, /3/search/movie and
+/wiki/List_of_<list>_films_of_<year> from synthetic data, or from a recordings
+file written with TMDB_RECORD_MODE=record. Latency, 5xx errors and 429s can be
+injected.
+
+Usage (from the project root):
+    python Benchmark/stub_server.py --port 8765 --latency-ms 40 --error-rate 0.01 --rate-429 0.005
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 WIKI_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+import os
+import sys
+import zlib
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "Extract"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from recorder import recording_key, load_recordings  # noqa: E402
+from bench_wiki_parser import synthetic_page  # noqa: E402
+
+API_PREFIX = "/3"
+PAGE_SIZE = 20
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Thriller"]
+
+
+def _language_base(language: str) -> int:
+    """Id range of a language so discover ids never collide across languages"""
+    return (zlib.crc32(language.encode()) % 1000) * 1_000_000
+
+
+def synthetic_movie(movie_id: int, language: str = "en") -> dict:
+    """A discover result"""
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "original_language": language,
+        "release_date": f"2024-{movie_id % 12 + 1:02d}-{movie_id % 28 + 1:02d}",
+        "vote_average": round((movie_id % 100) / 10, 1),
+        "vote_count": movie_id % 5000,
+    }
+
+
+def synthetic_credits(movie_id: int) -> dict:
+    return {
+        "id": movie_id,
+        "cast": [{"name": f"Actor {movie_id}-{i}", "character": f"Role {i}", "order": i} for i in range(8)],
+        "crew": [{"name": f"Director {movie_id}", "job": "Director"}, {"name": f"Writer {movie_id}", "job": "Writer"}],
+    }
+
+
+def synthetic_details(movie_id: int) -> dict:
+    return {
+        **synthetic_movie(movie_id),
+        "budget": (movie_id % 200) * 1_000_000,
+        "revenue": (movie_id % 300) * 1_000_000,
+        "runtime": 80 + movie_id % 70,
+        "genres": [{"id": i, "name": GENRES[(movie_id + i) % len(GENRES)]} for i in range(2)],
+        "production_companies": [{"id": movie_id % 97, "name": f"Studio {movie_id % 97}"}],
+    }
+
+
+class StubTMDb:
+    """Request handlers plus latency / error / 429 injection"""
+
+    def __init__(self, options: argparse.Namespace):
+        self.options = options
+        self.fixtures = load_recordings(options.fixtures) if options.fixtures else {}
+        self.random = random.Random(options.seed)
+        self.wiki_page = synthetic_page(options.wiki_movies)
+        self.wiki_etag = f'"{zlib.crc32(self.wiki_page):08x}"'
+
+    @web.middleware
+    async def inject_faults(self, request: web.Request, handler):
+        options = self.options
+        if options.latency_ms or options.jitter_ms:
+            delay = options.latency_ms + self.random.uniform(-options.jitter_ms, options.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000)
+        roll = self.random.random()
+        if roll < options.rate_429:
+            return web.json_response({"status_code": 25, "status_message": "Request count over limit."},
+                                     status=429, headers={"Retry-After": str(options.retry_after)})
+        if roll < options.rate_429 + options.error_rate:
+            return web.json_response({"status_message": "Injected error"}, status=500)
+        return await handler(request)
+
+    def fixture(self, request: web.Request):
+        path = request.path[len(API_PREFIX):]
+        return self.fixtures.get(recording_key(path, dict(request.query)))
+
+    async def api(self, request: web.Request) -> web.Response:
+        recorded = self.fixture(request)
+        if recorded is not None:
+            return web.json_response(recorded)
+
+        path = request.path[len(API_PREFIX):]
+        query = request.query
+        if path == "/discover/movie":
+            return web.json_response(self.discover(query.get("with_original_language", "en"), int(query.get("page", 1))))
+        if path == "/movie/changes":
+            return web.json_response({"results": [], "page": 1, "total_pages": 1, "total_results": 0})
+        if path == "/search/movie":
+            title = query.get("query", "")
+            movie_id = zlib.crc32(title.encode()) % 10_000_000 + 1
+            return web.json_response({"page": 1, "results": [{"id": movie_id, "title": title}], "total_pages": 1})
+
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2 and parts[0] == "movie" and parts[1].isdigit():
+            movie_id = int(parts[1])
+            if len(parts) == 3 and parts[2] == "credits":
+                return web.json_response(synthetic_credits(movie_id))
+            if len(parts) == 2:
+                details = synthetic_details(movie_id)
+                if "credits" in query.get("append_to_response", "").split(","):
+                    details["credits"] = synthetic_credits(movie_id)
+                return web.json_response(details)
+        return web.json_response({"status_message": "The resource you requested could not be found."}, status=404)
+
+    def discover(self, language: str, page: int) -> dict:
+        total_pages = self.options.discover_pages
+        results = []
+        if page <= total_pages:
+            first_id = _language_base(language) + (page - 1) * PAGE_SIZE + 1
+            results = [synthetic_movie(movie_id, language) for movie_id in range(first_id, first_id + PAGE_SIZE)]
+        return {"page": page, "results": results, "total_pages": total_pages, "total_results": total_pages * PAGE_SIZE}
+
+    async def wiki(self, request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == self.wiki_etag:
+            return web.Response(status=304, headers={"ETag": self.wiki_etag})
+        return web.Response(body=self.wiki_page, content_type="text/html", headers={"ETag": self.wiki_etag})
+
+
+def make_app(options: argparse.Namespace) -> web.Application:
+    stub = StubTMDb(options)
+    app = web.Application(middlewares=[stub.inject_faults])
+    app.router.add_get(API_PREFIX + "/{tail:.*}", stub.api)
+    app.router.add_get("/wiki/{title}", stub.wiki)
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--discover-pages", type=int, default=500, help="total_pages of every discover query")
+    parser.add_argument("--wiki-movies", type=int, default=1000, help="films on the synthetic Wikipedia list page")
+    parser.add_argument("--fixtures", help="recordings file (TMDB_RECORD_MODE=record) served before synthetic data")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def serve(options: argparse.Namespace) -> None:
+    web.run_app(make_app(options), host=options.host, port=options.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"Serving TMDb stand-in on http://{args.host}:{args.port}{API_PREFIX} and Wikipedia on http://{args.host}:{args.port}/wiki/")
+    serve(args)
@@ -1,24 +1,62 @@
 import os
+import time
 import logging
+import threading
 import requests
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import Optional, Dict, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, List, Iterable, Tuple
 from dotenv import load_dotenv
 import re
 from utils import normalize_title  # <-- import normalize_title from utils
+from cache import ResponseCache
+from rate_limiter import TokenBucketRateLimiter, get_shared_rate_limiter, parse_retry_after
+from recorder import ResponseRecorder, get_shared_recorder, relative_path
+from http_metrics import HttpMetrics, InstrumentedHTTPAdapter, get_shared_metrics, endpoint_of
+
+# How many times a request is re-sent after a 429 before giving up
+MAX_RATE_LIMIT_RETRIES = 5
+# Threads used by get_many_full_details, match to the connection pool size
+MAX_DETAIL_WORKERS = 50
 
 # Load environment variables
 load_dotenv()
 
+# Point the client at a local stand-in (e.g. Benchmark/stub_server.py) with TMDB_BASE_URL
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
+
 class TMDbAPIClient:
     """Common TMDb API client for shared functionality"""
 
-    def __init__(self):
+    # In-flight full-detail fetches keyed by (movie id, refresh), shared by every client in the
+    # process so that concurrent requests for the same movie are collapsed onto one HTTP call;
+    # a refresh never joins a fetch that may be answered from the cache
+    _inflight: Dict[Tuple[int, bool], Future] = {}
+    _inflight_lock = threading.Lock()
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        metrics: Optional[HttpMetrics] = None,
+        recorder: Optional[ResponseRecorder] = None
+    ):
         self.api_key = os.getenv("API_KEY")
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = TMDB_BASE_URL
         self.logger = logging.getLogger(__name__)
 
+        # On-disk response cache, disable with TMDB_CACHE_ENABLED=false
+        if cache is None and os.getenv("TMDB_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"):
+            cache = ResponseCache()
+        self.cache = cache
+
+        # One token bucket shared by every client and worker thread in the process
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        # Per-endpoint request counts, latencies, retries and pool waits, also shared process-wide
+        self.metrics = metrics or get_shared_metrics()
+        # Record responses to / replay them from a fixtures file, see TMDB_RECORD_MODE
+        self.recorder = recorder or get_shared_recorder()
+
         #using the requests library , sets up a requests.Session with a retry strategy and connection pooling
         # Create session with retry strategy and connection pooling
         self.session = requests.Session()
@@ -26,28 +64,74 @@ class TMDbAPIClient:
             total=3,
             connect=3,
             backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504]
+            status_forcelist=[500, 502, 503, 504]  # 429 is handled by the shared rate limiter
         )
-        adapter = HTTPAdapter(
+        adapter = InstrumentedHTTPAdapter(
+            self.metrics,
             max_retries=retry,
             pool_connections=50,  # Match to ThreadPoolExecutor max_workers
             pool_maxsize=50,      # Match to ThreadPoolExecutor max_workers
             pool_block=False      # Don't block when pool is full
         )
         self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def make_request_with_retries(self, url: str, params: Dict, refresh: bool = False) -> Optional[Dict]:
+        """Make HTTP request with retry logic using session, served from the cache when possible
+
+        refresh: skip the cache lookup (the response still replaces the cached entry)
+        """
+        endpoint = endpoint_of(url, self.base_url)
+        if self.recorder is not None and self.recorder.replaying:
+            _, data = self.recorder.get(relative_path(url, self.base_url), params)
+            return data
+        if self.cache is not None and not refresh:
+            cached = self.cache.get(url, params)
+            if cached is not None:
+                self.metrics.record_cache_hit(endpoint)
+                self._record_response(url, params, cached)
+                return cached
 
-    def make_request_with_retries(self, url: str, params: Dict) -> Optional[Dict]:
-        """Make HTTP request with retry logic using session"""
         try:
-            self.logger.info(f"Fetching URL: {url}")
-            #is making an HTTP GET request using the configured session
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                self.metrics.record_throttle_wait(self.rate_limiter.acquire())
+                self.logger.info(f"Fetching URL: {url}")
+                #is making an HTTP GET request using the configured session
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params)
+                except requests.exceptions.RequestException:
+                    self.metrics.record_request(endpoint, "error", time.perf_counter() - start)
+                    raise
+                self.metrics.record_request(endpoint, response.status_code, time.perf_counter() - start, len(response.content))
+                self._record_transport_retries(endpoint, response)
+                if response.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                    # Throttled: pause every worker, not just this one, then try again
+                    self.metrics.record_retry(endpoint, "429")
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    self.logger.warning(f"Rate limited (429), pausing all requests for {delay:.1f}s")
+                    self.rate_limiter.pause(delay)
+                    continue
+                response.raise_for_status()
+                data = response.json()
+                if self.cache is not None:
+                    self.cache.set(url, params, data)
+                self._record_response(url, params, data)
+                return data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Request failed: {e}")
             return None
 
+    def _record_response(self, url: str, params: Dict, data: Dict) -> None:
+        if self.recorder is not None and self.recorder.recording:
+            self.recorder.record(relative_path(url, self.base_url), params, data)
+
+    def _record_transport_retries(self, endpoint: str, response: requests.Response) -> None:
+        """Count the 5xx/connection retries urllib3 made before this response"""
+        retries = getattr(response.raw, "retries", None)
+        for entry in getattr(retries, "history", ()):
+            self.metrics.record_retry(endpoint, str(entry.status) if entry.status else "connection")
+
     def get_movie_details(self, movie_id: int) -> Dict:
         """Fetch basic movie details"""
         url = f"{self.base_url}/movie/{movie_id}"
@@ -67,6 +151,11 @@ class TMDbAPIClient:
         }
         data = self.make_request_with_retries(url, params)
 
+        return self.parse_credits(data)
+
+    @staticmethod
+    def parse_credits(data: Optional[Dict]) -> Dict:
+        """Reduce a raw credits payload to directors and the top 5 actors"""
         if data is None:
             return {"directors": [], "actors": []}
 
@@ -91,10 +180,46 @@ class TMDbAPIClient:
             "actors": actors
         }
 
-    def get_movie_full_details(self, movie_id: int) -> Dict:
-        """Combine basic details and credits into one response"""
-        details = self.get_movie_details(movie_id)
-        credits = self.get_movie_credits(movie_id)
+    def get_movie_full_details(self, movie_id: int, refresh: bool = False) -> Dict:
+        """Fetch basic details and credits in a single request
+
+        If another thread is already fetching the same movie with the same
+        refresh flag, wait for its result instead of sending a second request.
+        A refresh never waits on a plain fetch, which may come from the cache.
+        """
+        key = (movie_id, refresh)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = self._fetch_full_details(movie_id, refresh)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _fetch_full_details(self, movie_id: int, refresh: bool = False) -> Dict:
+        """Fetch /movie/{id} with append_to_response=credits and combine both into one response"""
+        url = f"{self.base_url}/movie/{movie_id}"
+        params = {
+            "api_key": self.api_key,
+            "language": "en-US",
+            "append_to_response": "credits"
+        }
+        data = self.make_request_with_retries(url, params, refresh)
+        details = dict(data) if data is not None else {}
+        credits = self.parse_credits(details.pop("credits", None))
 
         return {
             **details,
@@ -102,8 +227,22 @@ class TMDbAPIClient:
             "actors": credits["actors"]
         }
 
-    def search_movie_by_title(self, title: str, year: int) -> Optional[Dict]:
-        """Search TMDb for a movie by title (and optionally year) and return detailed info"""
+    def get_many_full_details(self, movie_ids: Iterable[int], max_workers: int = MAX_DETAIL_WORKERS) -> Dict[int, Dict]:
+        """Fetch full details for many movies concurrently, one request per distinct id"""
+        unique_ids = list(dict.fromkeys(movie_ids))
+        if not unique_ids:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_ids))) as executor:
+            results = executor.map(self.get_movie_full_details, unique_ids)
+            return dict(zip(unique_ids, results))
+
+    def search_movie_id(self, title: str, year: Optional[int]) -> Tuple[bool, Optional[int]]:
+        """Search TMDb for a movie by title (and optionally year)
+
+        Returns (answered, movie_id). answered is False when the request
+        failed, so a missing id can be told apart from a title with no match.
+        """
         search_url = f"{self.base_url}/search/movie"
         params = {
             "api_key": self.api_key,
@@ -114,35 +253,41 @@ class TMDbAPIClient:
             "primary_release_year": year
         }
 
+        self.logger.info(f"Searching TMDb for: {title}" + (f" ({year})" if year else ""))
+        data = self.make_request_with_retries(search_url, params)
+        if data is None:
+            return False, None
+
+        if not data.get("results"):
+            self.logger.warning(f"No results found for '{title}'")
+            return True, None
+        return True, self.pick_search_result(title, data["results"])
+
+    def search_movie_by_title(self, title: str, year: int) -> Optional[Dict]:
+        """Search TMDb for a movie by title (and optionally year) and return detailed info"""
         try:
-            self.logger.info(f"Searching TMDb for: {title}" + (f" ({year})" if year else ""))
-            response = self.session.get(search_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if not data.get("results"):
-                self.logger.warning(f"No results found for '{title}'")
-                return None
-
-            if data.get("results"):
-                movie_index = 0
-                if len(data["results"]) > 1:
-                    for idx, movie in enumerate(data["results"]):
-                        # Use normalize_title from utils
-                        if normalize_title(title) == normalize_title(movie.get("title", "")):
-                            movie_index = idx
-                            break
-                    else:
-                        self.logger.warning(f"No exact title match found for '{title}', using the first match.")
-                movie_id = data["results"][movie_index].get("id")
-                if movie_id:
-                    self.logger.info(f"Fetching TMDb details for movie ID: {movie_id} ({title})")
-                    return self.get_movie_full_details(movie_id)
+            _, movie_id = self.search_movie_id(title, year)
+            if movie_id:
+                self.logger.info(f"Fetching TMDb details for movie ID: {movie_id} ({title})")
+                return self.get_movie_full_details(movie_id)
             return None
         except Exception as e:
             self.logger.error(f"TMDb API error for '{title}': {e}")
             return None
 
+    def pick_search_result(self, title: str, results: List[Dict]) -> Optional[int]:
+        """Return the id of the result whose title matches exactly, else the first result"""
+        movie_index = 0
+        if len(results) > 1:
+            for idx, movie in enumerate(results):
+                # Use normalize_title from utils
+                if normalize_title(title) == normalize_title(movie.get("title", "")):
+                    movie_index = idx
+                    break
+            else:
+                self.logger.warning(f"No exact title match found for '{title}', using the first match.")
+        return results[movie_index].get("id")
+
     def __del__(self):
         """Clean up session on object deletion"""
         if hasattr(self, 'session'):
@@ -0,0 +1,283 @@
+import os
+import time
+import asyncio
+import logging
+import aiohttp
+from typing import Optional, Dict, Iterable, Tuple
+from dotenv import load_dotenv
+from api_client import TMDbAPIClient, TMDB_BASE_URL
+from cache import ResponseCache
+from rate_limiter import TokenBucketRateLimiter, get_shared_rate_limiter, parse_retry_after
+from recorder import ResponseRecorder, get_shared_recorder, relative_path
+from http_metrics import HttpMetrics, get_shared_metrics, endpoint_of
+
+# Load environment variables
+load_dotenv()
+
+MAX_CONNECTIONS = 100
+MAX_RETRIES = 3
+MAX_RATE_LIMIT_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class AsyncTMDbAPIClient:
+    """asyncio counterpart of TMDbAPIClient built on a single aiohttp session
+
+    Use it as an async context manager so the session is opened and closed
+    around the extraction run.
+    """
+
+    # Response parsing and recording are shared with the blocking client
+    parse_credits = staticmethod(TMDbAPIClient.parse_credits)
+    pick_search_result = TMDbAPIClient.pick_search_result
+    _record_response = TMDbAPIClient._record_response
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        max_connections: int = MAX_CONNECTIONS,
+        metrics: Optional[HttpMetrics] = None,
+        recorder: Optional[ResponseRecorder] = None
+    ):
+        self.api_key = os.getenv("API_KEY")
+        self.base_url = TMDB_BASE_URL
+        self.logger = logging.getLogger(__name__)
+        self.max_connections = max_connections
+
+        # On-disk response cache, disable with TMDB_CACHE_ENABLED=false
+        if cache is None and os.getenv("TMDB_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"):
+            cache = ResponseCache()
+        self.cache = cache
+
+        # Same process-wide token bucket as the blocking client
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.metrics = metrics or get_shared_metrics()
+        # Record responses to / replay them from a fixtures file, see TMDB_RECORD_MODE
+        self.recorder = recorder or get_shared_recorder()
+        self.session: Optional[aiohttp.ClientSession] = None
+        # In-flight full-detail fetches keyed by (movie id, refresh), see TMDbAPIClient.get_movie_full_details
+        self._inflight: Dict[Tuple[int, bool], asyncio.Future] = {}
+
+    async def __aenter__(self) -> "AsyncTMDbAPIClient":
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+            trace_configs=[self._trace_config()]
+        )
+        return self
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Report time spent queued for a free connection and new connections to the metrics"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.pool_wait = 0.0
+
+        async def on_queued_start(session, context, params):
+            context.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, context, params):
+            context.pool_wait = time.perf_counter() - context.queued_at
+
+        async def on_connection_create_end(session, context, params):
+            self.metrics.record_connection_created()
+
+        async def on_request_end(session, context, params):
+            self.metrics.record_pool_wait(context.pool_wait)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @staticmethod
+    def _query_params(params: Dict) -> Dict:
+        """aiohttp only accepts str/int/float query values, so drop None and lowercase booleans"""
+        query = {}
+        for key, value in params.items():
+            if value is None:
+                continue
+            query[key] = str(value).lower() if isinstance(value, bool) else value
+        return query
+
+    async def make_request_with_retries(self, url: str, params: Dict, refresh: bool = False) -> Optional[Dict]:
+        """Make HTTP request with retry and exponential backoff, served from the cache when possible
+
+        refresh: skip the cache lookup (the response still replaces the cached entry)
+        """
+        endpoint = endpoint_of(url, self.base_url)
+        if self.recorder is not None and self.recorder.replaying:
+            _, data = self.recorder.get(relative_path(url, self.base_url), params)
+            return data
+        # The SQLite cache blocks, keep it off the event loop
+        if self.cache is not None and not refresh:
+            cached = await asyncio.to_thread(self.cache.get, url, params)
+            if cached is not None:
+                self.metrics.record_cache_hit(endpoint)
+                self._record_response(url, params, cached)
+                return cached
+
+        attempt = 0
+        throttled = 0
+        while True:
+            start = None
+            try:
+                self.metrics.record_throttle_wait(await self.rate_limiter.acquire_async())
+                self.logger.info(f"Fetching URL: {url}")
+                start = time.perf_counter()
+                async with self.session.get(url, params=self._query_params(params)) as response:
+                    body = await response.read()
+                    self.metrics.record_request(endpoint, response.status, time.perf_counter() - start, len(body))
+                    start = None
+                    if response.status == 429 and throttled < MAX_RATE_LIMIT_RETRIES:
+                        # Throttled: pause every task, not just this one, then try again
+                        throttled += 1
+                        self.metrics.record_retry(endpoint, "429")
+                        delay = parse_retry_after(response.headers.get("Retry-After"))
+                        self.logger.warning(f"Rate limited (429), pausing all requests for {delay:.1f}s")
+                        self.rate_limiter.pause(delay)
+                        continue
+                    if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                        attempt += 1
+                        self.metrics.record_retry(endpoint, str(response.status))
+                        await asyncio.sleep(BACKOFF_FACTOR * (2 ** (attempt - 1)))
+                        continue
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.set, url, params, data)
+                self._record_response(url, params, data)
+                return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if start is not None:
+                    self.metrics.record_request(endpoint, "error", time.perf_counter() - start)
+                if attempt < MAX_RETRIES:
+                    attempt += 1
+                    self.metrics.record_retry(endpoint, "connection")
+                    await asyncio.sleep(BACKOFF_FACTOR * (2 ** (attempt - 1)))
+                    continue
+                self.logger.error(f"Request failed: {e}")
+                return None
+            except aiohttp.ClientError as e:
+                if start is not None:
+                    self.metrics.record_request(endpoint, "error", time.perf_counter() - start)
+                self.logger.error(f"Request failed: {e}")
+                return None
+
+    async def get_movie_details(self, movie_id: int) -> Dict:
+        """Fetch basic movie details"""
+        url = f"{self.base_url}/movie/{movie_id}"
+        params = {
+            "api_key": self.api_key,
+            "language": "en-US"
+        }
+        data = await self.make_request_with_retries(url, params)
+        return data if data is not None else {}
+
+    async def get_movie_credits(self, movie_id: int) -> Dict:
+        """Fetch credits (directors and actors) for a movie"""
+        url = f"{self.base_url}/movie/{movie_id}/credits"
+        params = {
+            "api_key": self.api_key,
+            "language": "en-US"
+        }
+        data = await self.make_request_with_retries(url, params)
+        return self.parse_credits(data)
+
+    async def get_movie_full_details(self, movie_id: int, refresh: bool = False) -> Dict:
+        """Fetch basic details and credits in a single request
+
+        Concurrent calls for the same movie and refresh flag share one in-flight request.
+        """
+        key = (movie_id, refresh)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._fetch_full_details(movie_id, refresh)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting, mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fetch_full_details(self, movie_id: int, refresh: bool = False) -> Dict:
+        """Fetch /movie/{id} with append_to_response=credits and combine both into one response"""
+        url = f"{self.base_url}/movie/{movie_id}"
+        params = {
+            "api_key": self.api_key,
+            "language": "en-US",
+            "append_to_response": "credits"
+        }
+        data = await self.make_request_with_retries(url, params, refresh)
+        details = dict(data) if data is not None else {}
+        credits = self.parse_credits(details.pop("credits", None))
+
+        return {
+            **details,
+            "directors": credits["directors"],
+            "actors": credits["actors"]
+        }
+
+    async def get_many_full_details(self, movie_ids: Iterable[int], max_concurrency: int = MAX_CONNECTIONS) -> Dict[int, Dict]:
+        """Fetch full details for many movies concurrently, one request per distinct id"""
+        unique_ids = list(dict.fromkeys(movie_ids))
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(movie_id: int) -> Dict:
+            async with semaphore:
+                return await self.get_movie_full_details(movie_id)
+
+        results = await asyncio.gather(*(fetch(movie_id) for movie_id in unique_ids))
+        return dict(zip(unique_ids, results))
+
+    async def search_movie_id(self, title: str, year: Optional[int]) -> Tuple[bool, Optional[int]]:
+        """Search TMDb for a movie by title (and optionally year), see TMDbAPIClient.search_movie_id"""
+        search_url = f"{self.base_url}/search/movie"
+        params = {
+            "api_key": self.api_key,
+            "query": title,
+            "language": "en-US",
+            "page": 1,
+            "include_adult": False,
+            "primary_release_year": year
+        }
+
+        self.logger.info(f"Searching TMDb for: {title}" + (f" ({year})" if year else ""))
+        data = await self.make_request_with_retries(search_url, params)
+        if data is None:
+            return False, None
+
+        if not data.get("results"):
+            self.logger.warning(f"No results found for '{title}'")
+            return True, None
+        return True, self.pick_search_result(title, data["results"])
+
+    async def search_movie_by_title(self, title: str, year: int) -> Optional[Dict]:
+        """Search TMDb for a movie by title (and optionally year) and return detailed info"""
+        try:
+            _, movie_id = await self.search_movie_id(title, year)
+            if movie_id:
+                self.logger.info(f"Fetching TMDb details for movie ID: {movie_id} ({title})")
+                return await self.get_movie_full_details(movie_id)
+            return None
+        except Exception as e:
+            self.logger.error(f"TMDb API error for '{title}': {e}")
+            return None
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import urlencode, urlparse
+
+# Defaults (override with environment variables)
+CACHE_PATH = os.getenv("TMDB_CACHE_PATH", "Data/cache/tmdb_cache.sqlite")
+CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_TTL = 24 * 3600
+
+# Per-endpoint TTLs in seconds, first matching pattern wins
+ENDPOINT_TTLS: List[Tuple[str, int]] = [
+    (r"/discover/movie$", 6 * 3600),        # discover rankings move daily
+    (r"/movie/changes$", 0),                # never cache the change feed
+    (r"/movie/\d+/credits$", 7 * 24 * 3600),
+    (r"/movie/\d+$", 24 * 3600),
+    (r"/search/movie$", 7 * 24 * 3600),
+]
+
+
+class ResponseCache:
+    """On-disk (SQLite) cache of JSON API responses with per-endpoint TTLs and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttls: Optional[List[Tuple[str, int]]] = None,
+        default_ttl: int = DEFAULT_TTL
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or ENDPOINT_TTLS)]
+        self.logger = logging.getLogger(__name__)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # One connection shared by all worker threads, serialized with a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict]) -> str:
+        """Build a cache key from the URL and query params, leaving out the api_key"""
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if k != "api_key")
+        return f"{url}?{urlencode(items)}"
+
+    def ttl_for(self, url: str) -> int:
+        """Return the TTL in seconds for the endpoint behind this URL"""
+        path = urlparse(url).path
+        for pattern, ttl in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return self.default_ttl
+
+    def get(self, url: str, params: Optional[Dict]) -> Optional[Dict]:
+        """Return the cached payload, or None on a miss or an expired entry"""
+        if self.ttl_for(url) <= 0:
+            return None
+
+        key = self.make_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, url: str, params: Optional[Dict], data: Dict) -> None:
+        """Store a payload and evict least recently used entries when over the size cap"""
+        ttl = self.ttl_for(url)
+        if ttl <= 0:
+            return
+
+        key = self.make_key(url, params)
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, body, size, now + ttl, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes (caller holds the lock)"""
+        target = int(self.max_bytes * 0.9)  # leave some headroom so we don't evict on every insert
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC")
+        victims = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total_bytes
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,162 @@
+import os
+import csv
+import heapq
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from utils import CSV_FIELDNAMES, COMPARE_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Rows held in memory per sorted run before spilling to a temporary file
+SORT_RUN_ROWS = int(os.getenv("CHANGE_SORT_RUN_ROWS", "100000"))
+# Sidecar next to each raw extract: "tmdb_id<TAB>hash" lines sorted by tmdb_id (as a string)
+HASH_INDEX_SUFFIX = ".hashes"
+
+_ID = CSV_FIELDNAMES.index('tmdb_id')
+_FLAG = CSV_FIELDNAMES.index('is_data_updated')
+_COMPARE = [CSV_FIELDNAMES.index(key) for key in COMPARE_KEYS]
+
+
+def hash_index_path(output_path: str) -> str:
+    return f"{output_path}{HASH_INDEX_SUFFIX}"
+
+
+def record_hash(values: List[str]) -> str:
+    """Content hash of a CSV row (list in CSV_FIELDNAMES order) over COMPARE_KEYS
+
+    Values are compared as they read back from the CSV, stripped, the same
+    way compare_movie_records compares them.
+    """
+    content = '\x1f'.join(values[i].strip() if i < len(values) else '' for i in _COMPARE)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _write_run(rows: List[List[str]], directory: str) -> str:
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+
+def _read_run(path: str) -> Iterator[List[str]]:
+    with open(path, encoding='utf-8', newline='') as f:
+        yield from csv.reader(f)
+
+
+def external_sort(items: Iterable[List[str]], run_rows: int = SORT_RUN_ROWS, directory: Optional[str] = None) -> Iterator[List[str]]:
+    """Sort rows by their first column with bounded memory
+
+    Rows are sorted in runs of run_rows, spilled to temporary CSV files and
+    merged back lazily; a single run never touches the disk. The sort is
+    stable, so rows with the same key keep their input order.
+    """
+    key = lambda row: row[0]
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        runs = []
+        buffer = []
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= run_rows:
+                buffer.sort(key=key)
+                runs.append(_write_run(buffer, tmp_dir))
+                buffer = []
+        buffer.sort(key=key)
+        if not runs:
+            yield from buffer
+            return
+        if buffer:
+            runs.append(_write_run(buffer, tmp_dir))
+            buffer = []
+        yield from heapq.merge(*(_read_run(run) for run in runs), key=key)
+
+
+def _csv_rows(path: str) -> Iterator[List[str]]:
+    """Data rows of a raw extract, padded to CSV_FIELDNAMES, in tmdb_id-first order"""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        # Older files may have a different column order, map them onto CSV_FIELDNAMES
+        positions = [header.index(name) if name in header else None for name in CSV_FIELDNAMES]
+        for row in reader:
+            values = [row[p] if p is not None and p < len(row) else '' for p in positions]
+            # tmdb_id first so external_sort sorts on it
+            yield [values[_ID]] + values
+
+
+def iter_previous_hashes(output_path: str, directory: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (tmdb_id, hash) of the previous extract sorted by tmdb_id
+
+    Reads the sidecar index; when an older extract has none, the index is
+    rebuilt from the CSV on the fly.
+    """
+    index_path = hash_index_path(output_path)
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            for line in f:
+                tmdb_id, _, digest = line.rstrip('\n').partition('\t')
+                yield tmdb_id, digest
+        return
+    if not os.path.exists(output_path):
+        return
+    logger.info(f"No hash index for {output_path}, building it from the previous extract")
+    pairs = ([row[0], record_hash(row[1:])] for row in _csv_rows(output_path))
+    for tmdb_id, digest in external_sort(pairs, directory=directory):
+        yield tmdb_id, digest
+
+
+def merge_changes(rows: Iterable[List[str]], previous: Iterable[Tuple[str, str]]) -> Iterator[Tuple[List[str], str]]:
+    """Flag each row against the previous hashes in one pass over both, sorted by tmdb_id
+
+    Sets is_data_updated on every row (True for new ids and changed content)
+    and yields (row, hash).
+    """
+    previous = iter(previous)
+    current = next(previous, None)
+    for row in rows:
+        tmdb_id = row[_ID]
+        while current is not None and current[0] < tmdb_id:
+            current = next(previous, None)
+        digest = record_hash(row)
+        unchanged = bool(tmdb_id) and current is not None and current[0] == tmdb_id and current[1] == digest
+        row[_FLAG] = str(not unchanged)
+        yield row, digest
+
+
+def finalize_extract(part_path: str, output_path: str, run_rows: int = SORT_RUN_ROWS) -> Dict[str, int]:
+    """Write part_path to output_path sorted by tmdb_id with is_data_updated set, and refresh the hash index
+
+    The part file is sorted externally and merged against the previous
+    index, so memory stays bounded by run_rows whatever the extract size.
+    """
+    directory = os.path.dirname(output_path) or None
+    index_path = hash_index_path(output_path)
+    tmp_output = f"{output_path}.tmp"
+    tmp_index = f"{index_path}.tmp"
+
+    sorted_rows = (row[1:] for row in external_sort(_csv_rows(part_path), run_rows, directory))
+    counts = {'rows': 0, 'updated': 0}
+    with open(tmp_output, 'w', encoding='utf-8', newline='') as out, open(tmp_index, 'w', encoding='utf-8') as index:
+        writer = csv.writer(out)
+        writer.writerow(CSV_FIELDNAMES)
+        pending = None
+        for row, digest in merge_changes(sorted_rows, iter_previous_hashes(output_path, directory)):
+            writer.writerow(row)
+            counts['rows'] += 1
+            counts['updated'] += row[_FLAG] == 'True'
+            if not row[_ID]:
+                continue
+            # One index line per id, the last row of an id wins
+            if pending is not None and pending[0] != row[_ID]:
+                index.write(f"{pending[0]}\t{pending[1]}\n")
+            pending = (row[_ID], digest)
+        if pending is not None:
+            index.write(f"{pending[0]}\t{pending[1]}\n")
+
+    os.replace(tmp_output, output_path)
+    os.replace(tmp_index, index_path)
+    os.remove(part_path)
+    return counts
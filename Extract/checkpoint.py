@@ -0,0 +1,82 @@
+import os
+import csv
+import logging
+from typing import Dict, Optional, Set
+from utils import CSV_FIELDNAMES
+from change_detection import finalize_extract
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointedCSVWriter:
+    """Stream records to `<output>.part` and log each finished key to `<output>.checkpoint`
+
+    Records are flushed one by one, so a crash only loses the records still
+    in flight. With resume=True an existing part file is kept and the keys in
+    the checkpoint are exposed through `done`, so the caller can skip them.
+    commit() replaces the output with the part file sorted by tmdb_id, with
+    is_data_updated set by a sort-merge against the previous extract's hash
+    index (see change_detection), and removes the checkpoint. Leaving the
+    `with` block without commit() keeps both files for a later resume.
+    """
+
+    def __init__(self, output_path: str, resume: bool = False):
+        self.output_path = output_path
+        self.part_path = f"{output_path}.part"
+        self.checkpoint_path = f"{output_path}.checkpoint"
+        self.done: Set[str] = set()
+        self.written = 0
+
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        if resume and os.path.exists(self.part_path) and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+            logger.info(f"Resuming {output_path}: {len(self.done)} records already fetched")
+        else:
+            for path in (self.part_path, self.checkpoint_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self._part = open(self.part_path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._part, fieldnames=CSV_FIELDNAMES)
+        if self._part.tell() == 0:
+            self._writer.writeheader()
+        self._checkpoint = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+    def write(self, key, record: Optional[Dict]) -> None:
+        """Append a record (if any) and mark its key as done"""
+        if record:
+            self._writer.writerow(record)
+            self._part.flush()
+            self.written += 1
+        key = str(key)
+        self._checkpoint.write(f"{key}\n")
+        self._checkpoint.flush()
+        self.done.add(key)
+
+    def close(self) -> None:
+        for f in (self._part, self._checkpoint):
+            if not f.closed:
+                f.close()
+
+    def commit(self) -> None:
+        """Replace the output with the finished part file, flag changed rows and drop the checkpoint"""
+        self.close()
+        if not self.done:
+            # Keep the previous output rather than replacing it with an empty file
+            print(f"[WARNING] No data found to save at {self.output_path}.")
+            os.remove(self.part_path)
+            os.remove(self.checkpoint_path)
+            return
+        counts = finalize_extract(self.part_path, self.output_path)
+        os.remove(self.checkpoint_path)
+        print(f"[SUCCESS] Saved extract to {self.output_path} ({len(self.done)} records processed, "
+              f"{counts['updated']} of {counts['rows']} new or changed)")
+
+    def __enter__(self) -> "CheckpointedCSVWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
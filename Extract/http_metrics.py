@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+from collections import defaultdict, Counter
+from typing import Optional, Dict, List
+
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from requests.adapters import HTTPAdapter
+
+# Where and how extractors dump their metrics at the end of a run (override with environment variables)
+METRICS_DIR = os.getenv("HTTP_METRICS_DIR", "logs/metrics")
+# 'json' or 'prometheus' (text exposition format)
+METRICS_FORMAT = os.getenv("HTTP_METRICS_FORMAT", "json")
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Numeric path segments are collapsed so /movie/123 and /movie/456 share one endpoint
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_of(url: str, base_url: str = "") -> str:
+    """Reduce a request URL to its endpoint template, e.g. /movie/{id}/credits"""
+    path = url[len(base_url):] if base_url and url.startswith(base_url) else url
+    path = path.split('?', 1)[0]
+    return _ID_SEGMENT.sub('/{id}', path) or '/'
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class HttpMetrics:
+    """Thread-safe per-endpoint HTTP counters shared by every TMDb client
+
+    Records request counts, latencies, bytes received, retries, status codes,
+    cache hits, time spent waiting for a pooled connection and for a rate
+    limiter token. snapshot() returns everything as a dict, dump() writes it
+    as JSON or Prometheus text.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._latencies: Dict[str, List[float]] = defaultdict(list)
+            self._bytes: Dict[str, int] = defaultdict(int)
+            self._statuses: Dict[str, Counter] = defaultdict(Counter)
+            self._retries: Dict[str, Counter] = defaultdict(Counter)
+            self._cache_hits: Dict[str, int] = defaultdict(int)
+            self._pool_waits: List[float] = []
+            self._connections_created = 0
+            self._throttle_wait = 0.0
+
+    def record_request(self, endpoint: str, status, latency: float, nbytes: int = 0) -> None:
+        """Record one HTTP exchange, status is the status code or 'error' when no response came back"""
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+            self._bytes[endpoint] += nbytes
+            self._statuses[endpoint][str(status)] += 1
+
+    def record_retry(self, endpoint: str, reason: str, count: int = 1) -> None:
+        if count:
+            with self._lock:
+                self._retries[endpoint][reason] += count
+
+    def record_cache_hit(self, endpoint: str) -> None:
+        with self._lock:
+            self._cache_hits[endpoint] += 1
+
+    def record_pool_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._pool_waits.append(seconds)
+
+    def record_connection_created(self) -> None:
+        with self._lock:
+            self._connections_created += 1
+
+    def record_throttle_wait(self, seconds: float) -> None:
+        if seconds > 0:
+            with self._lock:
+                self._throttle_wait += seconds
+
+    @staticmethod
+    def _summary(values: List[float]) -> Dict:
+        ordered = sorted(values)
+        summary = {"count": len(ordered), "sum": sum(ordered)}
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = percentile(ordered, q)
+        summary["max"] = ordered[-1] if ordered else 0.0
+        return summary
+
+    def latency_summary(self, endpoint: Optional[str] = None) -> Dict:
+        """Latency count/sum/percentiles of one endpoint, or of every request when endpoint is None"""
+        with self._lock:
+            if endpoint is not None:
+                values = list(self._latencies.get(endpoint, []))
+            else:
+                values = [latency for latencies in self._latencies.values() for latency in latencies]
+        return self._summary(values)
+
+    def snapshot(self) -> Dict:
+        """Return all counters and latency summaries (seconds) as a JSON-ready dict"""
+        with self._lock:
+            endpoints = sorted(set(self._latencies) | set(self._cache_hits) | set(self._retries))
+            return {
+                "started_at": self.started_at,
+                "elapsed_seconds": time.time() - self.started_at,
+                "endpoints": {
+                    endpoint: {
+                        "requests": len(self._latencies[endpoint]),
+                        "latency_seconds": self._summary(self._latencies[endpoint]),
+                        "bytes_received": self._bytes[endpoint],
+                        "status_codes": dict(self._statuses[endpoint]),
+                        "retries": dict(self._retries[endpoint]),
+                        "cache_hits": self._cache_hits[endpoint],
+                    }
+                    for endpoint in endpoints
+                },
+                "pool": {
+                    "wait_seconds": self._summary(self._pool_waits),
+                    "connections_created": self._connections_created,
+                },
+                "rate_limiter_wait_seconds": self._throttle_wait,
+            }
+
+    def to_prometheus(self, prefix: str = "tmdb_http") -> str:
+        """Render the snapshot in the Prometheus text exposition format"""
+        snap = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_requests_total counter",
+            f"# TYPE {prefix}_request_duration_seconds summary",
+            f"# TYPE {prefix}_response_bytes_total counter",
+            f"# TYPE {prefix}_retries_total counter",
+            f"# TYPE {prefix}_cache_hits_total counter",
+        ]
+        for endpoint, stats in snap["endpoints"].items():
+            label = f'endpoint="{endpoint}"'
+            for status, count in sorted(stats["status_codes"].items()):
+                lines.append(f'{prefix}_requests_total{{{label},status="{status}"}} {count}')
+            latency = stats["latency_seconds"]
+            for q in QUANTILES:
+                lines.append(f'{prefix}_request_duration_seconds{{{label},quantile="{q}"}} {latency[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{{label}}} {latency["sum"]:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{{label}}} {latency["count"]}')
+            lines.append(f'{prefix}_response_bytes_total{{{label}}} {stats["bytes_received"]}')
+            for reason, count in sorted(stats["retries"].items()):
+                lines.append(f'{prefix}_retries_total{{{label},reason="{reason}"}} {count}')
+            lines.append(f'{prefix}_cache_hits_total{{{label}}} {stats["cache_hits"]}')
+
+        pool_wait = snap["pool"]["wait_seconds"]
+        lines.append(f"# TYPE {prefix}_pool_wait_seconds summary")
+        for q in QUANTILES:
+            lines.append(f'{prefix}_pool_wait_seconds{{quantile="{q}"}} {pool_wait[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f"{prefix}_pool_wait_seconds_sum {pool_wait['sum']:.6f}")
+        lines.append(f"{prefix}_pool_wait_seconds_count {pool_wait['count']}")
+        lines.append(f"# TYPE {prefix}_pool_connections_created_total counter")
+        lines.append(f"{prefix}_pool_connections_created_total {snap['pool']['connections_created']}")
+        lines.append(f"# TYPE {prefix}_rate_limiter_wait_seconds_total counter")
+        lines.append(f"{prefix}_rate_limiter_wait_seconds_total {snap['rate_limiter_wait_seconds']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, name: str, directory: str = METRICS_DIR, fmt: str = METRICS_FORMAT) -> str:
+        """Write the metrics to <directory>/<name>.json or .prom and return the path"""
+        os.makedirs(directory, exist_ok=True)
+        if fmt == "prometheus":
+            path = os.path.join(directory, f"{name}.prom")
+            content = self.to_prometheus()
+        else:
+            path = os.path.join(directory, f"{name}.json")
+            content = json.dumps(self.snapshot(), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+
+def _timed_pool_class(base, metrics: HttpMetrics):
+    """Subclass a urllib3 pool so that checking out a connection is timed"""
+
+    class TimedConnectionPool(base):
+        def _get_conn(self, timeout=None):
+            start = time.perf_counter()
+            try:
+                return super()._get_conn(timeout)
+            finally:
+                metrics.record_pool_wait(time.perf_counter() - start)
+
+        def _new_conn(self):
+            metrics.record_connection_created()
+            return super()._new_conn()
+
+    return TimedConnectionPool
+
+
+class InstrumentedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report pool wait time and new connections"""
+
+    def __init__(self, metrics: HttpMetrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _timed_pool_class(HTTPConnectionPool, self.metrics),
+            'https': _timed_pool_class(HTTPSConnectionPool, self.metrics),
+        }
+
+
+_shared_metrics: Optional[HttpMetrics] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_metrics() -> HttpMetrics:
+    """Return the process-wide metrics recorded by every TMDb client"""
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = HttpMetrics()
+        return _shared_metrics
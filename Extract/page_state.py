@@ -0,0 +1,38 @@
+import os
+import json
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def load_page_state(path: str) -> Dict[str, Dict[str, str]]:
+    """Return the stored HTTP validators (ETag / Last-Modified) of each scraped page URL"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable page state {path}: {e}")
+        return {}
+
+
+def save_page_state(path: str, state: Dict[str, Dict[str, str]]) -> None:
+    """Persist the validators of every page scraped successfully so far"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def conditional_headers(validators: Dict[str, str]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from stored validators"""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
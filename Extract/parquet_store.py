@@ -0,0 +1,67 @@
+import os
+import logging
+from typing import Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:  # pyarrow is only needed with DATA_FORMAT=parquet
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+# 'csv' (default) or 'parquet': also publish each raw extract as typed, partitioned Parquet
+DATA_FORMAT = os.getenv("DATA_FORMAT", "csv").lower()
+RAW_PARQUET_DIR = os.getenv("RAW_PARQUET_DIR", "Data/raw_parquet")
+
+# Explicit types of the raw extract columns (utils.CSV_FIELDNAMES), nothing is inferred
+RAW_SCHEMA = pa.schema([
+    ('tmdb_id', pa.int64()),
+    ('title', pa.string()),
+    ('budget', pa.int64()),
+    ('revenue', pa.int64()),
+    ('rating', pa.float64()),
+    ('vote_count', pa.int64()),
+    ('release_date', pa.string()),
+    ('original_language', pa.string()),
+    ('production_companies', pa.string()),
+    ('genres', pa.string()),
+    ('directors', pa.string()),
+    ('actors', pa.string()),
+    ('runtime', pa.int64()),
+    ('is_data_updated', pa.bool_()),
+]) if HAS_PYARROW else None
+
+
+def partition_dir(source: str, language: str, year: int, root: str = RAW_PARQUET_DIR) -> str:
+    """Hive-style partition directory, e.g. Data/raw_parquet/source=tmdb/language=ko/year=2024"""
+    return os.path.join(root, f"source={source}", f"language={language}", f"year={year}")
+
+
+def export_csv_to_parquet(csv_path: str, source: str, language: str, year: int, root: str = RAW_PARQUET_DIR) -> Optional[str]:
+    """Write a finished raw extract CSV to its Parquet partition with RAW_SCHEMA, returns the file path
+
+    The CSV stays in place: it is the extractor's checkpoint / change-detection
+    working file and the CSV export.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("DATA_FORMAT=parquet needs pyarrow, install it with `pip install pyarrow`")
+    if not os.path.exists(csv_path):
+        return None
+
+    table = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(column_types=RAW_SCHEMA, include_columns=RAW_SCHEMA.names,
+                                              include_missing_columns=True)
+    ).cast(RAW_SCHEMA)
+
+    directory = partition_dir(source, language, year, root)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, os.path.splitext(os.path.basename(csv_path))[0] + ".parquet")
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {table.num_rows} rows to {path}")
+    return path
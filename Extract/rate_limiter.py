@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Request budget shared by every TMDb client in the process (override with environment variables)
+RATE_LIMIT_PER_SECOND = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+RATE_LIMIT_BURST = int(os.getenv("TMDB_RATE_BURST", "40"))
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket that also supports a global pause (e.g. on HTTP 429)
+
+    Every request takes one token. Tokens refill at `rate` per second up to
+    `burst`. A call to pause() holds back every caller, sync or async, until
+    the pause has elapsed.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, burst: int = RATE_LIMIT_BURST):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Stop all callers for `seconds`, and restart from an empty bucket so they don't stampede"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+    def _pause_remaining(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def acquire(self) -> float:
+        """Block the calling thread until it may send a request, returns the seconds waited"""
+        waited = self.reserve()
+        time.sleep(waited)
+        # A pause may have started while we slept: wait it out, holding on to the token we took
+        while (remaining := self._pause_remaining()) > 0:
+            time.sleep(remaining)
+            waited += remaining
+        return waited
+
+    async def acquire_async(self) -> float:
+        """Suspend the calling task until it may send a request, returns the seconds waited"""
+        waited = self.reserve()
+        await asyncio.sleep(waited)
+        while (remaining := self._pause_remaining()) > 0:
+            await asyncio.sleep(remaining)
+            waited += remaining
+        return waited
+
+
+def parse_retry_after(value: Optional[str], default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+_shared_limiter: Optional[TokenBucketRateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> TokenBucketRateLimiter:
+    """Return the process-wide limiter used by every TMDb client"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucketRateLimiter()
+        return _shared_limiter
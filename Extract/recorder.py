@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+import threading
+from typing import Optional, Dict, Tuple
+
+# 'off', 'record' (append every response to the recordings file) or 'replay' (serve only recorded responses)
+RECORD_MODE = os.getenv("TMDB_RECORD_MODE", "off").lower()
+RECORDINGS_PATH = os.getenv("TMDB_RECORDINGS_PATH", "Data/recordings/tmdb.jsonl")
+
+
+def relative_path(url: str, base_url: str) -> str:
+    """Path of a request below the API base URL, so recordings replay against any host"""
+    return url[len(base_url):] if url.startswith(base_url) else url
+
+
+def recording_key(path: str, params: Dict) -> str:
+    """Stable key of a request: its path and query params without the api key
+
+    Values are compared as query strings, so 1 and "1" or False and "false" match.
+    """
+    query = sorted(
+        (key, str(value).lower() if isinstance(value, bool) else str(value))
+        for key, value in params.items()
+        if value is not None and key != "api_key"
+    )
+    return json.dumps([path, query], separators=(",", ":"))
+
+
+def load_recordings(path: str) -> Dict[str, Dict]:
+    """Read a recordings file into {recording_key: body}, later lines win"""
+    recordings = {}
+    if not os.path.exists(path):
+        return recordings
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[recording_key(entry["path"], entry["params"])] = entry["body"]
+    return recordings
+
+
+class ResponseRecorder:
+    """Record TMDb responses to a JSON lines file, or replay them without touching the network
+
+    Each line is {"path", "params", "body"}; the same file can be served by
+    Benchmark/stub_server.py as fixtures.
+    """
+
+    def __init__(self, path: str = RECORDINGS_PATH, mode: str = RECORD_MODE):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.logger = logging.getLogger(__name__)
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+        if mode == "replay":
+            self._recordings = load_recordings(path)
+            self.logger.info(f"Replaying {len(self._recordings)} recorded responses from {path}")
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._recordings = {}
+            self._file = open(path, "a", encoding="utf-8")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def get(self, path: str, params: Dict) -> Tuple[bool, Optional[Dict]]:
+        """Return (found, body) of a recorded request"""
+        key = recording_key(path, params)
+        if key in self._recordings:
+            return True, self._recordings[key]
+        with self._lock:
+            self.misses += 1
+        self.logger.warning(f"No recorded response for {path} {params.get('query') or ''}".rstrip())
+        return False, None
+
+    def record(self, path: str, params: Dict, body: Dict) -> None:
+        """Append one response, the api key is never written"""
+        entry = {"path": path, "params": {k: v for k, v in params.items() if k != "api_key"}, "body": body}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+
+
+_shared_recorder: Optional[ResponseRecorder] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_recorder() -> Optional[ResponseRecorder]:
+    """Return the process-wide recorder, or None when TMDB_RECORD_MODE is off"""
+    global _shared_recorder
+    if RECORD_MODE == "off":
+        return None
+    with _shared_lock:
+        if _shared_recorder is None:
+            _shared_recorder = ResponseRecorder()
+        return _shared_recorder
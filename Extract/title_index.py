@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, Tuple
+from utils import normalize_title
+
+# Defaults (override with environment variables)
+INDEX_PATH = os.getenv("TITLE_INDEX_PATH", "Data/state/title_index.sqlite")
+OVERRIDES_PATH = os.getenv("TITLE_OVERRIDES_PATH", "Data/state/title_overrides.json")
+# Titles with no TMDb match are retried after this long, TMDb may have added them since
+NEGATIVE_TTL = 7 * 24 * 3600
+
+SOURCE_SEARCH = "search"
+SOURCE_MANUAL = "manual"
+
+
+class TitleResolutionIndex:
+    """Persistent (normalized_title, year) -> tmdb_id map used before searching TMDb
+
+    A tmdb_id of None is a negative entry: the title had no match. Manual
+    overrides are loaded from a JSON file of {"title", "year", "tmdb_id"}
+    objects; they never expire and are never replaced by search results.
+    """
+
+    def __init__(self, path: str = INDEX_PATH, overrides_path: Optional[str] = OVERRIDES_PATH, negative_ttl: int = NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS titles (
+                normalized_title TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                tmdb_id INTEGER,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (normalized_title, year)
+            )
+            """
+        )
+        self._conn.commit()
+
+        if overrides_path and os.path.exists(overrides_path):
+            self.load_overrides(overrides_path)
+
+    @staticmethod
+    def _key(title: str, year: Optional[int]) -> Tuple[str, int]:
+        return normalize_title(title), int(year or 0)
+
+    def load_overrides(self, overrides_path: str) -> None:
+        """Insert or replace manual entries from a JSON list"""
+        with open(overrides_path, encoding="utf-8") as f:
+            overrides = json.load(f)
+        now = time.time()
+        rows = [
+            (*self._key(item["title"], item.get("year")), item.get("tmdb_id"), SOURCE_MANUAL, now)
+            for item in overrides
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO titles (normalized_title, year, tmdb_id, source, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        self.logger.info(f"Loaded {len(rows)} manual title overrides from {overrides_path}")
+
+    def lookup(self, title: str, year: Optional[int]) -> Tuple[bool, Optional[int]]:
+        """Return (found, tmdb_id); found with tmdb_id None means a cached 'no match'"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tmdb_id, source, updated_at FROM titles WHERE normalized_title = ? AND year = ?",
+                self._key(title, year)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return False, None
+        tmdb_id, source, updated_at = row
+        if tmdb_id is None and source != SOURCE_MANUAL and time.time() - updated_at > self.negative_ttl:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, tmdb_id
+
+    def record(self, title: str, year: Optional[int], tmdb_id: Optional[int]) -> None:
+        """Store a search outcome (tmdb_id None for no match) unless a manual entry exists"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO titles (normalized_title, year, tmdb_id, source, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (normalized_title, year) DO UPDATE SET
+                    tmdb_id = excluded.tmdb_id, source = excluded.source, updated_at = excluded.updated_at
+                WHERE titles.source != ?
+                """,
+                (*self._key(title, year), tmdb_id, SOURCE_SEARCH, time.time(), SOURCE_MANUAL)
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and index size"""
+        with self._lock:
+            entries, negatives = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tmdb_id IS NULL), 0) FROM titles"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "negative_entries": negatives}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,16 +1,29 @@
 import os
 import time
+import asyncio
 import logging
-from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, date
+from typing import List, Dict, Optional, Set, Tuple, Iterator, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from api_client import TMDbAPIClient
-from utils import save_movies_to_csv, extract_names, format_actors, load_movies_from_csv, compare_movie_records
+from async_api_client import AsyncTMDbAPIClient
+from checkpoint import CheckpointedCSVWriter
+from watermark import load_watermark, save_watermark, changes_window
+from http_metrics import get_shared_metrics
+from parquet_store import DATA_FORMAT, export_csv_to_parquet
+from utils import extract_names, format_actors, load_previous_records, CSV_FIELDNAMES
 
 # Constants
 FILTER_YEAR = 2024
 MAX_PAGES = 10
 MAX_WORKERS = 50  # Match this to the connection pool size in api_client.py
+MAX_CONCURRENCY = 100  # In-flight requests in async mode, see async_api_client.MAX_CONNECTIONS
 OUTPUT_DIR = "Data/raw_data/tmdb/"
+# Keep the part/checkpoint files of an interrupted run and skip ids it already fetched
+RESUME = os.getenv("EXTRACT_RESUME", "false").lower() in ("1", "true", "yes")
+# Only fetch details for new movies and for movies listed by /movie/changes since the last run
+INCREMENTAL = os.getenv("EXTRACT_INCREMENTAL", "false").lower() in ("1", "true", "yes")
+WATERMARK_PATH = "Data/state/tmdb_watermark.json"
 
 # Configure logging
 os.makedirs("logs", exist_ok=True)
@@ -24,54 +37,95 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def discover_params(api_key: str, language_code: str, page: int) -> Dict:
+    """Query params for one /discover/movie page"""
+    return {
+        'api_key': api_key,
+        'language': 'en-US',
+        'page': page,
+        'with_original_language': language_code,
+        'primary_release_date.gte': f'{FILTER_YEAR}-01-01',
+        'primary_release_date.lte': f'{FILTER_YEAR}-12-31'
+    }
+
+def changes_params(api_key: str, start_date: date, end_date: date, page: int) -> Dict:
+    """Query params for one /movie/changes page"""
+    return {
+        'api_key': api_key,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'page': page
+    }
+
 class TMDbMovieFetcher:
-    """Handles fetching movies from TMDb discover API"""
+    """Handles fetching movies from TMDb discover API
+
+    Discover pages and movie details all run on one shared thread pool, so
+    several languages can be fetched at once without multiplying threads.
+    """
 
-    def __init__(self):
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pages: int = MAX_PAGES):
         self.api_client = TMDbAPIClient()
+        self.max_pages = max_pages
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self) -> None:
+        """Shut down the shared worker pool"""
+        self.executor.shutdown(wait=True)
+
+    def fetch_discover_page(self, language_code: str, page: int) -> Optional[Dict]:
+        """Fetch one /discover/movie page"""
+        logger.info(f"Fetching discover page {page} for language '{language_code}'...")
+        url = f"{self.api_client.base_url}/discover/movie"
+        params = discover_params(self.api_client.api_key, language_code, page)
+        return self.api_client.make_request_with_retries(url, params)
+
+    def _page_count(self, language_code: str, first_page: Dict) -> int:
+        total_pages = min(first_page.get('total_pages', 1), self.max_pages)
+        logger.info(f"Total pages to fetch for '{language_code}': {total_pages}")
+        return total_pages
+
+    @staticmethod
+    def _movie_tuples(data: Optional[Dict], skip_ids: Optional[Set[str]] = None) -> List[tuple]:
+        """Return (movie, movie_id) tuples from a discover page, leaving out skip_ids"""
+        if not data:
+            return []
+        return [
+            (movie, movie['id']) for movie in data.get('results', [])
+            if movie.get('id') and (not skip_ids or str(movie['id']) not in skip_ids)
+        ]
 
     def discover_movies_by_language(self, language_code: str) -> List[tuple]:
-        """Discover movies by language and return list of (movie, movie_id) tuples"""
-        movie_ids = []
-        page = 1
-        total_pages = 1
+        """Discover movies by language and return list of (movie, movie_id) tuples
 
+        Page 1 gives total_pages, the remaining pages are then fetched concurrently.
+        """
         logger.info(f"Starting discovery for language: {language_code}")
 
-        while page <= total_pages and page <= MAX_PAGES:
-            logger.info(f"Fetching page {page} of {total_pages} for language '{language_code}'...")
-
-            url = f"{self.api_client.base_url}/discover/movie"
-            params = {
-                'api_key': self.api_client.api_key,
-                'language': 'en-US',
-                'page': page,
-                'with_original_language': language_code,
-                'primary_release_date.gte': f'{FILTER_YEAR}-01-01',
-                'primary_release_date.lte': f'{FILTER_YEAR}-12-31'
-            }
-
-            data = self.api_client.make_request_with_retries(url, params)
-            if data is None:
-                break
-
-            if page == 1:
-                total_pages = data.get('total_pages', 1)
-                logger.info(f"Total pages to fetch for '{language_code}': {total_pages}")
+        first_page = self.fetch_discover_page(language_code, 1)
+        if first_page is None:
+            return []
 
-            for movie in data.get('results', []):
-                movie_id = movie.get('id')
-                if movie_id:
-                    movie_ids.append((movie, movie_id))
-            page += 1
+        movie_ids = self._movie_tuples(first_page)
+        total_pages = self._page_count(language_code, first_page)
+        pages = self.executor.map(
+            lambda page: self.fetch_discover_page(language_code, page),
+            range(2, total_pages + 1)
+        )
+        for data in pages:
+            movie_ids.extend(self._movie_tuples(data))
 
         return movie_ids
 
-    def process_movie_details(self, movie_tuple: tuple) -> Dict:
-        """Process individual movie to get full details"""
+    def process_movie_details(self, movie_tuple: tuple, refresh: bool = False) -> Dict:
+        """Process individual movie to get full details, refresh=True bypasses the response cache"""
         movie, movie_id = movie_tuple
-        details = self.api_client.get_movie_full_details(movie_id)
+        details = self.api_client.get_movie_full_details(movie_id, refresh)
+        return self.build_movie_record(movie, movie_id, details)
 
+    @staticmethod
+    def build_movie_record(movie: Dict, movie_id: int, details: Dict) -> Dict:
+        """Flatten a discover result and its full details into one CSV row"""
         production_companies = extract_names(details.get('production_companies', []), 'name')
         genres = extract_names(details.get('genres', []), 'name')
         actors = format_actors(details.get('actors',[]))
@@ -92,65 +146,379 @@ class TMDbMovieFetcher:
             'runtime': details.get('runtime')
         }
 
+    @staticmethod
+    def refresh_record(movie: Dict, movie_id: int, previous: Dict) -> Dict:
+        """Reuse the detail fields of a previous CSV row, refreshing what the discover result carries"""
+        record = {key: previous.get(key) for key in CSV_FIELDNAMES if key != 'is_data_updated'}
+        record.update({
+            'tmdb_id': movie_id,
+            'title': movie.get('title'),
+            'rating': movie.get('vote_average'),
+            'vote_count': movie.get('vote_count'),
+            'release_date': movie.get('release_date'),
+            'original_language': movie.get('original_language')
+        })
+        return record
+
+    def fetch_changed_movie_ids(self, start_date: date, end_date: date) -> Optional[Set[str]]:
+        """Return the ids of every movie TMDb reports as changed in the window, or None on failure"""
+        url = f"{self.api_client.base_url}/movie/changes"
+
+        def fetch_page(page: int) -> Optional[Dict]:
+            return self.api_client.make_request_with_retries(
+                url, changes_params(self.api_client.api_key, start_date, end_date, page)
+            )
+
+        first_page = fetch_page(1)
+        if first_page is None:
+            logger.warning("Could not read /movie/changes, running a full extraction")
+            return None
+        pages = [first_page] + list(self.executor.map(fetch_page, range(2, first_page.get('total_pages', 1) + 1)))
+        if any(page is None for page in pages):
+            logger.warning("Could not read /movie/changes, running a full extraction")
+            return None
+
+        changed = {str(item['id']) for page in pages for item in page.get('results', []) if item.get('id')}
+        logger.info(f"{len(changed)} movies changed between {start_date} and {end_date}")
+        return changed
+
+    def iter_movies(
+        self,
+        language_code: str,
+        skip_ids: Optional[Set[str]] = None,
+        previous_records: Optional[Dict[str, Dict]] = None,
+        refresh_ids: Optional[Set[str]] = None
+    ) -> Iterator[Dict]:
+        """Yield movie records as they complete
+
+        Detail fetches for a discover page are submitted as soon as that page
+        lands, so they overlap with the remaining discover requests. Movies
+        whose id is in skip_ids (e.g. from a checkpoint) are not fetched.
+        Movies found in previous_records are rebuilt from that row without
+        any detail request. Movies in refresh_ids (e.g. reported by
+        /movie/changes) fetch their details past the response cache.
+        """
+        skip_ids = skip_ids or set()
+        previous_records = previous_records or {}
+        refresh_ids = refresh_ids or set()
+        logger.info(f"Starting discovery for language: {language_code}")
+
+        first_page = self.fetch_discover_page(language_code, 1)
+        if first_page is None:
+            return
+
+        pending = {
+            self.executor.submit(self.fetch_discover_page, language_code, page): 'page'
+            for page in range(2, self._page_count(language_code, first_page) + 1)
+        }
+        discovered = [self._movie_tuples(first_page, skip_ids)]
+
+        while discovered or pending:
+            for tuples in discovered:
+                for movie, movie_id in tuples:
+                    previous = previous_records.get(str(movie_id))
+                    if previous is not None:
+                        yield self.refresh_record(movie, movie_id, previous)
+                    else:
+                        pending[self.executor.submit(self.process_movie_details, (movie, movie_id), str(movie_id) in refresh_ids)] = 'details'
+            discovered = []
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    logger.error(f"Exception occurred during {kind} fetch: {exc}")
+                    continue
+
+                if kind == 'page':
+                    discovered.append(self._movie_tuples(result, skip_ids))
+                else:
+                    yield result
+
     def fetch_movies(self, language_code: str) -> List[Dict]:
         """Main method to fetch and process movies"""
-        movie_ids = self.discover_movies_by_language(language_code)
-        movies = []
+        return list(self.iter_movies(language_code))
 
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [executor.submit(self.process_movie_details, tup) for tup in movie_ids]
+class AsyncTMDbMovieFetcher:
+    """asyncio variant of TMDbMovieFetcher driven by AsyncTMDbAPIClient"""
+
+    build_movie_record = staticmethod(TMDbMovieFetcher.build_movie_record)
+    refresh_record = staticmethod(TMDbMovieFetcher.refresh_record)
+    _movie_tuples = staticmethod(TMDbMovieFetcher._movie_tuples)
+    _page_count = TMDbMovieFetcher._page_count
+
+    def __init__(self, api_client: AsyncTMDbAPIClient, max_concurrency: int = MAX_CONCURRENCY, max_pages: int = MAX_PAGES):
+        self.api_client = api_client
+        self.max_pages = max_pages
+        # Shared by every language running on this fetcher
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_discover_page(self, language_code: str, page: int) -> Optional[Dict]:
+        """Fetch one /discover/movie page"""
+        logger.info(f"Fetching discover page {page} for language '{language_code}'...")
+        url = f"{self.api_client.base_url}/discover/movie"
+        params = discover_params(self.api_client.api_key, language_code, page)
+        async with self.semaphore:
+            return await self.api_client.make_request_with_retries(url, params)
+
+    async def discover_movies_by_language(self, language_code: str) -> List[tuple]:
+        """Discover movies by language and return list of (movie, movie_id) tuples
+
+        Page 1 gives total_pages, the remaining pages are then fetched concurrently.
+        """
+        logger.info(f"Starting discovery for language: {language_code}")
+
+        first_page = await self.fetch_discover_page(language_code, 1)
+        if first_page is None:
+            return []
+
+        movie_ids = self._movie_tuples(first_page)
+        total_pages = self._page_count(language_code, first_page)
+        pages = await asyncio.gather(
+            *(self.fetch_discover_page(language_code, page) for page in range(2, total_pages + 1))
+        )
+        for data in pages:
+            movie_ids.extend(self._movie_tuples(data))
+
+        return movie_ids
 
-            for future in as_completed(futures):
+    async def process_movie_details(self, movie_tuple: tuple, refresh: bool = False) -> Dict:
+        """Process individual movie to get full details, refresh=True bypasses the response cache"""
+        movie, movie_id = movie_tuple
+        async with self.semaphore:
+            details = await self.api_client.get_movie_full_details(movie_id, refresh)
+        return self.build_movie_record(movie, movie_id, details)
+
+    async def fetch_changed_movie_ids(self, start_date: date, end_date: date) -> Optional[Set[str]]:
+        """Return the ids of every movie TMDb reports as changed in the window, or None on failure"""
+        url = f"{self.api_client.base_url}/movie/changes"
+
+        async def fetch_page(page: int) -> Optional[Dict]:
+            params = changes_params(self.api_client.api_key, start_date, end_date, page)
+            async with self.semaphore:
+                return await self.api_client.make_request_with_retries(url, params)
+
+        first_page = await fetch_page(1)
+        if first_page is None:
+            logger.warning("Could not read /movie/changes, running a full extraction")
+            return None
+        pages = [first_page] + list(await asyncio.gather(
+            *(fetch_page(page) for page in range(2, first_page.get('total_pages', 1) + 1))
+        ))
+        if any(page is None for page in pages):
+            logger.warning("Could not read /movie/changes, running a full extraction")
+            return None
+
+        changed = {str(item['id']) for page in pages for item in page.get('results', []) if item.get('id')}
+        logger.info(f"{len(changed)} movies changed between {start_date} and {end_date}")
+        return changed
+
+    async def iter_movies(
+        self,
+        language_code: str,
+        skip_ids: Optional[Set[str]] = None,
+        previous_records: Optional[Dict[str, Dict]] = None,
+        refresh_ids: Optional[Set[str]] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield movie records as they complete, starting detail fetches as each discover page lands
+
+        See TMDbMovieFetcher.iter_movies for skip_ids, previous_records and refresh_ids.
+        """
+        skip_ids = skip_ids or set()
+        previous_records = previous_records or {}
+        refresh_ids = refresh_ids or set()
+        logger.info(f"Starting discovery for language: {language_code}")
+
+        first_page = await self.fetch_discover_page(language_code, 1)
+        if first_page is None:
+            return
+
+        pending = {
+            asyncio.create_task(self.fetch_discover_page(language_code, page)): 'page'
+            for page in range(2, self._page_count(language_code, first_page) + 1)
+        }
+        discovered = [self._movie_tuples(first_page, skip_ids)]
+
+        while discovered or pending:
+            for tuples in discovered:
+                for movie, movie_id in tuples:
+                    previous = previous_records.get(str(movie_id))
+                    if previous is not None:
+                        yield self.refresh_record(movie, movie_id, previous)
+                    else:
+                        pending[asyncio.create_task(self.process_movie_details((movie, movie_id), str(movie_id) in refresh_ids))] = 'details'
+            discovered = []
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind = pending.pop(task)
                 try:
-                    result = future.result()
-                    movies.append(result)
+                    result = task.result()
                 except Exception as exc:
-                    logger.error(f"Exception occurred during detail fetch: {exc}")
+                    logger.error(f"Exception occurred during {kind} fetch: {exc}")
+                    continue
+
+                if kind == 'page':
+                    discovered.append(self._movie_tuples(result, skip_ids))
+                else:
+                    yield result
 
-        return movies
+    async def fetch_movies(self, language_code: str) -> List[Dict]:
+        """Main method to fetch and process movies with at most max_concurrency requests in flight"""
+        return [movie async for movie in self.iter_movies(language_code)]
 
-def fetch_and_save_movies(language_code: str) -> None:
-    """Fetch movies and save to CSV"""
+def reusable_records(output_path: str, changed_ids: Optional[Set[str]]) -> Dict[str, Dict]:
+    """Previous rows that can be reused as-is: everything TMDb did not report as changed
+
+    Only incremental runs (changed_ids given) read the previous extract at all;
+    is_data_updated is decided by the writer's hash-index merge.
+    """
+    if changed_ids is None:
+        return {}
+    return {key: row for key, row in load_previous_records(output_path).items() if key not in changed_ids}
+
+def fetch_and_save_movies(
+    language_code: str,
+    fetcher: Optional[TMDbMovieFetcher] = None,
+    resume: bool = RESUME,
+    changed_ids: Optional[Set[str]] = None
+) -> None:
+    """Fetch movies and stream them to CSV as they complete, checkpointing each tmdb_id
+
+    When changed_ids is given (incremental run), details are only fetched for
+    new movies and for those ids; other known movies reuse their previous row.
+    Changed movies skip the response cache, it may still hold the old details.
+    """
     start_time = time.time()
 
     output_file = f"{language_code}_movies_{FILTER_YEAR}.csv"
     output_path = os.path.join(OUTPUT_DIR, output_file)
 
-    fetcher = TMDbMovieFetcher()
-    movies = fetcher.fetch_movies(language_code)
+    # Previous rows to reuse on incremental runs
+    previous_records = reusable_records(output_path, changed_ids)
 
-    # Load previous data
-    prev_movies = load_movies_from_csv(output_path)
-    prev_map = {}
-    for m in prev_movies:
-        key = m.get('tmdb_id')
-        prev_map[key] = m
-
-    compare_keys = [
-        'title', 'budget', 'revenue', 'rating', 'vote_count', 'genres'
-    ]
-    for m in movies:
-        key = m.get('tmdb_id')
-        old = prev_map.get(str(key))
-        if old:
-            m['is_data_updated'] = compare_movie_records(m, old, compare_keys)
-        else:
-            m['is_data_updated'] = True
-
-    save_movies_to_csv(movies, output_path)
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = TMDbMovieFetcher()
+    try:
+        with CheckpointedCSVWriter(output_path, resume=resume) as writer:
+            for movie in fetcher.iter_movies(language_code, skip_ids=writer.done, previous_records=previous_records,
+                                             refresh_ids=changed_ids):
+                writer.write(movie['tmdb_id'], movie)
+            writer.commit()
+    finally:
+        if own_fetcher:
+            fetcher.close()
+    if DATA_FORMAT == "parquet":
+        export_csv_to_parquet(output_path, "tmdb", language_code, FILTER_YEAR)
 
     end_time = time.time()
     total_time = end_time - start_time
     logger.info(f"Total time taken to fetch and save movies for '{language_code}': {total_time:.2f} seconds")
 
-def main():
-    """Main function"""
+async def fetch_and_save_movies_async(
+    fetcher: AsyncTMDbMovieFetcher,
+    language_code: str,
+    resume: bool = RESUME,
+    changed_ids: Optional[Set[str]] = None
+) -> None:
+    """Fetch movies with the async client and stream them to CSV, checkpointing each tmdb_id"""
+    start_time = time.time()
+
+    output_file = f"{language_code}_movies_{FILTER_YEAR}.csv"
+    output_path = os.path.join(OUTPUT_DIR, output_file)
+
+    previous_records = reusable_records(output_path, changed_ids)
+
+    with CheckpointedCSVWriter(output_path, resume=resume) as writer:
+        async for movie in fetcher.iter_movies(language_code, skip_ids=writer.done, previous_records=previous_records,
+                                               refresh_ids=changed_ids):
+            writer.write(movie['tmdb_id'], movie)
+        writer.commit()
+    if DATA_FORMAT == "parquet":
+        export_csv_to_parquet(output_path, "tmdb", language_code, FILTER_YEAR)
+
+    total_time = time.time() - start_time
+    logger.info(f"Total time taken to fetch and save movies for '{language_code}': {total_time:.2f} seconds")
+
+def incremental_window(incremental: bool) -> Optional[Tuple[date, date]]:
+    """Return the /movie/changes window for an incremental run, None means fetch everything"""
+    if not incremental:
+        return None
+    window = changes_window(load_watermark(WATERMARK_PATH))
+    if window is None:
+        logger.info("No watermark within the /movie/changes window, running a full extraction")
+    return window
+
+async def main_async(languages: List[str], resume: bool = RESUME, incremental: bool = INCREMENTAL) -> None:
+    """Run every language concurrently over one shared aiohttp session"""
+    async with AsyncTMDbAPIClient() as api_client:
+        fetcher = AsyncTMDbMovieFetcher(api_client)
+
+        window = incremental_window(incremental)
+        changed_ids = await fetcher.fetch_changed_movie_ids(*window) if window else None
+
+        results = await asyncio.gather(
+            *(fetch_and_save_movies_async(fetcher, lang, resume, changed_ids) for lang in languages),
+            return_exceptions=True
+        )
+        for lang, result in zip(languages, results):
+            if isinstance(result, Exception):
+                raise RuntimeError(f"Extraction failed for language '{lang}'") from result
+        if api_client.cache is not None:
+            logger.info(f"Response cache stats: {api_client.cache.stats()}")
+
+def main(mode: str = "threads", resume: bool = RESUME, incremental: bool = INCREMENTAL):
+    """Main function, mode is 'threads' (ThreadPoolExecutor) or 'async' (asyncio + aiohttp)
+
+    All languages run concurrently and share one worker pool / session.
+    With resume=True, ids checkpointed by an interrupted run are not fetched again.
+    With incremental=True, only new movies and movies changed since the last
+    successful run (per /movie/changes) get a detail fetch. Runs with no usable
+    watermark, or one older than the changes window, fall back to a full fetch.
+    """
     languages = ['hi', 'ko', 'ja', 'th', 'tl']  # Add more languages as needed: ['hi', 'ko', 'jp', 'th', 'tl']
+    start_time = time.time()
+    run_started = datetime.now(timezone.utc)
+    logger.info("=" * 40)
+
+    # Per-endpoint HTTP metrics of this run, dumped even when it fails
+    metrics = get_shared_metrics()
+    metrics.reset()
+    try:
+        if mode == "async":
+            asyncio.run(main_async(languages, resume, incremental))
+        else:
+            fetcher = TMDbMovieFetcher()
+            try:
+                window = incremental_window(incremental)
+                changed_ids = fetcher.fetch_changed_movie_ids(*window) if window else None
+
+                # One thread per language to drive it, the HTTP work runs on the fetcher's shared pool
+                with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+                    futures = {
+                        executor.submit(fetch_and_save_movies, lang, fetcher, resume, changed_ids): lang
+                        for lang in languages
+                    }
+                    for future in as_completed(futures):
+                        future.result()
+            finally:
+                fetcher.close()
+            if fetcher.api_client.cache is not None:
+                logger.info(f"Response cache stats: {fetcher.api_client.cache.stats()}")
+    finally:
+        logger.info(f"HTTP metrics written to {metrics.dump('tmdb_http')}")
 
-    for lang in languages:
-        logger.info("=" * 40)
-        fetch_and_save_movies(lang)
-        logger.info("=" * 40)
+    # Only a run where every language succeeded moves the watermark forward
+    save_watermark(WATERMARK_PATH, run_started)
+    logger.info(f"Total time taken for all languages: {time.time() - start_time:.2f} seconds")
+    logger.info("=" * 40)
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,15 @@ import os
 import re
 from typing import List, Dict
 
+CSV_FIELDNAMES = [
+    'tmdb_id', 'title', 'budget', 'revenue', 'rating', 'vote_count',
+    'release_date', 'original_language', 'production_companies',
+    'genres', 'directors', 'actors', 'runtime', 'is_data_updated'
+]
+
+# Fields that decide whether a record changed since the previous extract
+COMPARE_KEYS = ['title', 'budget', 'revenue', 'rating', 'vote_count', 'genres']
+
 def load_movies_from_csv(input_path: str) -> List[Dict]:
     """Load movies from a CSV file into a list of dicts."""
     if not os.path.exists(input_path):
@@ -18,6 +27,17 @@ def compare_movie_records(new: Dict, old: Dict, keys: List[str]) -> bool:
             return True
     return False
 
+def load_previous_records(input_path: str) -> Dict[str, Dict]:
+    """Load the previous extract keyed by tmdb_id (as str)."""
+    return {m.get('tmdb_id'): m for m in load_movies_from_csv(input_path)}
+
+def is_record_updated(movie: Dict, prev_map: Dict[str, Dict]) -> bool:
+    """Return True if the movie is new or differs from its previous record."""
+    old = prev_map.get(str(movie.get('tmdb_id')))
+    if old:
+        return compare_movie_records(movie, old, COMPARE_KEYS)
+    return True
+
 def save_movies_to_csv(
     movies: List[Dict],
     output_path: str,
@@ -33,14 +53,8 @@ def save_movies_to_csv(
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     mode = 'a' if append else 'w'
     try:
-        fieldnames = [
-            'tmdb_id', 'title', 'budget', 'revenue', 'rating', 'vote_count',
-            'release_date', 'original_language', 'production_companies',
-            'genres', 'directors', 'actors', 'runtime', 'is_data_updated'
-        ]
-
         with open(output_path, mode, encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
             if not append or (append and f.tell() == 0):
                 writer.writeheader()
             writer.writerows(movies)
@@ -0,0 +1,48 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta, timezone, date
+from typing import Optional, Tuple
+
+# TMDb's /movie/changes accepts at most 14 days between start_date and end_date
+MAX_CHANGES_DAYS = 14
+
+logger = logging.getLogger(__name__)
+
+
+def load_watermark(path: str) -> Optional[datetime]:
+    """Return the start time of the last successful run, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return datetime.fromisoformat(json.load(f)['last_run'])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable watermark {path}: {e}")
+        return None
+
+
+def save_watermark(path: str, last_run: datetime) -> None:
+    """Persist the start time of a successful run"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'last_run': last_run.isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def changes_window(watermark: Optional[datetime], now: Optional[datetime] = None) -> Optional[Tuple[date, date]]:
+    """Return the (start_date, end_date) to query /movie/changes with, or None if a full run is needed
+
+    The window starts one day before the watermark so that edits made around
+    midnight of the last run are not missed.
+    """
+    if watermark is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    start = (watermark - timedelta(days=1)).date()
+    end = now.date()
+    if (end - start).days > MAX_CHANGES_DAYS:
+        return None
+    return start, end
@@ -1,20 +1,48 @@
 import os
+import re
 import time
+import asyncio
 import logging
 import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple, Iterator, AsyncIterator
+from requests.adapters import HTTPAdapter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from api_client import TMDbAPIClient
-from utils import save_movies_to_csv, extract_names, format_actors, load_movies_from_csv, compare_movie_records
+from async_api_client import AsyncTMDbAPIClient
+from checkpoint import CheckpointedCSVWriter
+from utils import extract_names, format_actors
 from utils_date import convert_movie_date
+from title_index import TitleResolutionIndex
+from page_state import load_page_state, save_page_state, conditional_headers
+from http_metrics import get_shared_metrics
+from parquet_store import DATA_FORMAT, export_csv_to_parquet
+from wiki_parser import parse_wikitables, parse_wikitables_soup, DEFAULT_BACKEND
 
 # Constants
-WIKI_URL = 'https://en.wikipedia.org/wiki/List_of_American_films_of_2024'
+# Point the scraper at a local stand-in (e.g. Benchmark/stub_server.py) with WIKI_BASE_URL
+WIKI_BASE_URL = os.getenv("WIKI_BASE_URL", "https://en.wikipedia.org").rstrip("/")
+WIKI_URL_TEMPLATE = WIKI_BASE_URL + '/wiki/List_of_{list_name}_films_of_{year}'
+WIKI_URL = WIKI_URL_TEMPLATE.format(list_name='American', year=2024)
 OUTPUT_DIR = "Data/raw_data/wiki/"
-OUTPUT_FILE = "en_movies_2024.csv"
+OUTPUT_FILE_TEMPLATE = "{prefix}_movies_{year}.csv"
+# Output file prefix of each list page, other lists use their lowercased name
+LIST_PREFIXES = {"American": "en"}
 MAX_WORKERS = 20
+# Years and list pages to scrape, e.g. WIKI_YEARS=2015-2024 WIKI_LISTS=American,British
+WIKI_YEARS = os.getenv("WIKI_YEARS", "2024")
+WIKI_LISTS = os.getenv("WIKI_LISTS", "American")
+# List pages fetched and enriched at the same time
+PAGE_WORKERS = int(os.getenv("WIKI_PAGE_WORKERS", "4"))
+# ETag / Last-Modified of every page, sent back so unchanged pages answer 304
+PAGE_STATE_PATH = os.getenv("WIKI_PAGE_STATE_PATH", "Data/state/wiki_pages.json")
+# Used when neither the release date nor the page gives a year
+DEFAULT_YEAR = 2024
+# Table parser: 'lxml' (default when installed), 'strainer' or 'soup' (full html.parser tree)
+WIKI_PARSER = os.getenv("WIKI_PARSER", DEFAULT_BACKEND)
+# Keep the part/checkpoint files of an interrupted run and skip rows it already enriched
+RESUME = os.getenv("EXTRACT_RESUME", "false").lower() in ("1", "true", "yes")
 
 # Configure logging
 os.makedirs("logs", exist_ok=True)
@@ -31,96 +59,174 @@ logger = logging.getLogger(__name__)
 class WikipediaMovieScraper:
     """Handles scraping movies from Wikipedia and enriching with TMDb data"""
 
-    def __init__(self):
+    def __init__(self, title_index: Optional[TitleResolutionIndex] = None):
         self.api_client = TMDbAPIClient()
-
-    def fetch_wikipedia_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse a Wikipedia page"""
+        # Titles resolved on earlier runs skip the TMDb search, disable with TITLE_INDEX_ENABLED=false
+        if title_index is None and os.getenv("TITLE_INDEX_ENABLED", "true").lower() not in ("0", "false", "no"):
+            title_index = TitleResolutionIndex()
+        self.title_index = title_index
+
+        # One pooled session for every list page fetched concurrently
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'TMDb-Movie-ETL-Pipeline/1.0'
+        adapter = HTTPAdapter(pool_connections=PAGE_WORKERS, pool_maxsize=PAGE_WORKERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch_wikipedia_html(self, url: str) -> Optional[bytes]:
+        """Fetch the raw HTML of a Wikipedia page"""
+        _, html, _ = self.fetch_page_if_changed(url)
+        return html
+
+    def fetch_page_if_changed(self, url: str, validators: Optional[Dict[str, str]] = None) -> Tuple[bool, Optional[bytes], Dict[str, str]]:
+        """Conditionally fetch a page with stored validators
+
+        Returns (modified, html, validators). modified is False when the server
+        answered 304 Not Modified; html is None when the request failed.
+        """
+        metrics = self.api_client.metrics
+        start = time.perf_counter()
         try:
-            response = requests.get(url, timeout=20)
+            response = self.session.get(url, headers=conditional_headers(validators or {}), timeout=20)
+            metrics.record_request("wikipedia", response.status_code, time.perf_counter() - start, len(response.content))
+            if response.status_code == 304:
+                return False, None, validators or {}
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
         except requests.RequestException as e:
-            logger.error(f"Failed to fetch Wikipedia page: {e}")
-            return None
+            if not isinstance(e, requests.HTTPError):
+                metrics.record_request("wikipedia", "error", time.perf_counter() - start)
+            logger.error(f"Failed to fetch Wikipedia page {url}: {e}")
+            return True, None, {}
+
+        new_validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        return True, response.content, {k: v for k, v in new_validators.items() if v}
+
+    def fetch_wikipedia_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Fetch and parse a Wikipedia page"""
+        html = self.fetch_wikipedia_html(url)
+        return BeautifulSoup(html, 'html.parser') if html is not None else None
+
+    def extract_movies_from_html(self, html: bytes, backend: str = WIKI_PARSER, year: Optional[int] = None) -> List[Dict[str, str]]:
+        """Extract movies from the wikitables of a raw page using a fast parsing backend"""
+        return self.movies_from_rows(parse_wikitables(html, backend), year)
 
     def extract_movies_from_tables(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract movies from Wikipedia tables"""
-        tables = [
-            table for table in soup.find_all('table', class_='wikitable')
-            if not table.find('caption')
-        ]
+        return self.movies_from_rows(parse_wikitables_soup(soup))
 
+    def movies_from_rows(self, tables: List[List[List[str]]], year: Optional[int] = None) -> List[Dict[str, str]]:
+        """Turn wikitable cell texts into movies, carrying month/date over rowspan rows
+
+        year is the year of the list page; it is kept on each movie because
+        the release dates in the tables only give a day and a month.
+        """
         wiki_movies = []
-        for table in tables:
-            rows = table.find_all('tr')[1:]
+        for rows in tables:
             prev_month = None
             prev_date = None
 
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
+            for cells in rows:
                 movie = self._parse_table_row(cells, prev_month, prev_date)
 
                 if movie:
                     # Update previous values for next iteration
                     if len(cells) == 6:
-                        prev_month = cells[0].get_text(strip=True)
-                        prev_date = cells[1].get_text(strip=True)
+                        prev_month = cells[0]
+                        prev_date = cells[1]
                     elif len(cells) == 5:
-                        prev_date = cells[0].get_text(strip=True)
+                        prev_date = cells[0]
 
+                    if year is not None:
+                        movie['Year'] = year
                     wiki_movies.append(movie)
 
         return wiki_movies
 
-    def _parse_table_row(self, cells: List, prev_month: str, prev_date: str) -> Optional[Dict]:
-        """Parse a single table row to extract movie data"""
+    def _parse_table_row(self, cells: List[str], prev_month: str, prev_date: str) -> Optional[Dict]:
+        """Parse a single table row (cell texts) to extract movie data"""
         movie = {}
 
         if len(cells) == 6:
-            prev_month = cells[0].get_text(strip=True)
-            prev_date = cells[1].get_text(strip=True)
+            prev_month = cells[0]
+            prev_date = cells[1]
             movie = {
                 'Release Date': f"{prev_date}, {prev_month}",
-                'Title': cells[2].get_text(strip=True),
-                'Studio': cells[3].get_text(strip=True),
-                'Cast and Crew': cells[4].get_text(strip=True)
+                'Title': cells[2],
+                'Studio': cells[3],
+                'Cast and Crew': cells[4]
             }
         elif len(cells) == 5:
-            prev_date = cells[0].get_text(strip=True)
+            prev_date = cells[0]
             movie = {
                 'Release Date': f"{prev_date}, {prev_month}",
-                'Title': cells[1].get_text(strip=True),
-                'Studio': cells[2].get_text(strip=True),
-                'Cast and Crew': cells[3].get_text(strip=True)
+                'Title': cells[1],
+                'Studio': cells[2],
+                'Cast and Crew': cells[3]
             }
         elif len(cells) == 4:
             movie = {
                 'Release Date': f"{prev_date}, {prev_month}",
-                'Title': cells[0].get_text(strip=True),
-                'Studio': cells[1].get_text(strip=True),
-                'Cast and Crew': cells[2].get_text(strip=True)
+                'Title': cells[0],
+                'Studio': cells[1],
+                'Cast and Crew': cells[2]
             }
 
         return movie if movie else None
 
-    def enrich_movie_with_tmdb(self, movie: Dict[str, str]) -> Dict:
-        """Enrich Wikipedia movie data with TMDb information"""
-        # Extract year from release date if possible
+    @staticmethod
+    def _release_year(movie: Dict[str, str]) -> Optional[int]:
+        """Extract year from release date if possible"""
         release_date = movie.get('Release Date')
         year = None
         if release_date:
             # Try to extract a 4-digit year from the release date string
-            import re
-            match = re.search(r'\b(20\d{2})\b', release_date)
+            match = re.search(r'\b((?:19|20)\d{2})\b', release_date)
             if match:
                 year = int(match.group(1))
             else:
-                year = 2024  # fallback to 2024 if not found
+                year = movie.get('Year') or DEFAULT_YEAR  # fall back to the year of the list page
+        return year
 
-        logger.info(f"Fetching TMDb data for movie: {movie['Title']}")
-        tmdb_data = self.api_client.search_movie_by_title(movie['Title'], year=year)
+    def enrich_movie_with_tmdb(self, movie: Dict[str, str]) -> Dict:
+        """Enrich Wikipedia movie data with TMDb information"""
+        year = self._release_year(movie)
 
+        logger.info(f"Fetching TMDb data for movie: {movie['Title']}")
+        movie_id = self.resolve_movie_id(movie['Title'], year)
+        tmdb_data = self.api_client.get_movie_full_details(movie_id) if movie_id else None
+        return self.build_movie_record(movie, tmdb_data)
+
+    def resolve_movie_id(self, title: str, year: Optional[int]) -> Optional[int]:
+        """Map a Wikipedia title to a tmdb_id, checking the title index before searching TMDb"""
+        if self.title_index is not None:
+            found, movie_id = self.title_index.lookup(title, year)
+            if found:
+                return movie_id
+
+        answered, movie_id = self.api_client.search_movie_id(title, year)
+        if answered and self.title_index is not None:
+            self.title_index.record(title, year, movie_id)
+        return movie_id
+
+    async def resolve_movie_id_async(self, title: str, year: Optional[int], api_client: AsyncTMDbAPIClient) -> Optional[int]:
+        """Async variant of resolve_movie_id"""
+        # The index is SQLite behind a lock shared with other pages' threads, keep it off the event loop
+        if self.title_index is not None:
+            found, movie_id = await asyncio.to_thread(self.title_index.lookup, title, year)
+            if found:
+                return movie_id
+
+        answered, movie_id = await api_client.search_movie_id(title, year)
+        if answered and self.title_index is not None:
+            await asyncio.to_thread(self.title_index.record, title, year, movie_id)
+        return movie_id
+
+    @staticmethod
+    def build_movie_record(movie: Dict[str, str], tmdb_data: Optional[Dict]) -> Dict:
+        """Merge a Wikipedia row with its TMDb match into one CSV row"""
         if not tmdb_data:
             return {}  # Return empty if tmdb_data is empty
 
@@ -135,7 +241,7 @@ class WikipediaMovieScraper:
             'revenue': tmdb_data.get('revenue'),
             'rating': tmdb_data.get('vote_average'),
             'vote_count': tmdb_data.get('vote_count'),
-            'release_date': tmdb_data.get('release_date') or convert_movie_date(movie.get('Release Date')),
+            'release_date': tmdb_data.get('release_date') or convert_movie_date(movie.get('Release Date'), movie.get('Year') or DEFAULT_YEAR),
             'original_language': tmdb_data.get('original_language'),
             'production_companies': production_companies,
             'genres': genres,
@@ -144,63 +250,180 @@ class WikipediaMovieScraper:
             'runtime': tmdb_data.get('runtime')
         }
 
-    def process_movies(self, wiki_movies: List[Dict[str, str]]) -> List[Dict]:
-        """Process all movies with TMDb enrichment using parallel execution"""
-        all_movies = []
+    @staticmethod
+    def movie_key(movie: Dict[str, str]) -> str:
+        """Checkpoint key of a Wikipedia row (its TMDb id is not known until it is enriched)"""
+        return f"{movie.get('Title')}|{movie.get('Release Date')}"
 
+    def iter_enriched_movies(self, wiki_movies: List[Dict[str, str]], skip_keys: Optional[Set[str]] = None) -> Iterator[Tuple[str, Dict]]:
+        """Yield (movie_key, record) pairs as enrichment completes, record is {} when TMDb has no match"""
+        skip_keys = skip_keys or set()
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [executor.submit(self.enrich_movie_with_tmdb, movie) for movie in wiki_movies]
+            futures = {
+                executor.submit(self.enrich_movie_with_tmdb, movie): self.movie_key(movie)
+                for movie in wiki_movies if self.movie_key(movie) not in skip_keys
+            }
 
             for future in as_completed(futures):
                 try:
-                    result = future.result()
-                    if result:
-                        all_movies.append(result)
+                    yield futures[future], future.result()
                 except Exception as exc:
                     logger.error(f"Exception occurred during TMDb fetch: {exc}")
-                time.sleep(0.25)
-
-        return all_movies
 
-def main():
-    """Main function"""
-    scraper = WikipediaMovieScraper()
-
-    logger.info("Fetching Wikipedia page...")
-    soup = scraper.fetch_wikipedia_page(WIKI_URL)
-    if not soup:
-        logger.error("No soup object returned, exiting.")
-        return
-
-    logger.info("Extracting movies from tables...")
-    wiki_movies = scraper.extract_movies_from_tables(soup)
-
-    logger.info("Enriching movies with TMDb data...")
-    movies = scraper.process_movies(wiki_movies)
-
-    logger.info(f"Extracted {len(movies)} movies.")
-    output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-
-    # Load previous data
-    prev_movies = load_movies_from_csv(output_path)
-    prev_map = {}
-    for m in prev_movies:
-        key = m.get('tmdb_id')
-        prev_map[key] = m
-
-    compare_keys = [
-        'title', 'budget', 'revenue', 'rating', 'vote_count', 'genres'
-    ]
-    for m in movies:
-        key = m.get('tmdb_id')
-        old = prev_map.get(str(key))
-        if old:
-            m['is_data_updated'] = compare_movie_records(m, old, compare_keys)
+    def process_movies(self, wiki_movies: List[Dict[str, str]]) -> List[Dict]:
+        """Process all movies with TMDb enrichment using parallel execution"""
+        return [result for _, result in self.iter_enriched_movies(wiki_movies) if result]
+
+    async def iter_enriched_movies_async(
+        self,
+        wiki_movies: List[Dict[str, str]],
+        api_client: AsyncTMDbAPIClient,
+        skip_keys: Optional[Set[str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Async variant of iter_enriched_movies, at most MAX_WORKERS movies in flight"""
+        skip_keys = skip_keys or set()
+        semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+        async def enrich(movie: Dict[str, str]) -> Tuple[str, Dict]:
+            async with semaphore:
+                logger.info(f"Fetching TMDb data for movie: {movie['Title']}")
+                movie_id = await self.resolve_movie_id_async(movie['Title'], self._release_year(movie), api_client)
+                tmdb_data = await api_client.get_movie_full_details(movie_id) if movie_id else None
+            return self.movie_key(movie), self.build_movie_record(movie, tmdb_data)
+
+        tasks = [asyncio.create_task(enrich(movie)) for movie in wiki_movies if self.movie_key(movie) not in skip_keys]
+        for task in asyncio.as_completed(tasks):
+            try:
+                yield await task
+            except Exception as exc:
+                logger.error(f"Exception occurred during TMDb fetch: {exc}")
+
+    async def process_movies_async(self, wiki_movies: List[Dict[str, str]], api_client: AsyncTMDbAPIClient) -> List[Dict]:
+        """Process all movies with TMDb enrichment on the async client"""
+        return [result async for _, result in self.iter_enriched_movies_async(wiki_movies, api_client) if result]
+
+async def _stream_movies_async(
+    scraper: WikipediaMovieScraper,
+    wiki_movies: List[Dict[str, str]],
+    writer: CheckpointedCSVWriter
+) -> None:
+    async with AsyncTMDbAPIClient() as api_client:
+        async for key, movie in scraper.iter_enriched_movies_async(wiki_movies, api_client, skip_keys=writer.done):
+            writer.write(key, movie)
+
+def parse_years(spec: str) -> List[int]:
+    """Parse a year list such as "2015-2024,2010" into sorted years"""
+    years = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(y) for y in part.split('-', 1))
+            years.update(range(start, end + 1))
+        else:
+            years.add(int(part))
+    return sorted(years)
+
+def wiki_pages(years: List[int], list_names: List[str]) -> List[Dict]:
+    """Build the url, year and output path of every (list, year) page to scrape"""
+    pages = []
+    for list_name in list_names:
+        prefix = LIST_PREFIXES.get(list_name, list_name.lower().replace(' ', '_'))
+        for year in years:
+            pages.append({
+                'url': WIKI_URL_TEMPLATE.format(list_name=list_name.replace(' ', '_'), year=year),
+                'year': year,
+                'output_path': os.path.join(OUTPUT_DIR, OUTPUT_FILE_TEMPLATE.format(prefix=prefix, year=year))
+            })
+    return pages
+
+def scrape_page(
+    scraper: WikipediaMovieScraper,
+    page: Dict,
+    validators: Optional[Dict[str, str]] = None,
+    mode: str = "threads",
+    resume: bool = RESUME
+) -> Optional[Dict[str, str]]:
+    """Fetch, parse and enrich one list page, returns its new validators or None if nothing was saved
+
+    Stored validators are only sent when the page's output exists and no
+    interrupted run is waiting to be resumed, so a 304 means there is nothing to do.
+    """
+    output_path = page['output_path']
+    pending = resume and os.path.exists(f"{output_path}.checkpoint")
+    if not os.path.exists(output_path) or pending:
+        validators = None
+
+    modified, html, new_validators = scraper.fetch_page_if_changed(page['url'], validators)
+    if not modified:
+        logger.info(f"{page['url']} not modified since the last run, skipping")
+        return None
+    if not html:
+        logger.error(f"No page content returned for {page['url']}, skipping.")
+        return None
+
+    wiki_movies = scraper.extract_movies_from_html(html, year=page['year'])
+    logger.info(f"Extracted {len(wiki_movies)} movies from {page['url']} ({WIKI_PARSER} parser), enriching with TMDb data...")
+
+    # is_data_updated is set on commit by merging against the previous extract's hash index
+    with CheckpointedCSVWriter(output_path, resume=resume) as writer:
+        if mode == "async":
+            asyncio.run(_stream_movies_async(scraper, wiki_movies, writer))
         else:
-            m['is_data_updated'] = True
+            for key, movie in scraper.iter_enriched_movies(wiki_movies, skip_keys=writer.done):
+                writer.write(key, movie)
+        logger.info(f"Extracted {writer.written} movies.")
+        writer.commit()
 
-    save_movies_to_csv(movies, output_path)
     logger.info(f"Saved movies to {output_path}")
+    if DATA_FORMAT == "parquet":
+        # English Wikipedia lists; the list name stays in the file name
+        export_csv_to_parquet(output_path, "wiki", "en", page['year'])
+    return new_validators if writer.written else None
+
+def main(mode: str = "threads", resume: bool = RESUME, years: str = WIKI_YEARS, lists: str = WIKI_LISTS):
+    """Main function, mode is 'threads' (ThreadPoolExecutor) or 'async' (asyncio + aiohttp)
+
+    Every (list, year) page is fetched concurrently with a conditional GET;
+    pages unchanged since the last run are neither parsed nor enriched.
+    Enriched rows are streamed to disk with a checkpoint, resume=True picks up
+    an interrupted run where it stopped.
+    """
+    scraper = WikipediaMovieScraper()
+    pages = wiki_pages(parse_years(years), [name.strip() for name in lists.split(',') if name.strip()])
+    if not pages:
+        logger.error("No Wikipedia pages configured, exiting.")
+        return
+    state = load_page_state(PAGE_STATE_PATH)
+    # Per-endpoint HTTP metrics of this run (Wikipedia pages and TMDb), dumped even when it fails
+    metrics = get_shared_metrics()
+    metrics.reset()
+
+    logger.info(f"Fetching {len(pages)} Wikipedia pages...")
+    try:
+        with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, len(pages))) as executor:
+            futures = {
+                executor.submit(scrape_page, scraper, page, state.get(page['url']), mode, resume): page
+                for page in pages
+            }
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    validators = future.result()
+                except Exception as exc:
+                    logger.error(f"Failed to scrape {page['url']}: {exc}")
+                    continue
+                if validators:
+                    state[page['url']] = validators
+                    save_page_state(PAGE_STATE_PATH, state)
+    finally:
+        logger.info(f"HTTP metrics written to {metrics.dump('wiki_http')}")
+
+    if scraper.api_client.cache is not None:
+        logger.info(f"Response cache stats: {scraper.api_client.cache.stats()}")
+    if scraper.title_index is not None:
+        logger.info(f"Title index stats: {scraper.title_index.stats()}")
 
 if __name__ == "__main__":
     main()
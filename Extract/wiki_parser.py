@@ -0,0 +1,87 @@
+from typing import List, Iterator, Union
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:  # lxml is optional, fall back to the strainer backend
+    HAS_LXML = False
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+_SKIP_TAGS = {'script', 'style', 'template'}
+
+_WIKITABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')]"
+
+# Each table is a list of rows, each row the stripped text of its cells
+TableRows = List[List[str]]
+
+
+def _text_parts(element) -> Iterator[str]:
+    """Yield the text nodes under an lxml element in document order, like get_text()"""
+    # Comments and processing instructions have a non-string tag
+    if not isinstance(element.tag, str) or element.tag in _SKIP_TAGS:
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from _text_parts(child)
+        if child.tail:
+            yield child.tail
+
+
+def lxml_cell_text(element) -> str:
+    """Same result as BeautifulSoup's cell.get_text(strip=True)"""
+    return ''.join(part.strip() for part in _text_parts(element))
+
+
+def parse_wikitables_lxml(html: Union[bytes, str]) -> List[TableRows]:
+    """Parse every table.wikitable without a caption with lxml, skipping the header row"""
+    root = lxml.html.fromstring(html)
+    tables = []
+    for table in root.xpath(_WIKITABLE_XPATH):
+        if next(table.iter('caption'), None) is not None:
+            continue
+        rows = list(table.iter('tr'))[1:]
+        tables.append([[lxml_cell_text(cell) for cell in row.iter('td', 'th')] for row in rows])
+    return tables
+
+
+def parse_wikitables_soup(soup: BeautifulSoup) -> List[TableRows]:
+    """Reduce the wikitables of an already parsed page to cell texts, reading each cell once"""
+    tables = []
+    for table in soup.find_all('table', class_='wikitable'):
+        if table.find('caption'):
+            continue
+        rows = table.find_all('tr')[1:]
+        tables.append([[cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])] for row in rows])
+    return tables
+
+
+def _has_wikitable_class(value) -> bool:
+    # The strainer sees the raw class attribute, not the split class list
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return 'wikitable' in classes
+
+
+def parse_wikitables_strainer(html: Union[bytes, str]) -> List[TableRows]:
+    """Build a BeautifulSoup tree of the wikitables only, with lxml underneath when available"""
+    strainer = SoupStrainer('table', attrs={'class': _has_wikitable_class})
+    soup = BeautifulSoup(html, 'lxml' if HAS_LXML else 'html.parser', parse_only=strainer)
+    return parse_wikitables_soup(soup)
+
+
+BACKENDS = {
+    'lxml': parse_wikitables_lxml,
+    'strainer': parse_wikitables_strainer,
+    'soup': lambda html: parse_wikitables_soup(BeautifulSoup(html, 'html.parser')),
+}
+DEFAULT_BACKEND = 'lxml' if HAS_LXML else 'strainer'
+
+
+def parse_wikitables(html: Union[bytes, str], backend: str = DEFAULT_BACKEND) -> List[TableRows]:
+    """Parse the wikitables of a page into cell texts with the given backend"""
+    if backend == 'lxml' and not HAS_LXML:
+        backend = 'strainer'
+    return BACKENDS[backend](html)
@@ -1,13 +1,122 @@
 import pandas as pd
+import numpy as np
 import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from schema import load_clean_frame
+from ndjson_io import artifact_path, write_records
+from key_registry import KeyRegistry, KEY_REGISTRY_ENABLED, KEY_REGISTRY_PATH, FACT_DIMENSION, fact_key, fact_sort_key
+
+# 'csv' (default) or 'parquet': format of the files in clean_data, see Transform/utils_transformer.py
+DATA_FORMAT = os.getenv("DATA_FORMAT", "csv").lower()
+# Clean columns the normalizer uses, only these are read from Parquet files
+NORMALIZER_COLUMNS = ["tmdb_id", "title", "release_date", "production_companies", "genres", "directors", "actors", "source"]
+# "vectorized" (default) builds dimensions and bridges with split/explode, "rows" uses the original iterrows loop
+NORMALIZER_MODE = os.getenv("NORMALIZER_MODE", "vectorized").lower()
+# Worker processes; above 1 the files are normalized in parallel and merged (map-reduce mode)
+NORMALIZER_WORKERS = int(os.getenv("NORMALIZER_WORKERS", "1"))
+# Capitalized words runs are actor names, e.g. "John Smith (Hero)" -> "John Smith"
+ACTOR_PATTERN = re.compile(r'([A-Z][a-z]+(?: [A-Z][a-z]+)*)')
+
+def split_names(texts):
+    names = texts.str.split(",").explode().str.strip()
+    return names[names != ""]
+
+def split_actor_names(texts):
+    names = texts.str.findall(ACTOR_PATTERN).explode().dropna().str.strip()
+    return names[names != ""]
+
+# Registry dimension -> (clean column, function splitting its cells into names)
+DIMENSION_COLUMNS = {
+    "production_company": ("production_companies", split_names),
+    "genre": ("genres", split_names),
+    "director": ("directors", split_names),
+    "actor": ("actors", split_actor_names),
+}
+# (registry dimension, name -> id attribute, bridge attribute, bridge id field, counter attribute)
+DIMENSIONS = [
+    ("production_company", "production_companies", "fact_companies", "company_id", "company_id_counter"),
+    ("genre", "genres", "fact_genres", "genre_id", "genre_id_counter"),
+    ("director", "directors", "fact_directors", "director_id", "director_id_counter"),
+    ("actor", "actors", "fact_actors", "actor_id", "actor_id_counter"),
+]
+
+def explode_names(df, column, splitter):
+    """Split a column into (row position, name) pairs in row order, splitting each distinct cell only once
+
+    Cells are taken as str() like the row path (NaN -> 'nan'). Returns the
+    row position of every pair, the index of its name in `names`, and
+    `names` in order of first appearance.
+    """
+    if column not in df.columns:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), []
+    codes, uniques = pd.factorize(df[column].astype(object), use_na_sentinel=False)
+    parts = splitter(pd.Series([str(value) for value in uniques], dtype=object))
+    name_codes, names = pd.factorize(parts.to_numpy(dtype=object))
+
+    # Names of distinct cell u are parts[offsets[u]:offsets[u] + lengths[u]]
+    lengths = np.bincount(parts.index.to_numpy(dtype=np.int64), minlength=len(uniques))
+    offsets = np.cumsum(lengths) - lengths
+    row_lengths = lengths[codes]
+    rows = np.repeat(np.arange(len(codes)), row_lengths)
+    within = np.arange(row_lengths.sum()) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    return rows, name_codes[offsets[codes][rows] + within], list(names)
+
+def release_dates(df):
+    """date_dim entries of the valid release dates in order of first appearance, number of invalid rows, an example
+
+    Same test as `if release_date` in the row path: only empty values are
+    skipped, anything else that is not a %Y-%m-%d date is invalid.
+    """
+    if "release_date" not in df.columns:
+        return [], 0, None
+    codes, uniques = pd.factorize(df["release_date"].astype(object), use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=object)
+    checked = uniques.map(bool).to_numpy(dtype=bool)
+    is_text = uniques.map(lambda value: isinstance(value, str))
+    parsed = pd.to_datetime(uniques.where(is_text), format="%Y-%m-%d", errors="coerce")
+    invalid = checked & parsed.isna().to_numpy()
+    example = uniques[invalid].iloc[0] if invalid.any() else None
+
+    # factorize keeps the order of first appearance, like the row path's insertion order
+    valid = checked & ~invalid
+    entries = [
+        {"release_date": release_date, "year": date_obj.year, "month": date_obj.month, "day": date_obj.day}
+        for release_date, date_obj in zip(uniques[valid].tolist(), parsed[valid].tolist())
+    ]
+    return entries, int(invalid[codes].sum()), example
+
+def normalize_file(path):
+    """Map step of the parallel mode: one clean file -> its facts, dates and names, no ids
+
+    Runs in a worker process. Names stay natural keys; the reduce step in
+    DataNormalizer gives them ids, so nothing here depends on other files.
+    """
+    df = load_clean_frame(path, columns=NORMALIZER_COLUMNS if path.endswith(".parquet") else None)
+    df = df.reset_index(drop=True)
+    tmdb_ids = [int(tmdb_id) for tmdb_id in df["tmdb_id"].tolist()]
+    sources = df["source"].astype(object).tolist() if "source" in df.columns else [""] * len(df)
+    dates, invalid_rows, example = release_dates(df)
+    return {
+        "filename": os.path.basename(path),
+        "tmdb_ids": tmdb_ids,
+        "titles": df["title"].astype(object).tolist(),
+        "fact_keys": [fact_key(source, tmdb_id) for source, tmdb_id in zip(sources, tmdb_ids)],
+        "dates": dates,
+        "invalid_dates": (invalid_rows, example),
+        "names": {dimension: explode_names(df, column, splitter)
+                  for dimension, (column, splitter) in DIMENSION_COLUMNS.items()},
+    }
 
 class DataNormalizer:
-    def __init__(self, csv_dir="Data/clean_data", output_dir="Data/json_to_load"):
+    def __init__(self, csv_dir="Data/clean_data", output_dir="Data/json_to_load",
+                 registry_path=KEY_REGISTRY_PATH if KEY_REGISTRY_ENABLED else None):
         self.csv_dir = csv_dir
         self.output_dir = output_dir
+        # Persistent surrogate keys (see key_registry.py), None numbers everything from 1 on every run
+        self.registry_path = registry_path
         os.makedirs(self.output_dir, exist_ok=True)
 
         self.company_id_counter = 1
@@ -22,6 +131,9 @@ class DataNormalizer:
         self.actors = {}
         self.date_dim = {}
         self.fact_id_map = {}
+        # Natural key of every fact, in fact_id order
+        self.fact_keys = []
+        self.registry_delta = None
 
         self.movies = []
         self.fact_movie = []
@@ -31,126 +143,318 @@ class DataNormalizer:
         self.fact_actors = []
 
     def _split_actors_field(self, actors_str):
-        pattern = r'([A-Z][a-z]+(?: [A-Z][a-z]+)*)'
-        matches = re.findall(pattern, actors_str)
+        matches = re.findall(ACTOR_PATTERN, actors_str)
         return [m.strip() for m in matches if m.strip()]
 
+    def _write_records(self, records, name):
+        """Stream a table to <name>.ndjson (or .json with ARTIFACT_FORMAT=json)"""
+        write_records(artifact_path(self.output_dir, name), records)
+
     def _write_json(self, data, filename):
         path = os.path.join(self.output_dir, filename)
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
     def process_files(self):
-        for filename in os.listdir(self.csv_dir):
-            if not filename.endswith(".csv"):
-                continue
-
-            csv_path = os.path.join(self.csv_dir, filename)
-            df = pd.read_csv(csv_path)
-
-            for _, row in df.iterrows():
-                tmdb_id = int(row["tmdb_id"])
-                fact_id = self.fact_id_counter
-                self.fact_id_map[tmdb_id] = fact_id
-                self.fact_id_counter += 1
-
-                self.movies.append({
-                    "tmdb_id": tmdb_id,
-                    "title": row["title"]
-                })
-
-                release_date = row.get("release_date", "")
-                if release_date and release_date not in self.date_dim:
-                    try:
-                        date_obj = datetime.strptime(release_date, "%Y-%m-%d")
-                        self.date_dim[release_date] = {
-                            "release_date": release_date,
-                            "year": date_obj.year,
-                            "month": date_obj.month,
-                            "day": date_obj.day
-                        }
-                    except Exception as e:
-                        print(f"Invalid date format: {release_date} in file {filename}")
-
-                self.fact_movie.append({
-                    "fact_id": fact_id,
-                    "movie_id": tmdb_id
-                })
-
-                for name in str(row.get("production_companies", "")).split(","):
-                    name = name.strip()
-                    if name:
-                        if name not in self.production_companies:
-                            self.production_companies[name] = self.company_id_counter
-                            self.company_id_counter += 1
-                        self.fact_companies.append({
-                            "fact_id": fact_id,
-                            "company_id": self.production_companies[name]
-                        })
-
-                for name in str(row.get("genres", "")).split(","):
-                    name = name.strip()
-                    if name:
-                        if name not in self.genres:
-                            self.genres[name] = self.genre_id_counter
-                            self.genre_id_counter += 1
-                        self.fact_genres.append({
-                            "fact_id": fact_id,
-                            "genre_id": self.genres[name]
-                        })
-
-                for name in str(row.get("directors", "")).split(","):
-                    name = name.strip()
-                    if name:
-                        if name not in self.directors:
-                            self.directors[name] = self.director_id_counter
-                            self.director_id_counter += 1
-                        self.fact_directors.append({
-                            "fact_id": fact_id,
-                            "director_id": self.directors[name]
-                        })
-
-                actors_raw = str(row.get("actors", ""))
-                actors = self._split_actors_field(actors_raw)
-                for name in actors:
-                    if name:
-                        if name not in self.actors:
-                            self.actors[name] = self.actor_id_counter
-                            self.actor_id_counter += 1
-                        self.fact_actors.append({
-                            "fact_id": fact_id,
-                            "actor_id": self.actors[name]
-                        })
+        extension = ".parquet" if DATA_FORMAT == "parquet" else ".csv"
+        paths = [os.path.join(self.csv_dir, filename)
+                 for filename in os.listdir(self.csv_dir) if filename.endswith(extension)]
+        if NORMALIZER_WORKERS > 1:
+            self._process_files_parallel(paths)
+            return
 
-    def export_to_json(self):
-        self._write_json(self.movies, "movie.json")
-        self._write_json(
-            [{"company_id": v, "name": k} for k, v in self.production_companies.items()],
-            "production_company.json"
-        )
-        self._write_json(
-            [{"genre_id": v, "name": k} for k, v in self.genres.items()],
-            "genre.json"
-        )
-        self._write_json(
-            [{"director_id": v, "name": k} for k, v in self.directors.items()],
-            "director.json"
-        )
-        self._write_json(
-            [{"actor_id": v, "name": k} for k, v in self.actors.items()],
-            "actor.json"
+        for csv_path in paths:
+            filename = os.path.basename(csv_path)
+            if extension == ".parquet":
+                df = load_clean_frame(csv_path, columns=NORMALIZER_COLUMNS)
+            else:
+                df = load_clean_frame(csv_path)
+
+            if NORMALIZER_MODE == "rows":
+                self._process_rows(df, filename)
+            else:
+                self._process_frame(df, filename)
+
+        if self.registry_path:
+            self._apply_registry()
+
+    def _process_rows(self, df, filename):
+        """Original row-by-row path, kept for comparison (NORMALIZER_MODE=rows)"""
+        for _, row in df.iterrows():
+            tmdb_id = int(row["tmdb_id"])
+            fact_id = self.fact_id_counter
+            self.fact_id_map[tmdb_id] = fact_id
+            self.fact_id_counter += 1
+            self.fact_keys.append(fact_key(row.get("source", ""), tmdb_id))
+
+            self.movies.append({
+                "tmdb_id": tmdb_id,
+                "title": row["title"]
+            })
+
+            release_date = row.get("release_date", "")
+            if release_date and release_date not in self.date_dim:
+                try:
+                    date_obj = datetime.strptime(release_date, "%Y-%m-%d")
+                    self.date_dim[release_date] = {
+                        "release_date": release_date,
+                        "year": date_obj.year,
+                        "month": date_obj.month,
+                        "day": date_obj.day
+                    }
+                except Exception as e:
+                    print(f"Invalid date format: {release_date} in file {filename}")
+
+            self.fact_movie.append({
+                "fact_id": fact_id,
+                "movie_id": tmdb_id
+            })
+
+            for name in str(row.get("production_companies", "")).split(","):
+                name = name.strip()
+                if name:
+                    if name not in self.production_companies:
+                        self.production_companies[name] = self.company_id_counter
+                        self.company_id_counter += 1
+                    self.fact_companies.append({
+                        "fact_id": fact_id,
+                        "company_id": self.production_companies[name]
+                    })
+
+            for name in str(row.get("genres", "")).split(","):
+                name = name.strip()
+                if name:
+                    if name not in self.genres:
+                        self.genres[name] = self.genre_id_counter
+                        self.genre_id_counter += 1
+                    self.fact_genres.append({
+                        "fact_id": fact_id,
+                        "genre_id": self.genres[name]
+                    })
+
+            for name in str(row.get("directors", "")).split(","):
+                name = name.strip()
+                if name:
+                    if name not in self.directors:
+                        self.directors[name] = self.director_id_counter
+                        self.director_id_counter += 1
+                    self.fact_directors.append({
+                        "fact_id": fact_id,
+                        "director_id": self.directors[name]
+                    })
+
+            actors_raw = str(row.get("actors", ""))
+            actors = self._split_actors_field(actors_raw)
+            for name in actors:
+                if name:
+                    if name not in self.actors:
+                        self.actors[name] = self.actor_id_counter
+                        self.actor_id_counter += 1
+                    self.fact_actors.append({
+                        "fact_id": fact_id,
+                        "actor_id": self.actors[name]
+                    })
+
+    def _link_names(self, exploded, fact_ids, dimension, counter_attr, bridge, id_field):
+        """Give new names the next ids in order of first appearance and append one bridge row per name"""
+        rows, name_codes, names = exploded
+        counter = getattr(self, counter_attr)
+        for name in names:
+            if name not in dimension:
+                dimension[name] = counter
+                counter += 1
+        setattr(self, counter_attr, counter)
+        name_ids = np.array([dimension[name] for name in names], dtype=np.int64)
+        bridge.extend(
+            {"fact_id": fact_id, id_field: dim_id}
+            for fact_id, dim_id in zip(fact_ids[rows].tolist(), name_ids[name_codes].tolist())
         )
-        self._write_json(list(self.date_dim.values()), "date.json")
-        self._write_json(self.fact_movie, "fact_movie.json")
-        self._write_json(self.fact_companies, "fact_company.json")
-        self._write_json(self.fact_genres, "fact_genre.json")
-        self._write_json(self.fact_directors, "fact_director.json")
-        self._write_json(self.fact_actors, "fact_actor.json")
+
+    def _add_dates(self, df, filename):
+        entries, invalid_rows, example = release_dates(df)
+        if invalid_rows:
+            print(f"Invalid date format: {invalid_rows} values (e.g. {example}) in file {filename}")
+        for entry in entries:
+            self.date_dim.setdefault(entry["release_date"], entry)
+
+    def _process_frame(self, df, filename):
+        """Vectorized path: the same dimensions, ids and bridge rows as _process_rows, in the same order"""
+        df = df.reset_index(drop=True)
+        tmdb_ids = [int(tmdb_id) for tmdb_id in df["tmdb_id"].tolist()]
+        fact_ids = np.arange(self.fact_id_counter, self.fact_id_counter + len(df))
+        self.fact_id_counter += len(df)
+        self.fact_id_map.update(zip(tmdb_ids, fact_ids.tolist()))
+        sources = df["source"].astype(object).tolist() if "source" in df.columns else [""] * len(df)
+        self.fact_keys.extend(fact_key(source, tmdb_id) for source, tmdb_id in zip(sources, tmdb_ids))
+
+        self.movies.extend({"tmdb_id": tmdb_id, "title": title}
+                           for tmdb_id, title in zip(tmdb_ids, df["title"].astype(object).tolist()))
+        self._add_dates(df, filename)
+        self.fact_movie.extend({"fact_id": fact_id, "movie_id": tmdb_id}
+                               for fact_id, tmdb_id in zip(fact_ids.tolist(), tmdb_ids))
+
+        self._link_names(explode_names(df, "production_companies", split_names), fact_ids,
+                         self.production_companies, "company_id_counter", self.fact_companies, "company_id")
+        self._link_names(explode_names(df, "genres", split_names), fact_ids,
+                         self.genres, "genre_id_counter", self.fact_genres, "genre_id")
+        self._link_names(explode_names(df, "directors", split_names), fact_ids,
+                         self.directors, "director_id_counter", self.fact_directors, "director_id")
+        self._link_names(explode_names(df, "actors", split_actor_names), fact_ids,
+                         self.actors, "actor_id_counter", self.fact_actors, "actor_id")
+
+    def _process_files_parallel(self, paths):
+        """Map-reduce mode: normalize every file in a worker process, then merge the results
+
+        Ids only depend on the natural keys, not on the order the files are
+        read in: names and facts are numbered in sorted key order (only the
+        new ones when the registry is on). A (source, tmdb_id) found more than
+        once keeps its first row in file name order.
+        """
+        with ProcessPoolExecutor(max_workers=NORMALIZER_WORKERS) as executor:
+            partials = list(executor.map(normalize_file, sorted(paths)))
+
+        registry = KeyRegistry(self.registry_path) if self.registry_path else None
+        try:
+            run_id = registry.start_run() if registry else None
+            new_ids = {}
+
+            first_rows = {}
+            for file_index, partial in enumerate(partials):
+                for row, key in enumerate(partial["fact_keys"]):
+                    first_rows.setdefault(key, (file_index, row))
+            fact_ids = self._assign_ids(registry, FACT_DIMENSION, sorted(first_rows, key=fact_sort_key), run_id)
+            row_fact_ids = [np.zeros(len(partial["fact_keys"]), dtype=np.int64) for partial in partials]
+            for key, fact_id in fact_ids.items():
+                file_index, row = first_rows[key]
+                row_fact_ids[file_index][row] = fact_id
+                partial = partials[file_index]
+                self.fact_keys.append(key)
+                self.movies.append({"tmdb_id": partial["tmdb_ids"][row], "title": partial["titles"][row]})
+                self.fact_movie.append({"fact_id": fact_id, "movie_id": partial["tmdb_ids"][row]})
+            self.fact_id_map = {row["movie_id"]: row["fact_id"] for row in self.fact_movie}
+            self.fact_id_counter = max(fact_ids.values(), default=0) + 1
+            if registry:
+                new_ids[FACT_DIMENSION] = registry.new_ids(FACT_DIMENSION, run_id)
+
+            for dimension, names_attr, bridge_attr, id_field, counter_attr in DIMENSIONS:
+                names = sorted(set().union(*(partial["names"][dimension][2] for partial in partials)))
+                ids = self._assign_ids(registry, dimension, names, run_id)
+                setattr(self, names_attr, ids)
+                setattr(self, counter_attr, max(ids.values(), default=0) + 1)
+                if registry:
+                    new_ids[dimension] = registry.new_ids(dimension, run_id)
+
+                # Bridge rows of the kept facts, in fact_id order and per fact in row order
+                bridge_facts, bridge_ids = [np.array([], dtype=np.int64)], [np.array([], dtype=np.int64)]
+                for partial, file_fact_ids in zip(partials, row_fact_ids):
+                    rows, name_codes, file_names = partial["names"][dimension]
+                    name_ids = np.array([ids[name] for name in file_names], dtype=np.int64)
+                    facts = file_fact_ids[rows]
+                    kept = facts > 0
+                    bridge_facts.append(facts[kept])
+                    bridge_ids.append(name_ids[name_codes][kept])
+                bridge_facts, bridge_ids = np.concatenate(bridge_facts), np.concatenate(bridge_ids)
+                order = np.argsort(bridge_facts, kind="stable")
+                setattr(self, bridge_attr, [
+                    {"fact_id": fact_id, id_field: dim_id}
+                    for fact_id, dim_id in zip(bridge_facts[order].tolist(), bridge_ids[order].tolist())
+                ])
+        finally:
+            if registry:
+                registry.close()
+
+        dates = {}
+        for partial in partials:
+            invalid_rows, example = partial["invalid_dates"]
+            if invalid_rows:
+                print(f"Invalid date format: {invalid_rows} values (e.g. {example}) in file {partial['filename']}")
+            for entry in partial["dates"]:
+                dates.setdefault(entry["release_date"], entry)
+        self.date_dim = dict(sorted(dates.items()))
+
+        duplicates = sum(len(partial["fact_keys"]) for partial in partials) - len(first_rows)
+        if duplicates:
+            print(f"[WARNING] Skipped {duplicates} rows whose (source, tmdb_id) already occurred in this run")
+        if registry:
+            self.registry_delta = {"run_id": run_id, "new": new_ids, "facts": sorted(fact_ids.values())}
+
+    @staticmethod
+    def _assign_ids(registry, dimension, keys, run_id):
+        """Ids of keys (given in sorted order) from the registry, or 1..n without one, sorted by id"""
+        ids = registry.assign(dimension, keys, run_id) if registry else {key: i for i, key in enumerate(keys, start=1)}
+        return dict(sorted(ids.items(), key=lambda item: item[1]))
+
+    def _apply_registry(self):
+        """Replace the run-local ids with the registry's persistent ones
+
+        Dimension members keep the id they got the first time they were seen.
+        Facts are keyed by (source, tmdb_id); if a key occurs more than once
+        in a run, only its first row is kept.
+        """
+        with KeyRegistry(self.registry_path) as registry:
+            run_id = registry.start_run()
+            new_ids = {}
+            for dimension, names_attr, bridge_attr, id_field, counter_attr in DIMENSIONS:
+                local = getattr(self, names_attr)
+                ids = registry.assign(dimension, local.keys(), run_id)
+                remap = {local_id: ids[name] for name, local_id in local.items()}
+                for row in getattr(self, bridge_attr):
+                    row[id_field] = remap[row[id_field]]
+                setattr(self, names_attr, ids)
+                setattr(self, counter_attr, registry.next_id(dimension))
+                new_ids[dimension] = registry.new_ids(dimension, run_id)
+
+            ids = registry.assign(FACT_DIMENSION, self.fact_keys, run_id)
+            remap, seen = {}, set()
+            for local_id, key in enumerate(self.fact_keys, start=1):
+                if key not in seen:
+                    seen.add(key)
+                    remap[local_id] = ids[key]
+            self.fact_id_counter = registry.next_id(FACT_DIMENSION)
+            new_ids[FACT_DIMENSION] = registry.new_ids(FACT_DIMENSION, run_id)
+
+        duplicates = len(self.fact_keys) - len(remap)
+        if duplicates:
+            print(f"[WARNING] Skipped {duplicates} rows whose (source, tmdb_id) already occurred in this run")
+        # One movie was appended per row, in local fact id order
+        self.movies = [movie for local_id, movie in enumerate(self.movies, start=1) if local_id in remap]
+        self.fact_movie = [{"fact_id": remap[row["fact_id"]], "movie_id": row["movie_id"]}
+                           for row in self.fact_movie if row["fact_id"] in remap]
+        self.fact_id_map = {row["movie_id"]: row["fact_id"] for row in self.fact_movie}
+        for _, _, bridge_attr, _, _ in DIMENSIONS:
+            bridge = [row for row in getattr(self, bridge_attr) if row["fact_id"] in remap]
+            for row in bridge:
+                row["fact_id"] = remap[row["fact_id"]]
+            setattr(self, bridge_attr, bridge)
+
+        self.registry_delta = {
+            "run_id": run_id,
+            "new": new_ids,
+            "facts": sorted(remap.values()),
+        }
+
+    def export_to_json(self):
+        self._write_records(self.movies, "movie")
+        self._write_records(({"company_id": v, "name": k} for k, v in self.production_companies.items()),
+                            "production_company")
+        self._write_records(({"genre_id": v, "name": k} for k, v in self.genres.items()), "genre")
+        self._write_records(({"director_id": v, "name": k} for k, v in self.directors.items()), "director")
+        self._write_records(({"actor_id": v, "name": k} for k, v in self.actors.items()), "actor")
+        self._write_records(self.date_dim.values(), "date")
+        self._write_records(self.fact_movie, "fact_movie")
+        self._write_records(self.fact_companies, "fact_company")
+        self._write_records(self.fact_genres, "fact_genre")
+        self._write_records(self.fact_directors, "fact_director")
+        self._write_records(self.fact_actors, "fact_actor")
+        if self.registry_delta is not None:
+            # New dimension members and facts of this run, for incremental loads
+            self._write_json(self.registry_delta, "key_registry_delta.json")
 
 def main():
     normalizer = DataNormalizer()
     normalizer.process_files()
     normalizer.export_to_json()
+    return normalizer
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+# Defaults (override with environment variables)
+KEY_REGISTRY_ENABLED = os.getenv("KEY_REGISTRY_ENABLED", "true").lower() in ("1", "true", "yes")
+KEY_REGISTRY_PATH = os.getenv("KEY_REGISTRY_PATH", "Data/state/key_registry.sqlite")
+
+# Dimension name of the facts, their natural key is fact_key(source, tmdb_id)
+FACT_DIMENSION = "fact"
+
+
+def fact_key(source, tmdb_id) -> str:
+    """Natural key of a fact: the same movie from TMDb and Wikipedia are two facts"""
+    return f"{source}:{int(tmdb_id)}"
+
+
+def fact_sort_key(key: str):
+    """Order of fact keys: by source, then numerically by tmdb_id"""
+    source, tmdb_id = key.rsplit(":", 1)
+    return source, int(tmdb_id)
+
+
+class KeyRegistry:
+    """Persistent natural key -> surrogate id maps, one per dimension
+
+    Ids are handed out once and never change, so dimension members and
+    facts keep their ids between runs. Every assignment is tagged with the
+    run that first and last saw the key, which tells the loaders what is
+    new in a run.
+    """
+
+    def __init__(self, path: str = KEY_REGISTRY_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS surrogate_keys (
+                dimension TEXT NOT NULL,
+                natural_key TEXT NOT NULL,
+                surrogate_id INTEGER NOT NULL,
+                first_run INTEGER NOT NULL,
+                last_run INTEGER NOT NULL,
+                PRIMARY KEY (dimension, natural_key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def start_run(self) -> int:
+        """Register a new run and return its id"""
+        cursor = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),))
+        self._conn.commit()
+        return cursor.lastrowid
+
+    def load(self, dimension: str) -> Dict[str, int]:
+        """All registered keys of a dimension"""
+        return dict(self._conn.execute(
+            "SELECT natural_key, surrogate_id FROM surrogate_keys WHERE dimension = ?", (dimension,)
+        ))
+
+    def assign(self, dimension: str, natural_keys: Iterable[str], run_id: int) -> Dict[str, int]:
+        """Ids of natural_keys; unknown keys get the next ids in the order given
+
+        Every key passed is marked as seen in run_id.
+        """
+        known = self.load(dimension)
+        next_id = max(known.values(), default=0) + 1
+        ids, new_rows, seen_rows = {}, [], []
+        for key in natural_keys:
+            if key in ids:
+                continue
+            if key in known:
+                seen_rows.append((run_id, dimension, key))
+            else:
+                known[key] = next_id
+                new_rows.append((dimension, key, next_id, run_id, run_id))
+                next_id += 1
+            ids[key] = known[key]
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO surrogate_keys (dimension, natural_key, surrogate_id, first_run, last_run) VALUES (?, ?, ?, ?, ?)",
+                new_rows
+            )
+            self._conn.executemany(
+                "UPDATE surrogate_keys SET last_run = ? WHERE dimension = ? AND natural_key = ?", seen_rows
+            )
+        return ids
+
+    def next_id(self, dimension: str) -> int:
+        """Id the next new key of a dimension will get"""
+        row = self._conn.execute("SELECT MAX(surrogate_id) FROM surrogate_keys WHERE dimension = ?", (dimension,)).fetchone()
+        return (row[0] or 0) + 1
+
+    def lookup(self, dimension: str, natural_keys: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Ids of natural_keys without registering anything, None for unknown keys"""
+        known = self.load(dimension)
+        return {key: known.get(key) for key in natural_keys}
+
+    def new_ids(self, dimension: str, run_id: int) -> List[int]:
+        """Ids first assigned in run_id"""
+        return [row[0] for row in self._conn.execute(
+            "SELECT surrogate_id FROM surrogate_keys WHERE dimension = ? AND first_run = ? ORDER BY surrogate_id",
+            (dimension, run_id)
+        )]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
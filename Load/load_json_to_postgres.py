@@ -1,7 +1,9 @@
 import os
-import json
+import time
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import sessionmaker
+from ndjson_io import find_artifact, iter_records
 from create_table_in_postgres import (
     engine,
     Movie, Genre, ProductionCompany, Director, Actor, DateDim,
@@ -11,44 +13,180 @@ from create_table_in_postgres import (
 # Setup session
 Session = sessionmaker(bind=engine)
 
-def load_json(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# "copy" (default) streams every table into a staging table with COPY and merges it
+# with one INSERT ... ON CONFLICT, "orm" is the original session.merge() per record
+LOAD_MODE = os.getenv("LOAD_MODE", "copy").lower()
 
-def get_or_create(session, model, lookup_field, value, **kwargs):
-    instance = session.query(model).filter(getattr(model, lookup_field) == value).one_or_none()
-    if instance:
-        return instance
-    instance = model(**{lookup_field: value}, **kwargs)
-    session.add(instance)
-    session.flush()  # To get PK if autoincrement
-    return instance
+FACT_COLUMNS = ["fact_id", "tmdb_id", "title", "budget", "revenue", "rating", "release_date",
+                "original_language", "vote_count", "runtime", "source"]
+
+# Facts per batch in the ORM fact phase: each batch is a fixed number of bulk
+# INSERTs, the dimension names are resolved in memory (see DimensionCache)
+FACT_LOAD_BATCH = int(os.getenv("FACT_LOAD_BATCH", "10000"))
+
+# (fact list field, dimension model, id column, bridge model) of the ORM fact phase
+FACT_BRIDGES = [
+    ("production_companies", ProductionCompany, "company_id", FactCompany),
+    ("genres", Genre, "genre_id", FactGenre),
+    ("directors", Director, "director_id", FactDirector),
+    ("actors", Actor, "actor_id", FactActor),
+]
+
+# (table, artifact directory, artifact name, columns, key columns) in load order. The bridges
+# come from the normalizer's id pairs, the same ones the fact's name lists are built from
+COPY_TABLES = [
+    ("movie", "Data/json_to_load", "movie", ["tmdb_id", "title"], ["tmdb_id"]),
+    ("genre", "Data/json_to_load", "genre", ["genre_id", "name"], ["genre_id"]),
+    ("production_company", "Data/json_to_load", "production_company", ["company_id", "name"], ["company_id"]),
+    ("director", "Data/json_to_load", "director", ["director_id", "name"], ["director_id"]),
+    ("actor", "Data/json_to_load", "actor", ["actor_id", "name"], ["actor_id"]),
+    ("date_dim", "Data/json_to_load", "date", ["release_date", "year", "month", "day"], ["release_date"]),
+    ("fact", "Data/star_json", "fact", FACT_COLUMNS, ["fact_id"]),
+    ("fact_movie", "Data/json_to_load", "fact_movie", ["fact_id", "movie_id"], ["fact_id", "movie_id"]),
+    ("fact_company", "Data/json_to_load", "fact_company", ["fact_id", "company_id"], ["fact_id", "company_id"]),
+    ("fact_genre", "Data/json_to_load", "fact_genre", ["fact_id", "genre_id"], ["fact_id", "genre_id"]),
+    ("fact_director", "Data/json_to_load", "fact_director", ["fact_id", "director_id"], ["fact_id", "director_id"]),
+    ("fact_actor", "Data/json_to_load", "fact_actor", ["fact_id", "actor_id"], ["fact_id", "actor_id"]),
+]
+
+def load_json(directory, name):
+    """Stream the records of <name>.ndjson (or the older <name>.json) in directory"""
+    return iter_records(find_artifact(directory, name))
+
+def copy_value(value):
+    """A value in COPY text format: None and NaN -> \\N, backslash and control characters escaped"""
+    if value is None or value != value:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+class CopyStream:
+    """File-like object for cursor.copy_expert: rows become COPY lines only as they are read"""
+
+    def __init__(self, rows, batch_rows=1000):
+        self._rows = iter(rows)
+        self._batch_rows = batch_rows
+        self._pending = bytearray()
+        self.count = 0
+
+    def _fill(self):
+        lines = []
+        for row in self._rows:
+            lines.append("\t".join(copy_value(value) for value in row) + "\n")
+            if len(lines) == self._batch_rows:
+                break
+        self.count += len(lines)
+        self._pending += "".join(lines).encode("utf-8")
+        return bool(lines)
+
+    def read(self, size=-1):
+        while (size < 0 or len(self._pending) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self._pending)
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+def copy_table(cursor, table, columns, keys, records):
+    """Stream records into a temp staging copy of table with COPY, then merge it in set-based
+
+    Rows with the same key keep the last one, like session.merge(); bridge rows
+    of facts that are not loaded are skipped, and the old links of every fact
+    that is reloaded are deleted first. Returns the number of rows copied.
+    """
+    stage = f"stage_{table}"
+    column_list, key_list = ", ".join(columns), ", ".join(keys)
+    cursor.execute(f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+    stream = CopyStream(tuple(record.get(col) for col in columns) for record in records)
+    cursor.copy_expert(f"COPY {stage} ({column_list}) FROM STDIN", stream)
+
+    updates = [col for col in columns if col not in keys]
+    conflict = ("DO UPDATE SET " + ", ".join(f"{col} = EXCLUDED.{col}" for col in updates)) if updates else "DO NOTHING"
+    where = ""
+    if table.startswith("fact_"):
+        # Bridges only insert, so links a reloaded fact no longer has would stay forever;
+        # stage_fact still holds this load's facts, fact is copied before the bridges
+        cursor.execute(f"DELETE FROM {table} WHERE fact_id IN (SELECT fact_id FROM stage_fact)")
+        where = " WHERE fact_id IN (SELECT fact_id FROM fact)"
+    cursor.execute(
+        f"INSERT INTO {table} ({column_list}) "
+        f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {stage}{where} ORDER BY {key_list}, ctid DESC "
+        f"ON CONFLICT ({key_list}) {conflict}"
+    )
+    return stream.count
+
+def bulk_load():
+    """Load every dimension, the fact table and the bridges with COPY in one transaction"""
+    print("🚀 Bulk loading the star schema with COPY...")
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            for table, directory, name, columns, keys in COPY_TABLES:
+                start = time.perf_counter()
+                rows = copy_table(cursor, table, columns, keys, load_json(directory, name))
+                elapsed = time.perf_counter() - start
+                print(f"  {table}: {rows} row(s) in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print("✅ Star schema loaded successfully.")
+
+class DimensionCache:
+    """name -> id map of a dimension, read once; unknown names get the next ids and are inserted in bulk"""
+
+    def __init__(self, session, model, id_field):
+        self.model = model
+        self.id_field = id_field
+        self.ids = dict(session.query(model.name, getattr(model, id_field)))
+        self.next_id = max(self.ids.values(), default=0) + 1
+        self.new = []
+
+    def id_of(self, name):
+        if name not in self.ids:
+            self.ids[name] = self.next_id
+            self.new.append({self.id_field: self.next_id, "name": name})
+            self.next_id += 1
+        return self.ids[name]
+
+    def flush(self, session):
+        if self.new:
+            session.execute(insert(self.model.__table__), self.new)
+            self.new = []
+
+def split_names(value):
+    """List field of a fact; older fact files hold comma separated strings"""
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(",") if name.strip()]
+    return value or []
 
 def load_dimensions(session):
     print("🚀 Loading dimension tables...")
 
     # Movies
-    for record in load_json("Data/json_to_load/movie.json"):
+    for record in load_json("Data/json_to_load", "movie"):
         session.merge(Movie(**record))
 
     # Genres
-    for record in load_json("Data/json_to_load/genre.json"):
+    for record in load_json("Data/json_to_load", "genre"):
         session.merge(Genre(**record))
 
     # Production Companies
-    for record in load_json("Data/json_to_load/production_company.json"):
+    for record in load_json("Data/json_to_load", "production_company"):
         session.merge(ProductionCompany(**record))
 
     # Directors
-    for record in load_json("Data/json_to_load/director.json"):
+    for record in load_json("Data/json_to_load", "director"):
         session.merge(Director(**record))
 
     # Actors
-    for record in load_json("Data/json_to_load/actor.json"):
+    for record in load_json("Data/json_to_load", "actor"):
         session.merge(Actor(**record))
 
     # Date Dimension
-    for record in load_json("Data/json_to_load/date.json"):
+    for record in load_json("Data/json_to_load", "date"):
         record["release_date"] = datetime.strptime(record["release_date"], "%Y-%m-%d").date()
         session.merge(DateDim(**record))
 
@@ -58,63 +196,44 @@ def load_dimensions(session):
 def load_facts_and_links(session):
     print("🚀 Loading fact and bridge tables...")
 
-    fact_data = load_json("Data/star_json/fact.json")
-    for row in fact_data:
-        # Parse release_date
-        release_date_obj = datetime.strptime(row["release_date"], "%Y-%m-%d").date()
-
-        # Create fact record (exclude related list fields)
-        fact = Fact(
-            fact_id=row["fact_id"],
-            tmdb_id=row["tmdb_id"],
-            title=row["title"],
-            budget=row.get("budget"),
-            revenue=row.get("revenue"),
-            rating=row.get("rating"),
-            release_date=release_date_obj,
-            original_language=row.get("original_language"),
-            vote_count=row.get("vote_count"),
-            runtime=row.get("runtime"),
-            source=row.get("source")
-        )
-        session.add(fact)
-        session.flush()  # get fact_id if autogenerated
-
-        # Link Movie (dynamic get or create)
-        movie = get_or_create(session, Movie, "tmdb_id", row["tmdb_id"], title=row.get("title"))
-        session.add(FactMovie(fact_id=fact.fact_id, movie_id=movie.tmdb_id))
-
-        # Production Companies (split string into list if necessary)
-        companies = row.get("production_companies") or row.get("companies") or ""
-        if isinstance(companies, str):
-            companies = [c.strip() for c in companies.split(",") if c.strip()]
-        for company_name in companies:
-            company = get_or_create(session, ProductionCompany, "name", company_name)
-            session.add(FactCompany(fact_id=fact.fact_id, company_id=company.company_id))
-
-        # Genres
-        genres = row.get("genres") or ""
-        if isinstance(genres, str):
-            genres = [g.strip() for g in genres.split(",") if g.strip()]
-        for genre_name in genres:
-            genre = get_or_create(session, Genre, "name", genre_name)
-            session.add(FactGenre(fact_id=fact.fact_id, genre_id=genre.genre_id))
-
-        # Directors
-        directors = row.get("directors") or ""
-        if isinstance(directors, str):
-            directors = [d.strip() for d in directors.split(",") if d.strip()]
-        for director_name in directors:
-            director = get_or_create(session, Director, "name", director_name)
-            session.add(FactDirector(fact_id=fact.fact_id, director_id=director.director_id))
-
-        # Actors
-        actors = row.get("actors") or ""
-        if isinstance(actors, str):
-            actors = [a.strip() for a in actors.split(",") if a.strip()]
-        for actor_name in actors:
-            actor = get_or_create(session, Actor, "name", actor_name)
-            session.add(FactActor(fact_id=fact.fact_id, actor_id=actor.actor_id))
+    # Names and movies are resolved in memory, new ones get inserted with their batch
+    caches = {field: DimensionCache(session, model, id_field) for field, model, id_field, _ in FACT_BRIDGES}
+    movie_ids = {tmdb_id for (tmdb_id,) in session.query(Movie.tmdb_id)}
+    new_movies, facts, fact_movies = [], [], []
+    bridges = {field: [] for field, *_ in FACT_BRIDGES}
+
+    def flush():
+        # Parents first: new dimension members and movies, facts, then the bridges. Core
+        # inserts, the ORM bulk insert starts a new statement whenever the set of None fields changes
+        for cache in caches.values():
+            cache.flush(session)
+        batches = [(Movie, new_movies), (Fact, facts), (FactMovie, fact_movies)]
+        batches += [(bridge_model, bridges[field]) for field, _, _, bridge_model in FACT_BRIDGES]
+        for model, rows in batches:
+            if rows:
+                session.execute(insert(model.__table__), rows)
+                rows.clear()
+
+    for row in load_json("Data/star_json", "fact"):
+        fact = {col: row.get(col) for col in FACT_COLUMNS}
+        if fact["release_date"]:
+            fact["release_date"] = datetime.strptime(fact["release_date"], "%Y-%m-%d").date()
+        facts.append(fact)
+
+        if row["tmdb_id"] not in movie_ids:
+            movie_ids.add(row["tmdb_id"])
+            new_movies.append({"tmdb_id": row["tmdb_id"], "title": row.get("title")})
+        fact_movies.append({"fact_id": row["fact_id"], "movie_id": row["tmdb_id"]})
+
+        for field, _, id_field, _ in FACT_BRIDGES:
+            value = row.get(field) or (row.get("companies") if field == "production_companies" else None)
+            # A fact links each dimension member once
+            dim_ids = dict.fromkeys(caches[field].id_of(name) for name in split_names(value))
+            bridges[field].extend({"fact_id": row["fact_id"], id_field: dim_id} for dim_id in dim_ids)
+
+        if len(facts) >= FACT_LOAD_BATCH:
+            flush()
+    flush()
 
     session.commit()
     print("✅ Fact and bridge tables loaded successfully.")
@@ -142,8 +261,11 @@ def print_table_counts(session):
 def main():
     session = Session()
     try:
-        load_dimensions(session)
-        load_facts_and_links(session)
+        if LOAD_MODE == "orm":
+            load_dimensions(session)
+            load_facts_and_links(session)
+        else:
+            bulk_load()
         print_table_counts(session)
     except Exception as e:
         session.rollback()
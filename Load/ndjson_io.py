@@ -0,0 +1,112 @@
+import os
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # orjson is optional, the json module writes the same records
+    HAS_ORJSON = False
+
+# 'ndjson' (default): one compact record per line, streamed in and out.
+# 'json': the original indented JSON arrays, still written one record at a time
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "ndjson").lower()
+ARTIFACT_EXTENSIONS = {"ndjson": ".ndjson", "json": ".json"}
+
+
+def _default(obj):
+    """numpy scalars and the like -> Python values"""
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps_record(record: Dict[str, Any]) -> bytes:
+    """One record as compact UTF-8 JSON, without the trailing newline"""
+    if HAS_ORJSON:
+        return orjson.dumps(record, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def artifact_path(directory: str, name: str, fmt: Optional[str] = None) -> str:
+    """<directory>/<name> with the extension of ARTIFACT_FORMAT"""
+    return os.path.join(directory, name + ARTIFACT_EXTENSIONS[fmt or ARTIFACT_FORMAT])
+
+
+def find_artifact(directory: str, name: str) -> str:
+    """Existing <name>.ndjson or <name>.json in directory, the ARTIFACT_FORMAT one first"""
+    formats = sorted(ARTIFACT_EXTENSIONS, key=lambda fmt: fmt != ARTIFACT_FORMAT)
+    for fmt in formats:
+        path = artifact_path(directory, name, fmt)
+        if os.path.exists(path):
+            return path
+    return artifact_path(directory, name)
+
+
+class RecordWriter:
+    """Write records to an .ndjson or .json file (by extension) one at a time
+
+    The file is written as <path>.tmp and renamed on a clean exit, so readers
+    never see half a table. The .json output is byte-identical to
+    json.dump(records, f, indent=2, ensure_ascii=False).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.ndjson = not path.endswith(".json")
+        self.count = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        if not self.ndjson:
+            self._file.write(b"[")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.ndjson:
+            self._file.write(dumps_record(record) + b"\n")
+        else:
+            text = json.dumps(record, indent=2, ensure_ascii=False, default=_default)
+            prefix = b",\n  " if self.count else b"\n  "
+            self._file.write(prefix + text.replace("\n", "\n  ").encode("utf-8"))
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self) -> None:
+        if not self.ndjson:
+            self._file.write(b"\n]" if self.count else b"]")
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self.tmp_path)
+
+
+def write_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Stream records to path and return how many were written"""
+    with RecordWriter(path) as writer:
+        return writer.write_many(records)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of an .ndjson file line by line; a .json array is read whole, it cannot be streamed"""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    loads = orjson.loads if HAS_ORJSON else json.loads
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
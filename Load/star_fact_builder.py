@@ -1,79 +1,199 @@
 import pandas as pd
-import json
+import numpy as np
+import gc
 import os
+from schema import load_clean_frame, widen_floats
+from ndjson_io import RecordWriter, artifact_path, find_artifact, iter_records
+from key_registry import KeyRegistry, KEY_REGISTRY_ENABLED, KEY_REGISTRY_PATH, FACT_DIMENSION, fact_key, fact_sort_key
+from data_normalizer import NORMALIZER_WORKERS
+
+# 'csv' (default) or 'parquet': format of the files in clean_data, see Transform/utils_transformer.py
+DATA_FORMAT = os.getenv("DATA_FORMAT", "csv").lower()
+# "vectorized" (default) builds the list columns with merges and groupby, "rows" uses the original iterrows loop
+FACT_BUILDER_MODE = os.getenv("FACT_BUILDER_MODE", "vectorized").lower()
+
+# (list column and DataNormalizer name -> id attribute, dimension artifact, bridge artifact,
+#  DataNormalizer bridge attribute, bridge id field)
+LIST_COLUMNS = [
+    ("production_companies", "production_company", "fact_company", "fact_companies", "company_id"),
+    ("genres", "genre", "fact_genre", "fact_genres", "genre_id"),
+    ("directors", "director", "fact_director", "fact_directors", "director_id"),
+    ("actors", "actor", "fact_actor", "fact_actors", "actor_id"),
+]
 
 class StarFactBuilder:
-    def __init__(self, csv_dir="Data/clean_data", json_dir="Data/json_to_load", output_path="Data/star_json/fact.json"):
+    def __init__(self, csv_dir="Data/clean_data", json_dir="Data/json_to_load", output_path=None,
+                 registry_path=KEY_REGISTRY_PATH if KEY_REGISTRY_ENABLED else None):
         self.csv_dir = csv_dir
         self.json_dir = json_dir
-        self.output_path = output_path
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Data/star_json/fact.ndjson, or fact.json with ARTIFACT_FORMAT=json
+        self.output_path = output_path or artifact_path("Data/star_json", "fact")
+        # Must be the registry DataNormalizer used, fact ids are looked up there
+        self.registry_path = registry_path
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
 
-    def load_json_as_dict(self, filename, key_field, value_field):
-        with open(os.path.join(self.json_dir, filename), encoding="utf-8") as f:
-            data = json.load(f)
-        return {item[key_field]: item[value_field] for item in data}
+    def load_json_as_dict(self, name, key_field, value_field):
+        return {item[key_field]: item[value_field] for item in iter_records(find_artifact(self.json_dir, name))}
 
-    def load_bridge(self, filename, key="fact_id", value="*_id"):
-        with open(os.path.join(self.json_dir, filename), encoding="utf-8") as f:
-            data = json.load(f)
+    def load_bridge(self, name, key="fact_id", value="*_id"):
         result = {}
-        for row in data:
+        for row in iter_records(find_artifact(self.json_dir, name)):
             fid = row[key]
             vid = list(row.values())[1]
             result.setdefault(fid, []).append(vid)
         return result
 
-    def merge_fact_table(self):
-        # Load base fact data from CSVs
-        all_csvs = [os.path.join(self.csv_dir, f) for f in os.listdir(self.csv_dir) if f.endswith(".csv")]
-        df = pd.concat([pd.read_csv(f) for f in all_csvs], ignore_index=True)
+    def _fact_keys(self, df):
+        sources = df["source"].astype(object).tolist() if "source" in df.columns else [""] * len(df)
+        return pd.Series([fact_key(source, tmdb_id) for source, tmdb_id in zip(sources, df["tmdb_id"].tolist())],
+                         index=df.index)
+
+    def _with_registry_fact_ids(self, df):
+        """Persistent fact ids by (source, tmdb_id), first row of a key only, like DataNormalizer"""
+        keys = self._fact_keys(df)
+        df = df[~keys.duplicated()]
+        keys = keys[df.index]
+        with KeyRegistry(self.registry_path) as registry:
+            ids = registry.lookup(FACT_DIMENSION, keys.tolist())
+        fact_ids = keys.map(ids)
+        if fact_ids.isna().any():
+            print(f"[WARNING] {int(fact_ids.isna().sum())} facts are not in the key registry, run DataNormalizer first")
+        df = df[fact_ids.notna()].reset_index(drop=True)
+        df.insert(0, "fact_id", fact_ids[fact_ids.notna()].astype(int).tolist())
+        return df
+
+    def _with_sorted_fact_ids(self, df):
+        """Fact ids of the map-reduce DataNormalizer without a registry: first row of a key, numbered in key order"""
+        keys = self._fact_keys(df)
+        df = df[~keys.duplicated()]
+        keys = keys[df.index]
+        ids = {key: fact_id for fact_id, key in enumerate(sorted(keys, key=fact_sort_key), start=1)}
+        df = df.reset_index(drop=True)
+        df.insert(0, "fact_id", keys.map(ids).tolist())
+        return df.sort_values("fact_id", kind="stable", ignore_index=True)
+
+    def _load_facts(self):
+        # Load base fact data from CSVs (or Parquet files, same order as DataNormalizer.process_files)
+        extension = ".parquet" if DATA_FORMAT == "parquet" else ".csv"
+        all_files = [os.path.join(self.csv_dir, f) for f in os.listdir(self.csv_dir) if f.endswith(extension)]
+        if NORMALIZER_WORKERS > 1:
+            all_files.sort()
+        # Typed with the shared clean schema, float32 columns go back to float64 for the JSON output
+        df = widen_floats(pd.concat([load_clean_frame(f) for f in all_files], ignore_index=True))
+        if self.registry_path:
+            return self._with_registry_fact_ids(df)
+        if NORMALIZER_WORKERS > 1:
+            return self._with_sorted_fact_ids(df)
         df.insert(0, "fact_id", range(1, len(df) + 1))
+        return df
+
+    def _name_lists(self, fact_ids, column, dim_name, bridge_name, bridge_attr, id_field, normalizer=None):
+        """Names of every fact in fact_ids, duplicates dropped, in bridge order
+
+        The dimension and bridge come from the normalizer's in-memory tables
+        when one is given, otherwise from its artifacts in json_dir.
+        """
+        if normalizer is not None:
+            names = {dim_id: name for name, dim_id in getattr(normalizer, column).items()}
+            bridge = pd.DataFrame(getattr(normalizer, bridge_attr), columns=["fact_id", id_field])
+        else:
+            names = {row[id_field]: row["name"] for row in iter_records(find_artifact(self.json_dir, dim_name))}
+            bridge = pd.DataFrame(iter_records(find_artifact(self.json_dir, bridge_name)), columns=["fact_id", id_field])
+
+        bridge["name"] = bridge[id_field].map(pd.Series(names, dtype=object))
+        unknown = bridge["name"].isna()
+        bridge.loc[unknown, "name"] = "Unknown(" + bridge.loc[unknown, id_field].astype(str) + ")"
+        bridge = bridge.drop_duplicates(["fact_id", "name"])
 
+        # Group by position in fact_ids with a stable sort and list slices;
+        # groupby().agg(list) builds a Series per group and is slower than iterrows
+        positions = pd.Index(fact_ids).get_indexer(bridge["fact_id"])
+        kept = positions >= 0
+        positions = positions[kept]
+        order = np.argsort(positions, kind="stable")
+        sorted_names = bridge["name"].to_numpy(dtype=object)[kept][order].tolist()
+        ends = np.cumsum(np.bincount(positions, minlength=len(fact_ids))).tolist()
+        return [sorted_names[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+    def merge_fact_table(self, normalizer=None):
+        """Write the enriched fact table
+
+        normalizer: the DataNormalizer that just ran in this process; its
+        dimensions and bridges are used directly instead of its JSON files.
+        """
+        df = self._load_facts()
+        if FACT_BUILDER_MODE == "rows":
+            self._merge_rows(df)
+            return
+
+        # The build only allocates acyclic lists and dicts, but with the normalizer's
+        # tables alive every collection scans millions of objects
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._merge_frame(df, normalizer)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _merge_frame(self, df, normalizer):
+        """Vectorized path: the same facts and names as _merge_rows, list columns in bridge order"""
+        list_columns = [column for column, *_ in LIST_COLUMNS]
+        base = df.drop(columns=[column for column in list_columns if column in df.columns])
+        # Column values like to_dict("records") gives them (NA -> None), without boxing every value
+        columns = list(base.columns) + list_columns
+        values = [[None if value is pd.NA else value for value in base[column].tolist()] for column in base.columns]
+        values += [self._name_lists(base["fact_id"].tolist(), *spec, normalizer=normalizer) for spec in LIST_COLUMNS]
+
+        with RecordWriter(self.output_path) as writer:
+            writer.write_many(dict(zip(columns, row)) for row in zip(*values))
+
+        print(f"✅ Enriched {os.path.basename(self.output_path)} saved to: {self.output_path}")
+
+    def _merge_rows(self, df):
+        """Original row-by-row path, kept for comparison (FACT_BUILDER_MODE=rows)"""
         # Load dimension mappings
-        companies = self.load_json_as_dict("production_company.json", "company_id", "name")
-        genres = self.load_json_as_dict("genre.json", "genre_id", "name")
-        directors = self.load_json_as_dict("director.json", "director_id", "name")
-        actors = self.load_json_as_dict("actor.json", "actor_id", "name")
+        companies = self.load_json_as_dict("production_company", "company_id", "name")
+        genres = self.load_json_as_dict("genre", "genre_id", "name")
+        directors = self.load_json_as_dict("director", "director_id", "name")
+        actors = self.load_json_as_dict("actor", "actor_id", "name")
 
         # Load bridge tables
-        fact_companies = self.load_bridge("fact_company.json")
-        fact_genres = self.load_bridge("fact_genre.json")
-        fact_directors = self.load_bridge("fact_director.json")
-        fact_actors = self.load_bridge("fact_actor.json")
+        fact_companies = self.load_bridge("fact_company")
+        fact_genres = self.load_bridge("fact_genre")
+        fact_directors = self.load_bridge("fact_director")
+        fact_actors = self.load_bridge("fact_actor")
 
         # Helper function to map IDs to names
         def map_ids(ids, lookup):
             return [lookup.get(i, f"Unknown({i})") for i in ids]
 
-        enriched = []
-        for _, row in df.iterrows():
-            fid = row["fact_id"]
-            row_dict = row.to_dict()
-
-            # Remove original string columns to avoid duplicates
-            for col in ["production_companies", "genres", "directors", "actors"]:
-                if col in row_dict:
-                    del row_dict[col]
+        # Rows are streamed to the output as they are built
+        with RecordWriter(self.output_path) as writer:
+            for _, row in df.iterrows():
+                fid = row["fact_id"]
+                row_dict = row.to_dict()
 
-            # Add only the enriched list columns with duplicates removed
-            row_dict.update({
-                "production_companies": list(set(map_ids(fact_companies.get(fid, []), companies))),
-                "genres": list(set(map_ids(fact_genres.get(fid, []), genres))),
-                "directors": list(set(map_ids(fact_directors.get(fid, []), directors))),
-                "actors": list(set(map_ids(fact_actors.get(fid, []), actors))),
-            })
+                # Remove original string columns to avoid duplicates
+                for col in ["production_companies", "genres", "directors", "actors"]:
+                    if col in row_dict:
+                        del row_dict[col]
 
-            enriched.append(row_dict)
+                # Add only the enriched list columns with duplicates removed
+                row_dict.update({
+                    "production_companies": list(set(map_ids(fact_companies.get(fid, []), companies))),
+                    "genres": list(set(map_ids(fact_genres.get(fid, []), genres))),
+                    "directors": list(set(map_ids(fact_directors.get(fid, []), directors))),
+                    "actors": list(set(map_ids(fact_actors.get(fid, []), actors))),
+                })
 
-        with open(self.output_path, "w", encoding="utf-8") as f:
-            json.dump(enriched, f, indent=2, ensure_ascii=False)
+                writer.write(row_dict)
 
-        print(f"✅ Enriched fact.json saved to: {self.output_path}")
+        print(f"✅ Enriched {os.path.basename(self.output_path)} saved to: {self.output_path}")
 
-def main():
+def main(normalizer=None):
     builder = StarFactBuilder()
-    builder.merge_fact_table()
+    builder.merge_fact_table(normalizer)
 
 if __name__ == "__main__":
     main()
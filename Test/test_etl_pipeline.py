@@ -21,6 +21,830 @@ def test_db_connection():
         assert result.scalar() == 1
     print("[TEST] test_db_connection: passed")
 
+def test_response_cache_ttl_and_lru(tmp_path, monkeypatch):
+    print("\n[TEST] test_response_cache_ttl_and_lru: started")
+    import cache as cache_module
+    from cache import ResponseCache
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_bytes=200)
+    url = "https://api.themoviedb.org/3/movie/1"
+
+    assert cache.get(url, {"api_key": "a", "language": "en-US"}) is None
+    cache.set(url, {"api_key": "a", "language": "en-US"}, {"id": 1})
+    # api_key is not part of the key
+    assert cache.get(url, {"api_key": "b", "language": "en-US"}) == {"id": 1}
+
+    # Entries are missed once older than their endpoint TTL (24h for /movie/{id})
+    now = cache_module.time.time()
+    with monkeypatch.context() as m:
+        m.setattr(cache_module.time, "time", lambda: now + 24 * 3600 + 1)
+        assert cache.get(url, {"language": "en-US"}) is None
+    assert cache.get(url, {"language": "en-US"}) == {"id": 1}
+
+    # The change feed (TTL 0) is never stored
+    changes = "https://api.themoviedb.org/3/movie/changes"
+    cache.set(changes, {"page": 1}, {"results": []})
+    assert cache.get(changes, {"page": 1}) is None
+    assert cache.stats()["entries"] == 1
+
+    # Filling past the size cap evicts the least recently used entries
+    for i in range(2, 20):
+        cache.set(f"https://api.themoviedb.org/3/movie/{i}", {}, {"id": i, "pad": "x" * 20})
+    assert cache.get(url, {"language": "en-US"}) is None
+    assert cache.stats()["bytes"] <= 200
+    assert cache.stats()["hits"] == 2
+    cache.close()
+    print("[TEST] test_response_cache_ttl_and_lru: passed")
+
+def test_rate_limiter_burst_and_pause(monkeypatch):
+    print("\n[TEST] test_rate_limiter_burst_and_pause: started")
+    from rate_limiter import TokenBucketRateLimiter, parse_retry_after
+    limiter = TokenBucketRateLimiter(rate=10, burst=2)
+
+    # The burst is free, the next token has to wait for a refill
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert 0.05 < limiter.reserve() <= 0.1
+
+    # A pause holds back every caller
+    limiter.pause(5)
+    assert limiter.reserve() >= 4.9
+
+    # A caller that sleeps into a pause waits it out without taking a second token
+    import rate_limiter
+    limiter = TokenBucketRateLimiter(rate=100, burst=1)
+    reserves, reserve, real_sleep = [], limiter.reserve, rate_limiter.time.sleep
+    monkeypatch.setattr(limiter, "reserve", lambda: reserves.append(1) or reserve())
+
+    def sleep(seconds):
+        if not limiter._pause_remaining() and limiter._paused_until == 0.0:
+            limiter.pause(0.05)
+        real_sleep(seconds)
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    assert limiter.acquire() >= 0.04
+    assert len(reserves) == 1
+    monkeypatch.undo()
+
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) == 1.0
+    print("[TEST] test_rate_limiter_burst_and_pause: passed")
+
+def test_full_details_single_request_and_singleflight(monkeypatch):
+    print("\n[TEST] test_full_details_single_request_and_singleflight: started")
+    import time
+    from api_client import TMDbAPIClient
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    client = TMDbAPIClient()
+    calls = []
+
+    def fake_request(url, params, refresh=False):
+        calls.append((url, params.get("append_to_response")))
+        time.sleep(0.2)
+        return {"id": 7, "credits": {"crew": [{"job": "Director", "name": "D"}], "cast": [{"name": "A", "character": "C"}]}}
+
+    monkeypatch.setattr(client, "make_request_with_retries", fake_request)
+    results = client.get_many_full_details([7, 7, 7])
+    assert results == {7: {"id": 7, "directors": ["D"], "actors": [{"name": "A", "character": "C"}]}}
+
+    # Concurrent callers for the same id share one request
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(client.get_movie_full_details, [7, 7, 7, 7]))
+    assert calls[0] == ("https://api.themoviedb.org/3/movie/7", "credits")
+    assert len(calls) == 2
+    print("[TEST] test_full_details_single_request_and_singleflight: passed")
+
+def test_checkpointed_writer_resume(tmp_path):
+    print("\n[TEST] test_checkpointed_writer_resume: started")
+    import csv
+    from checkpoint import CheckpointedCSVWriter
+    output_path = str(tmp_path / "hi_movies_2024.csv")
+
+    # First run dies after one record
+    with CheckpointedCSVWriter(output_path) as writer:
+        writer.write(1, {"tmdb_id": 1, "title": "A"})
+    assert not (tmp_path / "hi_movies_2024.csv").exists()
+
+    # Resumed run only sees the remaining id and keeps the first record
+    with CheckpointedCSVWriter(output_path, resume=True) as writer:
+        assert writer.done == {"1"}
+        writer.write(2, {"tmdb_id": 2, "title": "B"})
+        writer.commit()
+
+    with open(output_path, encoding="utf-8") as f:
+        assert [row["tmdb_id"] for row in csv.DictReader(f)] == ["1", "2"]
+    assert not (tmp_path / "hi_movies_2024.csv.checkpoint").exists()
+    print("[TEST] test_checkpointed_writer_resume: passed")
+
+def test_title_index_overrides_and_negative_cache(tmp_path):
+    print("\n[TEST] test_title_index_overrides_and_negative_cache: started")
+    import json
+    from title_index import TitleResolutionIndex
+    overrides = tmp_path / "overrides.json"
+    overrides.write_text(json.dumps([{"title": "Wicked", "year": 2024, "tmdb_id": 402431}]))
+    index = TitleResolutionIndex(path=str(tmp_path / "index.sqlite"), overrides_path=str(overrides))
+
+    assert index.lookup("Dune: Part Two", 2024) == (False, None)
+    index.record("Dune: Part Two", 2024, 693134)
+    assert index.lookup("dune part two", 2024) == (True, 693134)
+
+    # No-match results are cached too
+    index.record("Some Unknown Film", 2024, None)
+    assert index.lookup("Some Unknown Film", 2024) == (True, None)
+
+    # Search results never replace a manual entry
+    index.record("Wicked", 2024, 1)
+    assert index.lookup("Wicked", 2024) == (True, 402431)
+    index.close()
+    print("[TEST] test_title_index_overrides_and_negative_cache: passed")
+
+def test_wiki_parser_backends_match_soup():
+    print("\n[TEST] test_wiki_parser_backends_match_soup: started")
+    from bs4 import BeautifulSoup
+    from wiki_parser import parse_wikitables, parse_wikitables_soup, HAS_LXML
+    html = (
+        "<table class='wikitable'><caption>Skip me</caption><tr><th>x</th></tr><tr><td>1</td></tr></table>"
+        "<table class='wikitable sortable'><tr><th>Month</th><th>Day</th><th>Title</th></tr>"
+        "<tr><th rowspan='2'>J A N</th><td>5</td><td><i>Film</i> One</td><td>Studio</td>"
+        "<td><style>.a{}</style>Director (director);<!-- c --> <a>Actor</a></td><td>[1]</td></tr>"
+        "<tr><td>Film Two</td><td>Studio</td><td>Cast</td><td>[2]</td></tr></table>"
+    )
+    expected = parse_wikitables_soup(BeautifulSoup(html, "html.parser"))
+    assert expected[0][0] == ["J A N", "5", "FilmOne", "Studio", "Director (director);Actor", "[1]"]
+    assert parse_wikitables(html, "strainer") == expected
+    if HAS_LXML:
+        assert parse_wikitables(html, "lxml") == expected
+    print("[TEST] test_wiki_parser_backends_match_soup: passed")
+
+def test_http_metrics_snapshot_and_dump(tmp_path):
+    print("\n[TEST] test_http_metrics_snapshot_and_dump: started")
+    import json
+    from http_metrics import HttpMetrics, endpoint_of
+    base = "https://api.themoviedb.org/3"
+    assert endpoint_of(f"{base}/movie/42/credits", base) == "/movie/{id}/credits"
+    assert endpoint_of(f"{base}/discover/movie?page=3", base) == "/discover/movie"
+
+    metrics = HttpMetrics()
+    for i in range(1, 101):
+        metrics.record_request("/movie/{id}", 200, i / 1000, nbytes=10)
+    metrics.record_request("/movie/{id}", 429, 0.001)
+    metrics.record_retry("/movie/{id}", "429")
+    metrics.record_cache_hit("/movie/{id}")
+
+    stats = metrics.snapshot()["endpoints"]["/movie/{id}"]
+    assert stats["requests"] == 101
+    assert stats["status_codes"] == {"200": 100, "429": 1}
+    assert stats["latency_seconds"]["p50"] == 0.05
+    assert stats["latency_seconds"]["p99"] == 0.099
+    assert stats["bytes_received"] == 1000
+    assert stats["retries"] == {"429": 1} and stats["cache_hits"] == 1
+
+    assert json.loads(open(metrics.dump("run", str(tmp_path))).read())["endpoints"]
+    prom = open(metrics.dump("run", str(tmp_path), fmt="prometheus")).read()
+    assert 'tmdb_http_requests_total{endpoint="/movie/{id}",status="429"} 1' in prom
+    print("[TEST] test_http_metrics_snapshot_and_dump: passed")
+
+def test_recorder_replays_without_network(tmp_path, monkeypatch):
+    print("\n[TEST] test_recorder_replays_without_network: started")
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    from recorder import ResponseRecorder
+    from api_client import TMDbAPIClient
+    path = str(tmp_path / "recordings.jsonl")
+    recorder = ResponseRecorder(path, mode="record")
+    recorder.record("/search/movie", {"api_key": "secret", "query": "Dune", "page": 1, "include_adult": False}, {"results": [{"id": 1}]})
+    recorder.close()
+    assert "secret" not in open(path).read()
+
+    client = TMDbAPIClient(recorder=ResponseRecorder(path, mode="replay"))
+    assert client.cache is None
+    params = {"api_key": "other", "query": "Dune", "page": "1", "include_adult": "false", "primary_release_year": None}
+    assert client.make_request_with_retries(f"{client.base_url}/search/movie", params) == {"results": [{"id": 1}]}
+    # Anything not recorded fails like a request error instead of going to the network
+    assert client.make_request_with_retries(f"{client.base_url}/movie/2", {}) is None
+    print("[TEST] test_recorder_replays_without_network: passed")
+
+def test_hash_index_change_detection(tmp_path):
+    print("\n[TEST] test_hash_index_change_detection: started")
+    import csv, os
+    from checkpoint import CheckpointedCSVWriter
+    from change_detection import finalize_extract, hash_index_path
+    output_path = str(tmp_path / "ko_movies_2024.csv")
+
+    def run(records):
+        with CheckpointedCSVWriter(output_path) as writer:
+            for record in records:
+                writer.write(record["tmdb_id"], record)
+            writer.commit()
+        with open(output_path, encoding="utf-8") as f:
+            return {row["tmdb_id"]: row["is_data_updated"] for row in csv.DictReader(f)}
+
+    assert run([{"tmdb_id": 3, "title": "C", "rating": 7.5}, {"tmdb_id": 1, "title": "A", "rating": None}]) == {"1": "True", "3": "True"}
+    # Rows come back sorted by id and only new or changed content is flagged
+    flags = run([{"tmdb_id": 2, "title": "B"}, {"tmdb_id": 3, "title": "C", "rating": 8.0}, {"tmdb_id": 1, "title": "A", "rating": ""}])
+    assert list(flags.items()) == [("1", "False"), ("2", "True"), ("3", "True")]
+    assert [line.split("\t")[0] for line in open(hash_index_path(output_path))] == ["1", "2", "3"]
+
+    # Without an index the previous CSV is hashed instead, here with spilled sort runs
+    os.remove(hash_index_path(output_path))
+    part_path = output_path + ".part"
+    with open(output_path, encoding="utf-8") as src, open(part_path, "w", encoding="utf-8") as dst:
+        dst.write(src.read())
+    assert finalize_extract(part_path, output_path, run_rows=1) == {"rows": 3, "updated": 0}
+    print("[TEST] test_hash_index_change_detection: passed")
+
+def test_parquet_export_schema_and_projection(tmp_path):
+    print("\n[TEST] test_parquet_export_schema_and_projection: started")
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from utils import save_movies_to_csv
+    from parquet_store import export_csv_to_parquet, RAW_SCHEMA
+    from utils_transformer import load_parquet_to_dataframe
+    csv_path = str(tmp_path / "raw" / "th_movies_2024.csv")
+    save_movies_to_csv([
+        {"tmdb_id": 1, "title": "A", "budget": 100, "rating": 7.5, "is_data_updated": True},
+        {"tmdb_id": 2, "title": "B", "budget": None, "rating": None, "is_data_updated": False},
+    ], csv_path)
+
+    path = export_csv_to_parquet(csv_path, "tmdb", "th", 2024, root=str(tmp_path / "parquet"))
+    assert path.endswith("source=tmdb/language=th/year=2024/th_movies_2024.parquet")
+    table = pq.read_table(path)
+    assert table.schema == RAW_SCHEMA
+    assert table.column("budget").to_pylist() == [100, None]
+    assert table.column("is_data_updated").to_pylist() == [True, False]
+
+    df = load_parquet_to_dataframe(path, columns=["tmdb_id", "title", "not_a_column"])
+    assert list(df.columns) == ["tmdb_id", "title"]
+    print("[TEST] test_parquet_export_schema_and_projection: passed")
+
+def test_transform_engine_matches_scalar_helpers():
+    print("\n[TEST] test_transform_engine_matches_scalar_helpers: started")
+    import pandas as pd
+    from utils_transformer import clean_text, parse_date, standardize_language_code
+    from transform_engine import clean_text_series, parse_date_series, standardize_language_series, transform_frame
+    from schema import widen_floats
+    texts = pd.Series(["  Warner  Bros.!", "기생충: Parasite", "Amélie (2001)", None, "a\x1fb\tc", "Warner  Bros.!"])
+    assert list(clean_text_series(texts)) == [clean_text(t) for t in texts]
+    dates = pd.Series(["2024-01-05", "2024-1-5", "2024-02-30", " 2024-01-05", None, "2024-01-05"])
+    assert list(parse_date_series(dates).fillna("none")) == [parse_date(d) or "none" for d in dates]
+    codes = pd.Series(["ko", "KO", "ru", "RU", "en"])
+    assert list(standardize_language_series(codes)) == [standardize_language_code(c) for c in codes]
+    assert list(standardize_language_series(codes)) == ["Korean", "Korean", "RU", "RU", "English"]
+
+    raw = pd.DataFrame({"tmdb_id": [1, 2], "title": ["A!", "B"], "rating": [7.25, 8.0], "vote_count": ["10", "x"],
+                        "runtime": [90, None], "release_date": ["2024-03-01", None], "original_language": ["hi", "fr"],
+                        "is_data_updated": [True, False]})
+    clean = widen_floats(transform_frame(raw, "wiki"))
+    assert clean.to_dict("records") == [{"tmdb_id": 1, "title": "A", "rating": 7.2, "release_date": "2024-03-01",
+                                         "original_language": "Hindi", "vote_count": 10, "runtime": 90,
+                                         "source": "Wikipedia"}]
+    print("[TEST] test_transform_engine_matches_scalar_helpers: passed")
+
+def test_parallel_transform_collects_results_and_errors(tmp_path):
+    print("\n[TEST] test_parallel_transform_collects_results_and_errors: started")
+    import pandas as pd
+    from transform_engine import process_all_files
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    for lang in ("ko", "th"):
+        pd.DataFrame({"tmdb_id": [1, 2], "title": ["A", "B"], "rating": [7.0, 8.0], "vote_count": [1, 2],
+                      "runtime": [90, 100], "release_date": ["2024-01-01", "2024-02-01"],
+                      "original_language": [lang, lang]}).to_csv(raw_dir / f"{lang}_movies_2024.csv", index=False)
+    (raw_dir / "broken_movies_2024.csv").write_text("")
+
+    results = process_all_files("tmdb", str(raw_dir), str(tmp_path / "clean"), workers=2)
+    by_name = {os.path.basename(result["input_path"]): result for result in results}
+    assert by_name["ko_movies_2024.csv"]["rows"] == 2 and by_name["ko_movies_2024.csv"]["error"] is None
+    assert by_name["broken_movies_2024.csv"]["error"]
+    assert sorted(os.listdir(tmp_path / "clean")) == ["clean_ko_movies_2024.csv", "clean_th_movies_2024.csv"]
+    assert "df" not in by_name["th_movies_2024.csv"]
+
+    # A file that cannot be saved is reported as failed, not as transformed
+    (tmp_path / "blocked").write_text("")
+    results = process_all_files("tmdb", str(raw_dir), str(tmp_path / "blocked" / "clean"), workers=1)
+    assert all(result["error"] for result in results)
+    print("[TEST] test_parallel_transform_collects_results_and_errors: passed")
+
+def test_chunked_transform_matches_whole_file(tmp_path, monkeypatch):
+    print("\n[TEST] test_chunked_transform_matches_whole_file: started")
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    import transform_engine
+    raw = pd.DataFrame({"tmdb_id": range(1, 8), "title": [f"T{i}!" for i in range(7)], "budget": [1, None, 3, 4, 5, 6, 7],
+                        "rating": [7.0] * 7, "vote_count": [1] * 7, "runtime": [90, None, 90, 90, 90, 90, 90],
+                        "release_date": ["2024-01-01", None, "bad", "2024-01-04", None, None, "2024-01-07"],
+                        "original_language": ["ko"] * 7, "is_data_updated": [True, True, False, True, False, True, True]})
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    raw.to_csv(raw_dir / "ko_movies_2024.csv", index=False)
+    raw.to_parquet(raw_dir / "ko_movies_2024.parquet", index=False)
+
+    transform_engine.process_all_files("tmdb", str(raw_dir), str(tmp_path / "whole"), workers=1, chunksize=0)
+    transform_engine.process_all_files("tmdb", str(raw_dir), str(tmp_path / "chunked"), workers=1, chunksize=2)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "whole" / "clean_ko_movies_2024.csv"),
+                                  pd.read_csv(tmp_path / "chunked" / "clean_ko_movies_2024.csv"))
+
+    monkeypatch.setattr(transform_engine, "clean_output_path", lambda path, out: os.path.join(out, "clean.parquet"))
+    result = transform_engine._stream_transform_and_save(str(raw_dir / "ko_movies_2024.parquet"), "tmdb",
+                                                         str(tmp_path / "parquet"), chunksize=2)
+    clean = pd.read_parquet(result["output_path"])
+    assert result["rows"] == len(clean) == 5
+    assert clean["tmdb_id"].tolist() == [1, 2, 4, 6, 7]
+    assert clean["budget"].isna().tolist() == [False, True, False, False, False]
+    assert clean["release_date"].isna().tolist() == [False, True, False, True, False]
+    print("[TEST] test_chunked_transform_matches_whole_file: passed")
+
+def test_clean_schema_types_and_shrinks_frames(tmp_path):
+    print("\n[TEST] test_clean_schema_types_and_shrinks_frames: started")
+    import pandas as pd
+    from schema import load_clean_frame, widen_floats, CLEAN_SCHEMA
+    n = 2000
+    pd.DataFrame({"tmdb_id": range(n), "title": [f"T{i}" for i in range(n)], "rating": [7.2] * n,
+                  "runtime": [None] + [90] * (n - 1), "vote_count": [12] * n,
+                  "original_language": ["Korean", "English"] * (n // 2), "genres": ["Drama, Comedy"] * n,
+                  "release_date": ["2024-01-01"] * n, "source": ["TMDB"] * n}).to_csv(tmp_path / "clean.csv", index=False)
+    raw = pd.read_csv(tmp_path / "clean.csv")
+    df = load_clean_frame(str(tmp_path / "clean.csv"))
+    for col, dtype in CLEAN_SCHEMA.items():
+        if col in df.columns:
+            assert str(df[col].dtype) == dtype
+    assert df["runtime"].isna().sum() == 1 and df["runtime"][1] == 90
+    assert df.memory_usage(deep=True).sum() * 2 < raw.memory_usage(deep=True).sum()
+    assert widen_floats(df)["rating"].tolist()[0] == 7.2
+    print("[TEST] test_clean_schema_types_and_shrinks_frames: passed")
+
+def test_vectorized_normalizer_matches_row_path(tmp_path, monkeypatch):
+    print("\n[TEST] test_vectorized_normalizer_matches_row_path: started")
+    import pandas as pd
+    import data_normalizer
+    clean_dir = tmp_path / "clean"
+    clean_dir.mkdir()
+    pd.DataFrame({"tmdb_id": [5, 6, 7, 5], "title": ["A", None, "C", "A2"],
+                  "release_date": ["2024-01-05", None, "2024-02-30", "2023-12-31"],
+                  "production_companies": ["B Co, A Co, B Co", None, " , A Co", "C Co"],
+                  "genres": ["Drama", "Drama, Action", "", "Action"],
+                  "directors": ["Jane Doe", "Jane Doe", None, "Ann Lee, Jane Doe"],
+                  "actors": ["John Smith (Hero), Mary Major", "lowercase only", None, "Mary Major"]}
+                 ).to_csv(clean_dir / "clean_a.csv", index=False)
+    pd.DataFrame({"tmdb_id": [8], "title": ["D"], "release_date": ["2024-01-05"],
+                  "production_companies": ["D Co, A Co"]}).to_csv(clean_dir / "clean_b.csv", index=False)
+
+    outputs = {}
+    for mode in ("rows", "vectorized"):
+        monkeypatch.setattr(data_normalizer, "NORMALIZER_MODE", mode)
+        normalizer = data_normalizer.DataNormalizer(csv_dir=str(clean_dir), output_dir=str(tmp_path / mode),
+                                                    registry_path=None)
+        normalizer.process_files()
+        normalizer.export_to_json()
+        outputs[mode] = {name: (tmp_path / mode / name).read_text() for name in os.listdir(tmp_path / mode)}
+        assert normalizer.fact_id_map[5] == 4 and normalizer.fact_id_counter == 6
+    assert outputs["rows"] == outputs["vectorized"]
+    assert '"name":"nan"' in outputs["vectorized"]["production_company.ndjson"]
+    print("[TEST] test_vectorized_normalizer_matches_row_path: passed")
+
+def test_key_registry_keeps_ids_between_runs(tmp_path):
+    print("\n[TEST] test_key_registry_keeps_ids_between_runs: started")
+    import json
+    import pandas as pd
+    from data_normalizer import DataNormalizer
+    from key_registry import KeyRegistry
+    registry_path = str(tmp_path / "keys.sqlite")
+    clean_dir = tmp_path / "clean"
+    clean_dir.mkdir()
+
+    def run(rows):
+        pd.DataFrame(rows).to_csv(clean_dir / "clean_a.csv", index=False)
+        normalizer = DataNormalizer(csv_dir=str(clean_dir), output_dir=str(tmp_path / "json"), registry_path=registry_path)
+        normalizer.process_files()
+        normalizer.export_to_json()
+        return normalizer, json.loads((tmp_path / "json" / "key_registry_delta.json").read_text())
+
+    first, delta = run([{"tmdb_id": 1, "title": "A", "production_companies": "X Co, Y Co", "source": "TMDB"},
+                        {"tmdb_id": 2, "title": "B", "production_companies": "Y Co", "source": "TMDB"}])
+    assert first.production_companies == {"X Co": 1, "Y Co": 2} and delta["new"]["fact"] == [1, 2]
+
+    second, delta = run([{"tmdb_id": 3, "title": "C", "production_companies": "Z Co, Y Co", "source": "TMDB"},
+                         {"tmdb_id": 2, "title": "B2", "production_companies": "Y Co", "source": "TMDB"},
+                         {"tmdb_id": 2, "title": "B3", "production_companies": "Y Co", "source": "TMDB"}])
+    assert second.production_companies == {"Z Co": 3, "Y Co": 2}
+    assert second.fact_id_map == {3: 3, 2: 2}
+    # Like the facts and bridges, the movie dimension keeps the first row of a key
+    assert second.movies == [{"tmdb_id": 3, "title": "C"}, {"tmdb_id": 2, "title": "B2"}]
+    assert delta["new"] == {"production_company": [3], "genre": [], "director": [], "actor": [], "fact": [3]}
+    assert delta["facts"] == [2, 3]
+    assert second.fact_companies == [{"fact_id": 3, "company_id": 3}, {"fact_id": 3, "company_id": 2},
+                                     {"fact_id": 2, "company_id": 2}]
+    with KeyRegistry(registry_path) as registry:
+        assert registry.lookup("fact", ["TMDB:1", "TMDB:9"]) == {"TMDB:1": 1, "TMDB:9": None}
+    print("[TEST] test_key_registry_keeps_ids_between_runs: passed")
+
+def test_parallel_normalizer_matches_sequential_names(tmp_path, monkeypatch):
+    print("\n[TEST] test_parallel_normalizer_matches_sequential_names: started")
+    import pandas as pd
+    import data_normalizer
+    clean_dir = tmp_path / "clean"
+    clean_dir.mkdir()
+    pd.DataFrame({"tmdb_id": [9, 5], "title": ["B", "A"], "release_date": ["2024-03-01", "2023-12-31"],
+                  "production_companies": ["Z Co, A Co", "A Co"], "genres": ["Drama", "Action, Drama"],
+                  "actors": ["Mary Major", "John Smith (Hero), Mary Major"], "source": ["TMDB", "TMDB"]}
+                 ).to_csv(clean_dir / "clean_a.csv", index=False)
+    pd.DataFrame({"tmdb_id": [7], "title": ["C"], "release_date": ["2024-01-05"], "production_companies": ["M Co"],
+                  "genres": ["Comedy"], "actors": ["Ann Lee"], "source": ["TMDB"]}).to_csv(clean_dir / "clean_b.csv", index=False)
+
+    def named(normalizer):
+        """Bridges as (tmdb_id, name) pairs, independent of the ids"""
+        movies = {row["fact_id"]: row["movie_id"] for row in normalizer.fact_movie}
+        result = {}
+        for _, names_attr, bridge_attr, id_field, _ in data_normalizer.DIMENSIONS:
+            names = {dim_id: name for name, dim_id in getattr(normalizer, names_attr).items()}
+            result[names_attr] = sorted((movies[row["fact_id"]], names[row[id_field]])
+                                        for row in getattr(normalizer, bridge_attr))
+        return result
+
+    runs = {}
+    for workers in (1, 2):
+        monkeypatch.setattr(data_normalizer, "NORMALIZER_WORKERS", workers)
+        runs[workers] = data_normalizer.DataNormalizer(csv_dir=str(clean_dir), output_dir=str(tmp_path / str(workers)),
+                                                       registry_path=None)
+        runs[workers].process_files()
+    sequential, parallel = runs[1], runs[2]
+    assert named(parallel) == named(sequential)
+    assert sorted(parallel.date_dim) == sorted(sequential.date_dim)
+    # Ids follow the sorted natural keys, not the file or row order
+    assert parallel.production_companies == {"A Co": 1, "M Co": 2, "Z Co": 3}
+    assert parallel.fact_id_map == {5: 1, 7: 2, 9: 3} and parallel.fact_id_counter == 4
+    assert [row["fact_id"] for row in parallel.fact_genres] == [1, 1, 2, 3]
+    print("[TEST] test_parallel_normalizer_matches_sequential_names: passed")
+
+def test_record_writer_formats_and_streaming_reader(tmp_path):
+    print("\n[TEST] test_record_writer_formats_and_streaming_reader: started")
+    import json
+    import numpy as np
+    from ndjson_io import RecordWriter, write_records, iter_records, find_artifact
+    records = [{"fact_id": 1, "title": "기생충", "genres": ["Drama"]}, {"fact_id": np.int64(2), "rating": 7.5}]
+    plain = [{"fact_id": 1, "title": "기생충", "genres": ["Drama"]}, {"fact_id": 2, "rating": 7.5}]
+    for rows in (plain, []):
+        write_records(str(tmp_path / "legacy.json"), rows)
+        assert (tmp_path / "legacy.json").read_text(encoding="utf-8") == json.dumps(rows, indent=2, ensure_ascii=False)
+
+    assert write_records(str(tmp_path / "fact.ndjson"), iter(records)) == 2
+    lines = (tmp_path / "fact.ndjson").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2 and " " not in lines[1]
+    assert list(iter_records(str(tmp_path / "fact.ndjson"))) == plain
+    assert find_artifact(str(tmp_path), "legacy").endswith("legacy.json")
+
+    # A failed write leaves the previous file in place
+    with pytest.raises(TypeError):
+        with RecordWriter(str(tmp_path / "fact.ndjson")) as writer:
+            writer.write({"bad": object()})
+    assert list(iter_records(str(tmp_path / "fact.ndjson"))) == plain
+    assert not (tmp_path / "fact.ndjson.tmp").exists()
+    print("[TEST] test_record_writer_formats_and_streaming_reader: passed")
+
+def test_vectorized_fact_builder_matches_rows_and_memory(tmp_path, monkeypatch):
+    print("\n[TEST] test_vectorized_fact_builder_matches_rows_and_memory: started")
+    import pandas as pd
+    import star_fact_builder
+    from data_normalizer import DataNormalizer
+    from ndjson_io import iter_records
+    clean_dir = tmp_path / "clean"
+    clean_dir.mkdir()
+    pd.DataFrame({"tmdb_id": [5, 6, 7], "title": ["A", "B", "C"], "budget": [10, None, 30], "rating": [7.2, 8.0, None],
+                  "release_date": ["2024-01-05", None, "2024-02-01"],
+                  "production_companies": ["B Co, A Co, B Co", None, "A Co"], "genres": ["Drama", "Drama, Action", ""],
+                  "directors": ["Jane Doe", "Jane Doe", None], "actors": ["John Smith (Hero), Mary Major", None, "Ann Lee"],
+                  "source": ["TMDB", "TMDB", "TMDB"]}).to_csv(clean_dir / "clean_a.csv", index=False)
+    normalizer = DataNormalizer(csv_dir=str(clean_dir), output_dir=str(tmp_path / "json"), registry_path=None)
+    normalizer.process_files()
+    normalizer.export_to_json()
+
+    outputs = {}
+    for mode in ("rows", "vectorized", "memory"):
+        monkeypatch.setattr(star_fact_builder, "FACT_BUILDER_MODE", "rows" if mode == "rows" else "vectorized")
+        builder = star_fact_builder.StarFactBuilder(csv_dir=str(clean_dir), json_dir=str(tmp_path / "json"),
+                                                    output_path=str(tmp_path / f"{mode}.ndjson"), registry_path=None)
+        builder.merge_fact_table(normalizer if mode == "memory" else None)
+        outputs[mode] = list(iter_records(str(tmp_path / f"{mode}.ndjson")))
+    assert outputs["vectorized"] == outputs["memory"]
+    # The rows path builds the lists from a set, so only their contents can be compared
+    as_sets = lambda records: [{k: sorted(v) if isinstance(v, list) else v for k, v in r.items()} for r in records]
+    assert as_sets(outputs["rows"]) == as_sets(outputs["vectorized"])
+    first = outputs["vectorized"][0]
+    assert first["production_companies"] == ["B Co", "A Co"] and first["actors"] == ["John Smith", "Hero", "Mary Major"]
+    assert list(first)[-4:] == ["production_companies", "genres", "directors", "actors"]
+    assert outputs["vectorized"][2]["genres"] == ["nan"]
+    print("[TEST] test_vectorized_fact_builder_matches_rows_and_memory: passed")
+
+def test_copy_loader_streams_rows_and_merges_from_staging():
+    print("\n[TEST] test_copy_loader_streams_rows_and_merges_from_staging: started")
+    from load_json_to_postgres import CopyStream, copy_table, FACT_COLUMNS
+
+    stream = CopyStream([(1, "Tab\there", None), (2, "back\\slash\nline", float("nan"))], batch_rows=1)
+    chunks = iter(lambda: stream.read(5), b"")
+    assert b"".join(chunks) == b"1\tTab\\there\t\\N\n2\tback\\\\slash\\nline\t\\N\n"
+    assert stream.count == 2
+
+    class RecordingCursor:
+        """Records the SQL and reads COPY data the way psycopg2 does"""
+        def __init__(self):
+            self.statements, self.copied = [], b""
+        def execute(self, sql):
+            self.statements.append(sql)
+        def copy_expert(self, sql, stream, size=8192):
+            self.statements.append(sql)
+            self.copied = b"".join(iter(lambda: stream.read(size), b""))
+
+    cursor = RecordingCursor()
+    records = ({"fact_id": i, "tmdb_id": i * 10, "title": f"T{i}", "extra": "ignored"} for i in range(1, 4))
+    assert copy_table(cursor, "fact", FACT_COLUMNS, ["fact_id"], records) == 3
+    assert cursor.copied.splitlines()[0] == b"1\t10\tT1" + b"\t\\N" * 8
+    assert cursor.statements[0].startswith("CREATE TEMP TABLE stage_fact (LIKE fact")
+    assert cursor.statements[1] == f"COPY stage_fact ({', '.join(FACT_COLUMNS)}) FROM STDIN"
+    assert "DISTINCT ON (fact_id)" in cursor.statements[2] and "title = EXCLUDED.title" in cursor.statements[2]
+
+    cursor = RecordingCursor()
+    copy_table(cursor, "fact_genre", ["fact_id", "genre_id"], ["fact_id", "genre_id"], [{"fact_id": 1, "genre_id": 2}])
+    # The links of every reloaded fact are replaced, not just added to
+    assert cursor.statements[2] == "DELETE FROM fact_genre WHERE fact_id IN (SELECT fact_id FROM stage_fact)"
+    assert cursor.statements[3].endswith("ON CONFLICT (fact_id, genre_id) DO NOTHING")
+    assert "WHERE fact_id IN (SELECT fact_id FROM fact)" in cursor.statements[3]
+    print("[TEST] test_copy_loader_streams_rows_and_merges_from_staging: passed")
+
+def test_orm_fact_loader_round_trips_do_not_grow_with_facts(tmp_path, monkeypatch):
+    print("\n[TEST] test_orm_fact_loader_round_trips_do_not_grow_with_facts: started")
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    import load_json_to_postgres as loader
+    from create_table_in_postgres import Base, Genre, Actor, FactActor, FactGenre, Movie
+    from ndjson_io import write_records
+    monkeypatch.chdir(tmp_path)
+
+    def load(n):
+        write_records("Data/star_json/fact.ndjson", (
+            {"fact_id": i, "tmdb_id": 100 + i % 5, "title": f"T{i}", "release_date": "2024-01-05" if i % 2 else None,
+             "genres": ["Drama", f"Genre {i % 3}"], "actors": f"Actor {i}, Actor {i}", "source": "TMDB"}
+            for i in range(1, n + 1)))
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        session.add(Genre(genre_id=7, name="Drama"))
+        session.commit()
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        loader.load_facts_and_links(session)
+        return session, len(statements)
+
+    small_session, small = load(3)
+    session, large = load(30)
+    assert small == large
+    assert sorted(name for (name,) in session.query(Genre.name)) == ["Drama", "Genre 0", "Genre 1", "Genre 2"]
+    assert session.query(FactGenre).filter_by(genre_id=7).count() == 30
+    assert session.query(FactActor).count() == 30 and session.query(Actor).count() == 30
+    assert session.query(Movie).count() == 5
+    print("[TEST] test_orm_fact_loader_round_trips_do_not_grow_with_facts: passed")
+
+def test_async_client_matches_sync_client_against_stub(tmp_path):
+    print("\n[TEST] test_async_client_matches_sync_client_against_stub: started")
+    import asyncio
+    from aiohttp import web
+    sys.path.insert(0, os.path.join(project_root, "Benchmark"))
+    from stub_server import make_app, parse_args
+    from cache import ResponseCache
+    from api_client import TMDbAPIClient
+    from async_api_client import AsyncTMDbAPIClient
+
+    async def run():
+        runner = web.AppRunner(make_app(parse_args(["--discover-pages", "2"])))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base_url = f"http://127.0.0.1:{runner.addresses[0][1]}/3"
+        try:
+            sync_client = TMDbAPIClient(cache=ResponseCache(str(tmp_path / "sync.sqlite")))
+            sync_client.base_url = base_url
+            cache = ResponseCache(str(tmp_path / "async.sqlite"))
+            async with AsyncTMDbAPIClient(cache=cache) as client:
+                client.base_url = base_url
+                details = await client.get_many_full_details([7, 8, 7])
+                assert await client.get_movie_full_details(7) == details[7]
+                assert await client.search_movie_id("Dune", 2021) == \
+                    await asyncio.to_thread(sync_client.search_movie_id, "Dune", 2021)
+            for movie_id in (7, 8):
+                assert details[movie_id] == await asyncio.to_thread(sync_client.get_movie_full_details, movie_id)
+            assert details[7]["directors"] and details[7]["actors"]
+            # The repeated fetch of movie 7 was served by the cache
+            assert cache.stats()["hits"] == 1
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    print("[TEST] test_async_client_matches_sync_client_against_stub: passed")
+
+def test_iter_movies_fetches_each_page_and_movie_once(monkeypatch):
+    print("\n[TEST] test_iter_movies_fetches_each_page_and_movie_once: started")
+    from collections import Counter
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    from tmdb import TMDbMovieFetcher
+
+    class FakeClient:
+        base_url, api_key = "http://tmdb.test", "key"
+
+        def __init__(self):
+            self.pages, self.details = Counter(), Counter()
+
+        def make_request_with_retries(self, url, params):
+            page = params["page"]
+            self.pages[page] += 1
+            return {"total_pages": 5, "results": [{"id": page * 10 + i, "title": f"M{page}{i}"} for i in range(3)]}
+
+        def get_movie_full_details(self, movie_id, refresh=False):
+            self.details[movie_id] += 1
+            return {"runtime": movie_id}
+
+    fetcher = TMDbMovieFetcher(max_workers=4, max_pages=4)
+    fetcher.api_client = client = FakeClient()
+    try:
+        previous = {"21": {"tmdb_id": 21, "runtime": 99}}
+        movies = list(fetcher.iter_movies("en", skip_ids={"10", "32"}, previous_records=previous))
+    finally:
+        fetcher.close()
+
+    # max_pages caps the discover pages, each fetched exactly once
+    assert client.pages == Counter({1: 1, 2: 1, 3: 1, 4: 1})
+    ids = [movie["tmdb_id"] for movie in movies]
+    expected = {page * 10 + i for page in range(1, 5) for i in range(3)} - {10, 32}
+    assert len(ids) == len(set(ids)) and set(ids) == expected
+    # Skipped ids are never fetched, previous records are reused without a detail request
+    assert set(client.details) == expected - {21} and set(client.details.values()) == {1}
+    assert next(movie for movie in movies if movie["tmdb_id"] == 21)["runtime"] == 99
+    print("[TEST] test_iter_movies_fetches_each_page_and_movie_once: passed")
+
+def test_incremental_run_refreshes_changed_movies(tmp_path, monkeypatch):
+    print("\n[TEST] test_incremental_run_refreshes_changed_movies: started")
+    import requests
+    from datetime import date
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    from tmdb import TMDbMovieFetcher, reusable_records
+    from api_client import TMDbAPIClient
+    from cache import ResponseCache
+    from utils import save_movies_to_csv
+
+    class FakeClient:
+        base_url, api_key = "http://tmdb.test", "key"
+        failing_page = None
+
+        def __init__(self):
+            self.refreshed = {}
+
+        def make_request_with_retries(self, url, params):
+            if params["page"] == self.failing_page:
+                return None
+            if url.endswith("/movie/changes"):
+                return {"total_pages": 3, "results": [{"id": params["page"]}, {"id": 2}, {"adult": None}]}
+            return {"total_pages": 1, "results": [{"id": 1, "title": "A"}, {"id": 2, "title": "B"}]}
+
+        def get_movie_full_details(self, movie_id, refresh=False):
+            self.refreshed[movie_id] = refresh
+            return {}
+
+    fetcher = TMDbMovieFetcher(max_workers=2)
+    fetcher.api_client = client = FakeClient()
+    try:
+        # Every /movie/changes page is read, a failed page falls back to a full run
+        assert fetcher.fetch_changed_movie_ids(date(2024, 1, 1), date(2024, 1, 2)) == {"1", "2", "3"}
+        client.failing_page = 3
+        assert fetcher.fetch_changed_movie_ids(date(2024, 1, 1), date(2024, 1, 2)) is None
+        client.failing_page = None
+        # Changed movies fetch their details past the response cache
+        list(fetcher.iter_movies("en", refresh_ids={"2"}))
+        assert client.refreshed == {1: False, 2: True}
+    finally:
+        fetcher.close()
+
+    # Only rows TMDb did not report as changed are reused, and only on incremental runs
+    path = str(tmp_path / "en_movies_2024.csv")
+    save_movies_to_csv([{"tmdb_id": 1, "title": "Old", "runtime": 90, "is_data_updated": True},
+                        {"tmdb_id": 2, "title": "B", "runtime": 100, "is_data_updated": False}], path)
+    assert reusable_records(path, None) == {}
+    reused = reusable_records(path, {"2", "3"})
+    assert list(reused) == ["1"]
+    record = TMDbMovieFetcher.refresh_record({"title": "New", "vote_average": 7.5}, 1, reused["1"])
+    assert record["title"] == "New" and record["rating"] == 7.5 and record["runtime"] == "90"
+    assert "is_data_updated" not in record
+
+    # refresh=True skips the cached payload and stores the fresh one
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    api = TMDbAPIClient(cache=cache)
+    url = f"{api.base_url}/movie/5"
+    params = {"api_key": api.api_key, "language": "en-US", "append_to_response": "credits"}
+    cache.set(url, params, {"id": 5, "runtime": 90})
+
+    def fresh_response(url, params=None):
+        response = requests.Response()
+        response.status_code, response._content = 200, b'{"id": 5, "runtime": 120}'
+        return response
+
+    monkeypatch.setattr(api.session, "get", fresh_response)
+    assert api.get_movie_full_details(5)["runtime"] == 90
+    assert api.get_movie_full_details(5, refresh=True)["runtime"] == 120
+    assert cache.get(url, params) == {"id": 5, "runtime": 120}
+
+    # A refresh does not join a plain fetch of the same movie that is still reading the stale entry
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    cache.set(url, params, {"id": 5, "runtime": 90})
+    cached_get = cache.get
+    monkeypatch.setattr(cache, "get", lambda *args: time.sleep(0.3) or cached_get(*args))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        plain = executor.submit(api.get_movie_full_details, 5)
+        time.sleep(0.1)
+        refreshed = executor.submit(api.get_movie_full_details, 5, True)
+        assert refreshed.result()["runtime"] == 120
+        plain.result()
+    cache.close()
+    print("[TEST] test_incremental_run_refreshes_changed_movies: passed")
+
+def test_wiki_year_specs_and_pages():
+    print("\n[TEST] test_wiki_year_specs_and_pages: started")
+    from wiki import parse_years, wiki_pages
+    # Ranges and lists mix, overlaps collapse, empty parts are ignored
+    assert parse_years("2015-2017, 2010,,2016") == [2010, 2015, 2016, 2017]
+    assert parse_years("2024") == [2024]
+    assert parse_years("") == []
+    for bad in ("20x4", "2015-", "2015-2017-2019"):
+        with pytest.raises(ValueError):
+            parse_years(bad)
+
+    pages = wiki_pages([2023, 2024], ["American", "Hong Kong"])
+    assert [(page['year'], os.path.basename(page['output_path'])) for page in pages] == [
+        (2023, "en_movies_2023.csv"), (2024, "en_movies_2024.csv"),
+        (2023, "hong_kong_movies_2023.csv"), (2024, "hong_kong_movies_2024.csv")]
+    assert pages[2]['url'].endswith("/wiki/List_of_Hong_Kong_films_of_2023")
+    print("[TEST] test_wiki_year_specs_and_pages: passed")
+
+def test_scrape_page_not_modified_keeps_output(tmp_path, monkeypatch):
+    print("\n[TEST] test_scrape_page_not_modified_keeps_output: started")
+    import requests
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    monkeypatch.setenv("TITLE_INDEX_ENABLED", "false")
+    from wiki import WikipediaMovieScraper, scrape_page
+    scraper = WikipediaMovieScraper()
+    sent = []
+
+    def not_modified(url, headers=None, timeout=None):
+        sent.append(headers)
+        response = requests.Response()
+        response.status_code, response._content = 304, b""
+        return response
+
+    monkeypatch.setattr(scraper.session, "get", not_modified)
+    output_path = tmp_path / "en_movies_2024.csv"
+    output_path.write_text("tmdb_id,title\n1,Old\n")
+    before = output_path.stat().st_mtime_ns
+    page = {'url': "https://en.wikipedia.org/wiki/List_of_American_films_of_2024", 'year': 2024,
+            'output_path': str(output_path)}
+    validators = {'etag': '"abc"', 'last_modified': "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+    assert scrape_page(scraper, page, validators) is None
+    assert sent == [{'If-None-Match': '"abc"', 'If-Modified-Since': "Mon, 01 Jan 2024 00:00:00 GMT"}]
+    assert output_path.read_text() == "tmdb_id,title\n1,Old\n" and output_path.stat().st_mtime_ns == before
+    assert os.listdir(tmp_path) == ["en_movies_2024.csv"]
+
+    # Without the page's output the validators are not sent
+    page['output_path'] = str(tmp_path / "missing.csv")
+    scrape_page(scraper, page, validators)
+    assert sent[-1] == {}
+    print("[TEST] test_scrape_page_not_modified_keeps_output: passed")
+
+def test_async_title_resolution_uses_index_off_the_loop(tmp_path, monkeypatch):
+    print("\n[TEST] test_async_title_resolution_uses_index_off_the_loop: started")
+    import asyncio
+    import threading
+    monkeypatch.setenv("TMDB_CACHE_ENABLED", "false")
+    from wiki import WikipediaMovieScraper
+    from title_index import TitleResolutionIndex
+    index = TitleResolutionIndex(path=str(tmp_path / "index.sqlite"), overrides_path=None)
+    scraper = WikipediaMovieScraper(title_index=index)
+    searches, index_threads = [], []
+    for name in ("lookup", "record"):
+        method = getattr(index, name)
+        monkeypatch.setattr(index, name, lambda *args, method=method: index_threads.append(threading.get_ident()) or method(*args))
+
+    class FakeAsyncClient:
+        async def search_movie_id(self, title, year):
+            searches.append(title)
+            return True, 693134
+
+    async def resolve_twice():
+        client = FakeAsyncClient()
+        first = await scraper.resolve_movie_id_async("Dune: Part Two", 2024, client)
+        return first, await scraper.resolve_movie_id_async("dune part two", 2024, client), threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(resolve_twice())
+    # The second title is answered by the index, and the index never runs on the loop's thread
+    assert first == second == 693134 and searches == ["Dune: Part Two"]
+    assert len(index_threads) == 3 and loop_thread not in index_threads
+    index.close()
+    print("[TEST] test_async_title_resolution_uses_index_off_the_loop: passed")
+
 # def test_create_tables():
 #     print("\n[TEST] test_create_tables: started")
 #     from Load.create_table_in_postgres import create_tables
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, List, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:  # only the chunked Parquet writer needs CLEAN_ARROW_SCHEMA
+    HAS_PYARROW = False
+
+# In-memory dtypes of the raw extract columns the transformers read. rating
+# stays float64 here so that round(1) gives the same results as before
+RAW_SCHEMA = {
+    'tmdb_id': 'Int64',
+    'budget': 'Int64',
+    'revenue': 'Int64',
+    'original_language': 'category',
+    'genres': 'category',
+}
+
+# Compact in-memory dtypes of the clean data, shared by the transformers,
+# DataNormalizer and StarFactBuilder. Integers are nullable so missing values
+# no longer turn them into floats; free text (title, companies, directors,
+# actors) keeps the default string dtype
+CLEAN_SCHEMA = {
+    'tmdb_id': 'Int64',
+    'budget': 'Int64',
+    'revenue': 'Int64',
+    'rating': 'float32',
+    'vote_count': 'Int32',
+    'runtime': 'Int32',
+    'release_date': 'category',
+    'original_language': 'category',
+    'genres': 'category',
+    'source': 'category',
+}
+
+# Decimals of the float32 columns, used to give back the exact values when exporting
+FLOAT_DECIMALS = {'rating': 1}
+
+# Column types of clean Parquet files written chunk by chunk, every chunk must share them
+CLEAN_ARROW_SCHEMA = pa.schema([
+    ('tmdb_id', pa.int64()),
+    ('title', pa.string()),
+    ('budget', pa.int64()),
+    ('revenue', pa.int64()),
+    ('rating', pa.float32()),
+    ('release_date', pa.string()),
+    ('original_language', pa.string()),
+    ('production_companies', pa.string()),
+    ('genres', pa.string()),
+    ('directors', pa.string()),
+    ('actors', pa.string()),
+    ('vote_count', pa.int32()),
+    ('runtime', pa.int32()),
+    ('source', pa.string()),
+]) if HAS_PYARROW else None
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Deep in-memory size of a DataFrame in MB"""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str] = CLEAN_SCHEMA) -> pd.DataFrame:
+    """Convert the columns of df present in schema to their dtype, in place, and return df
+
+    Numbers are coerced like pd.to_numeric(errors='coerce'); a column with
+    non-integral values for an integer dtype keeps its float dtype.
+    """
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        try:
+            df[col] = values.astype(dtype)
+        except (TypeError, ValueError):
+            df[col] = values
+    return df
+
+
+def widen_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df with the float32 columns back as float64 rounded to FLOAT_DECIMALS, for exports"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'float32':
+            df[col] = df[col].astype('float64').round(FLOAT_DECIMALS.get(col, 6))
+    return df
+
+
+def load_clean_frame(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a clean CSV or Parquet file with CLEAN_SCHEMA and print its memory before and after"""
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=None if columns is None else (lambda col: col in columns))
+    before = memory_mb(df)
+    apply_schema(df)
+    print(f"[INFO] {os.path.basename(path)}: {len(df)} rows, {before:.1f} MB -> {memory_mb(df):.1f} MB in memory")
+    return df
@@ -0,0 +1,251 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils_transformer import (
+    load_dataframe,
+    save_dataframe,
+    iter_dataframe_chunks,
+    list_raw_files,
+    clean_output_path,
+    RAW_COLUMNS,
+    DATA_FORMAT,
+    LANGUAGE_CODE_MAP
+)
+from schema import RAW_SCHEMA, CLEAN_SCHEMA, CLEAN_ARROW_SCHEMA, apply_schema, memory_mb
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:  # the ASCII fast path of clean_text_series is skipped without pyarrow
+    HAS_PYARROW = False
+
+# Processes transforming files concurrently, 1 transforms them one after another in-process
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", str(os.cpu_count() or 1)))
+
+# Rows per chunk of the streaming transform in process_all_files, 0 reads each file whole
+TRANSFORM_CHUNKSIZE = int(os.getenv("TRANSFORM_CHUNKSIZE", "0"))
+
+# Value of the 'source' column per raw source
+SOURCE_LABELS = {'tmdb': 'TMDB', 'wiki': 'Wikipedia'}
+
+TEXT_COLUMNS = ['title', 'production_companies', 'genres', 'directors', 'actors']
+OUTPUT_COLUMNS = [
+    'tmdb_id', 'title', 'budget', 'revenue',
+    'rating', 'release_date', 'original_language', 'production_companies',
+    'genres', 'directors', 'actors', 'vote_count', 'runtime'
+]
+DATE_FORMAT = "%Y-%m-%d"
+
+# Same patterns as utils_transformer.clean_text. They are compiled on purpose:
+# pandas hands plain string patterns to pyarrow's RE2, whose \w and \s are ASCII only
+_SPECIAL_CHARS = re.compile(r'[^\w\s.,&-]')
+_WHITESPACE = re.compile(r'\s+')
+# RE2 equivalents for ASCII-only values (Python's \s also matches \v and \x1c-\x1f)
+_ASCII_SPECIAL_CHARS = r'[^A-Za-z0-9_\t\n\x0b\x0c\r \x1c-\x1f.,&-]'
+_ASCII_WHITESPACE = r'[\t\n\x0b\x0c\r \x1c-\x1f]+'
+
+
+def _map_unique(series: pd.Series, func: Callable[[np.ndarray], np.ndarray], missing) -> pd.Series:
+    """Apply func to the distinct non-null values of series only and broadcast the results back"""
+    codes, uniques = pd.factorize(series)
+    results = np.empty(len(uniques) + 1, dtype=object)
+    results[:-1] = func(np.asarray(uniques, dtype=object))
+    results[-1] = missing  # code -1 (null) picks the last slot
+    return pd.Series(results[codes], index=series.index)
+
+
+def _clean_texts(values: np.ndarray) -> np.ndarray:
+    texts = [str(value) for value in values]
+    cleaned = np.empty(len(texts), dtype=object)
+    if HAS_PYARROW and texts:
+        array = pa.array(texts, type=pa.string())
+        is_ascii = pc.string_is_ascii(array).to_numpy(zero_copy_only=False)
+        fast = pc.replace_substring_regex(array.filter(is_ascii), _ASCII_SPECIAL_CHARS, '')
+        fast = pc.replace_substring_regex(fast, _ASCII_WHITESPACE, ' ')
+        cleaned[is_ascii] = pc.utf8_trim(fast, characters=' ').to_numpy(zero_copy_only=False)
+        remaining = np.flatnonzero(~is_ascii)
+    else:
+        remaining = np.arange(len(texts))
+    for i in remaining:
+        cleaned[i] = _WHITESPACE.sub(' ', _SPECIAL_CHARS.sub('', texts[i])).strip()
+    return cleaned
+
+
+def clean_text_series(series: pd.Series) -> pd.Series:
+    """Vectorized utils_transformer.clean_text: each distinct value is cleaned once, nulls become ''"""
+    return _map_unique(series, _clean_texts, "")
+
+
+def _parse_dates(values: np.ndarray) -> np.ndarray:
+    parsed = pd.to_datetime(pd.Series(values, dtype=object).astype(str), format=DATE_FORMAT, errors='coerce')
+    return parsed.dt.strftime(DATE_FORMAT).astype(object).where(parsed.notna(), None).to_numpy()
+
+
+def parse_date_series(series: pd.Series) -> pd.Series:
+    """Vectorized utils_transformer.parse_date with DATE_FORMAT, invalid dates and nulls become None"""
+    return _map_unique(series, _parse_dates, None)
+
+
+def _language_names(values: np.ndarray) -> np.ndarray:
+    return np.array([LANGUAGE_CODE_MAP.get(str(code).lower(), str(code).upper()) for code in values], dtype=object)
+
+
+def standardize_language_series(series: pd.Series) -> pd.Series:
+    """Vectorized utils_transformer.standardize_language_code, one lookup per distinct code"""
+    return _map_unique(series, _language_names, np.nan)
+
+
+def transform_frame(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    """Raw extract rows -> clean rows of OUTPUT_COLUMNS plus the source label, typed with CLEAN_SCHEMA"""
+    # Filter out rows where is_data_updated is present and False
+    if 'is_data_updated' in df.columns:
+        df = df[df['is_data_updated'].astype(str).str.lower() != 'false']
+
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = clean_text_series(df[col])
+
+    df['rating'] = df['rating'].round(1)
+    df['vote_count'] = pd.to_numeric(df['vote_count'], errors='coerce')
+    df['runtime'] = pd.to_numeric(df['runtime'], errors='coerce')
+    df['release_date'] = parse_date_series(df['release_date'])
+    df['original_language'] = standardize_language_series(df['original_language'])
+
+    # Only keep columns that exist in the dataframe
+    df = df[[col for col in OUTPUT_COLUMNS if col in df.columns]]
+    df['source'] = SOURCE_LABELS[source]
+    return apply_schema(df, CLEAN_SCHEMA)
+
+
+def _transform_and_save(input_path: str, source: str, output_dir: str) -> Dict[str, object]:
+    """Transform and save one raw file, raises on failure; returns its summary with the DataFrame under 'df'"""
+    # Load raw data
+    df = load_dataframe(input_path, columns=RAW_COLUMNS)
+    if df is None or df.empty:
+        raise ValueError("No data loaded or empty DataFrame")
+
+    before = memory_mb(df)
+    apply_schema(df, RAW_SCHEMA)
+    print(f"[INFO] Raw data: {before:.1f} MB -> {memory_mb(df):.1f} MB in memory")
+    df = transform_frame(df, source)
+
+    # Save transformed data
+    output_path = clean_output_path(input_path, output_dir)
+    # The save helpers report their own errors and return False instead of raising
+    if not save_dataframe(df, output_path):
+        raise IOError(f"Could not save {output_path}")
+
+    return {'input_path': input_path, 'output_path': output_path, 'rows': len(df), 'error': None, 'df': df}
+
+
+def _stream_transform_and_save(input_path: str, source: str, output_dir: str, chunksize: int) -> Dict[str, object]:
+    """Transform one raw file chunk by chunk, appending to its clean file; memory is bounded by chunksize
+
+    Chunks go to a temporary file that replaces the output only once the
+    whole file is transformed.
+    """
+    output_path = clean_output_path(input_path, output_dir)
+    tmp_path = f"{output_path}.tmp"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    chunks = rows = 0
+    writer = None
+    try:
+        for chunk in iter_dataframe_chunks(input_path, chunksize, columns=RAW_COLUMNS):
+            df = transform_frame(apply_schema(chunk, RAW_SCHEMA), source)
+            if output_path.endswith(".parquet"):
+                if writer is None:
+                    schema = pa.schema([field for field in CLEAN_ARROW_SCHEMA if field.name in df.columns])
+                    writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+                writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+            else:
+                df.to_csv(tmp_path, mode='w' if chunks == 0 else 'a', header=chunks == 0, index=False)
+            chunks += 1
+            rows += len(df)
+    except Exception:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if chunks == 0:
+        raise ValueError("No data loaded or empty DataFrame")
+    os.replace(tmp_path, output_path)
+    print(f"[SUCCESS] Saved {rows} records to {output_path} in {chunks} chunks")
+    return {'input_path': input_path, 'output_path': output_path, 'rows': rows, 'error': None}
+
+
+def transform_file(input_path: str, source: str, output_dir: str = "Data/clean_data") -> Optional[pd.DataFrame]:
+    """Transform one raw extract of source ('tmdb' or 'wiki') and save it to output_dir."""
+    try:
+        return _transform_and_save(input_path, source, output_dir)['df']
+    except Exception as e:
+        print(f"[ERROR] Transformation failed: {str(e)}")
+        return None
+
+
+def _transform_file_worker(input_path: str, source: str, output_dir: str, chunksize: int = 0) -> Dict[str, object]:
+    """Process pool entry point: never raises, only the summary goes back to the parent"""
+    try:
+        if chunksize > 0:
+            return _stream_transform_and_save(input_path, source, output_dir, chunksize)
+        result = _transform_and_save(input_path, source, output_dir)
+        del result['df']
+        return result
+    except Exception as e:
+        return {'input_path': input_path, 'output_path': None, 'rows': 0, 'error': str(e)}
+
+
+def process_all_files(source: str, input_dir: str, output_dir: str = "Data/clean_data",
+                      workers: int = TRANSFORM_WORKERS, chunksize: int = TRANSFORM_CHUNKSIZE) -> List[Dict[str, object]]:
+    """Process all raw files of source in input_dir (its Parquet partitions with DATA_FORMAT=parquet).
+
+    With more than one worker the files are transformed concurrently in a
+    process pool. With a chunksize each file is streamed in chunks of that
+    many rows, so peak memory is about workers x chunksize rows whatever the
+    file sizes. Returns one summary per file: input_path, output_path,
+    rows and error (None on success).
+    """
+    if DATA_FORMAT != "parquet" and not os.path.exists(input_dir):
+        print(f"[ERROR] Input directory {input_dir} does not exist")
+        return []
+
+    input_paths = list_raw_files(input_dir, source)
+    label = SOURCE_LABELS[source]
+    results = []
+
+    def report(result: Dict[str, object]):
+        results.append(result)
+        name = os.path.basename(result['input_path'])
+        if result['error']:
+            print(f"[ERROR] [{len(results)}/{len(input_paths)}] {label} file {name} failed: {result['error']}")
+        else:
+            print(f"[INFO] [{len(results)}/{len(input_paths)}] {label} file {name}: {result['rows']} rows")
+
+    workers = max(1, min(workers, len(input_paths)))
+    if workers == 1:
+        for input_path in input_paths:
+            print(f"\n[INFO] Processing {label} file: {os.path.basename(input_path)}")
+            report(_transform_file_worker(input_path, source, output_dir, chunksize))
+    else:
+        print(f"[INFO] Transforming {len(input_paths)} {label} files with {workers} processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_transform_file_worker, path, source, output_dir, chunksize) for path in input_paths]
+            for future in as_completed(futures):
+                report(future.result())
+
+    failed = sum(1 for result in results if result['error'])
+    if input_paths:
+        print(f"[SUCCESS] Transformed {len(results) - failed}/{len(results)} {label} files "
+              f"({sum(result['rows'] for result in results)} rows)")
+    return results
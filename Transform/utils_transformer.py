@@ -1,9 +1,107 @@
 import pandas as pd
 import os
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import re
 from datetime import datetime
 
+# 'csv' (default) or 'parquet': format read from Extract and written to clean_data
+DATA_FORMAT = os.getenv("DATA_FORMAT", "csv").lower()
+RAW_PARQUET_DIR = os.getenv("RAW_PARQUET_DIR", "Data/raw_parquet")
+
+# Raw columns the transformers use, only these are read from Parquet
+RAW_COLUMNS = [
+    'tmdb_id', 'title', 'budget', 'revenue', 'rating', 'vote_count', 'release_date',
+    'original_language', 'production_companies', 'genres', 'directors', 'actors',
+    'runtime', 'is_data_updated'
+]
+
+# Language code -> name; codes are lowercased before the lookup, so the
+# uppercase entries never match and those codes come out uppercased
+LANGUAGE_CODE_MAP = {
+    'hi': 'Hindi',
+    'ko': 'Korean',
+    'jp': 'Japanese',
+    'th': 'Thai',
+    'tl': 'Filipino',
+    'en': 'English',
+    'RU': 'Russian',
+    'MK': 'Macedonian',
+    'ZH': 'Chinese',
+    'FR': 'French',
+    'PL': 'Polish',
+    'EL': 'Greek',
+    'ES': 'Spanish'
+}
+
+def list_raw_files(csv_dir: str, source: str) -> List[str]:
+    """Raw extracts of a source: the CSVs in csv_dir, or its Parquet partitions with DATA_FORMAT=parquet"""
+    if DATA_FORMAT == "parquet":
+        root = os.path.join(RAW_PARQUET_DIR, f"source={source}")
+        return sorted(
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(root)
+            for filename in filenames if filename.endswith(".parquet")
+        )
+    if not os.path.exists(csv_dir):
+        return []
+    return [os.path.join(csv_dir, f) for f in os.listdir(csv_dir) if f.endswith(".csv")]
+
+def clean_output_path(input_path: str, output_dir: str) -> str:
+    """clean_<name> in output_dir, with the extension of DATA_FORMAT"""
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"clean_{name}.{'parquet' if DATA_FORMAT == 'parquet' else 'csv'}")
+
+def load_dataframe(file_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """Load a CSV or Parquet file (by extension); Parquet only reads the given columns"""
+    if file_path.endswith(".parquet"):
+        return load_parquet_to_dataframe(file_path, columns)
+    return load_csv_to_dataframe(file_path)
+
+def iter_dataframe_chunks(file_path: str, chunksize: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Read a CSV or Parquet file as DataFrames of at most chunksize rows, only the given columns"""
+    if file_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path)
+        if columns is not None:
+            columns = [col for col in columns if col in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    usecols = None if columns is None else (lambda col: col in columns)
+    with pd.read_csv(file_path, chunksize=chunksize, usecols=usecols) as reader:
+        yield from reader
+
+def save_dataframe(df: pd.DataFrame, output_path: str) -> bool:
+    """Save a DataFrame as CSV or Parquet depending on the extension"""
+    if output_path.endswith(".parquet"):
+        return save_dataframe_to_parquet(df, output_path)
+    return save_dataframe_to_csv(df, output_path)
+
+def load_parquet_to_dataframe(file_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """Load the given columns (those present in the file) of a Parquet file into a DataFrame."""
+    try:
+        import pyarrow.parquet as pq
+        if columns is not None:
+            available = set(pq.read_schema(file_path).names)
+            columns = [col for col in columns if col in available]
+        df = pq.read_table(file_path, columns=columns).to_pandas()
+        print(f"[SUCCESS] Loaded {len(df)} records from {file_path}")
+        return df
+    except Exception as e:
+        print(f"[ERROR] Failed to load Parquet file {file_path}: {e}")
+        return None
+
+def save_dataframe_to_parquet(df: pd.DataFrame, output_path: str) -> bool:
+    """Save DataFrame to a Parquet file."""
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df.to_parquet(output_path, index=False, compression='zstd')
+        print(f"[SUCCESS] Saved {len(df)} records to {output_path}")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed to save DataFrame to Parquet: {e}")
+        return False
+
 def load_csv_to_dataframe(file_path: str) -> Optional[pd.DataFrame]:
     """Load CSV file into a pandas DataFrame."""
     try:
@@ -51,19 +149,4 @@ def parse_date(date_str: str, format: str = "%Y-%m-%d") -> Optional[str]:
 
 def standardize_language_code(code: str) -> str:
     """Standardize language codes to consistent format."""
-    code_map = {
-        'hi': 'Hindi',
-        'ko': 'Korean',
-        'jp': 'Japanese',
-        'th': 'Thai',
-        'tl': 'Filipino',
-        'en': 'English',
-        'RU': 'Russian',
-        'MK': 'Macedonian',
-        'ZH': 'Chinese',
-        'FR': 'French',
-        'PL': 'Polish',
-        'EL': 'Greek',
-        'ES': 'Spanish'
-    }
-    return code_map.get(code.lower(), code.upper())
\ No newline at end of file
+    return LANGUAGE_CODE_MAP.get(code.lower(), code.upper())
\ No newline at end of file
@@ -25,6 +25,13 @@ sys.path.insert(0, os.path.join(project_root, "Extract"))
 sys.path.insert(0, os.path.join(project_root, "Transform"))
 sys.path.insert(0, os.path.join(project_root, "Load"))
 
+# "threads" (default) or "async" to drive the extractors with asyncio + aiohttp
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "threads")
+# Resume an interrupted extraction from its checkpoint instead of starting over
+EXTRACT_RESUME = os.getenv("EXTRACT_RESUME", "false").lower() in ("1", "true", "yes")
+# Only re-fetch TMDb details for new movies and movies changed since the last run
+EXTRACT_INCREMENTAL = os.getenv("EXTRACT_INCREMENTAL", "false").lower() in ("1", "true", "yes")
+
 def run_step(step_name: str, func):
     logger.info(f"[ETL] Step: {step_name}")
     try:
@@ -36,11 +43,11 @@ def run_step(step_name: str, func):
 
 def step_1_extract_tmdb():
     from Extract.tmdb import main as tmdb_extract_main
-    tmdb_extract_main()
+    tmdb_extract_main(mode=EXTRACT_MODE, resume=EXTRACT_RESUME, incremental=EXTRACT_INCREMENTAL)
 
 def step_2_extract_wiki():
     from Extract.wiki import main as wiki_extract_main
-    wiki_extract_main()
+    wiki_extract_main(mode=EXTRACT_MODE, resume=EXTRACT_RESUME)
 
 def step_3_transform_tmdb():
     from Transform.tmdb_transformer import process_all_tmdb_files
@@ -50,13 +57,17 @@ def step_4_transform_wiki():
     from Transform.wiki_transformer import process_all_wiki_files
     process_all_wiki_files()
 
+# DataNormalizer of step 5, step 6 builds the facts from its tables instead of re-reading its JSON
+normalizer = None
+
 def step_5_normalize_json():
+    global normalizer
     from Load.data_normalizer import main as normalize_main
-    normalize_main()
+    normalizer = normalize_main()
 
 def step_6_start_fact_builder():
     from Load.star_fact_builder import main as start_fact_builder_main
-    start_fact_builder_main()
+    start_fact_builder_main(normalizer)
 
 def step_7_create_tables():
     from Load.create_table_in_postgres import create_tables